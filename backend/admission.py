@@ -0,0 +1,223 @@
+# admission.py
+"""
+Skorlama uçları için kabul kontrolü (admission control) ve geri basınç.
+
+  - aynı anda en fazla max_in_flight istek işlenir
+  - fazlası en fazla queue_size kişilik FIFO kuyrukta queue_timeout saniye bekler
+  - kuyruk doluysa ya da süre dolarsa hemen 429 + Retry-After
+  - Content-Length max_body_bytes'ı aşan istek gövde okunmadan 413; header'ı olmayan
+    (chunked) gövdeler okunurken sayılır, sınır aşıldığı anda 413
+  - stream uçları (stream_paths) slotu istek boyunca değil, skorlama grubu başına
+    tutar (slot()): yavaş upload'lar ağ beklerken /predict'in slotlarını tüketmez
+
+Bekleme event loop'ta, asyncio future'larıyla yapılır: kuyruktaki istekler
+threadpool thread'i tutmaz (sync endpoint'ler ancak kabul edilince threadpool'a
+geçer). Slot bırakılınca doğrudan kuyruğun başındaki isteğe devredilir.
+
+Retry-After tahmini: son isteklerin ortalama servis süresi (EWMA) x sıradaki
+istek sayısı / max_in_flight. Sayaçlar reddetme nedenine göre tutulur; uç
+içindeki metin uzunluğu kontrolleri de count() ile aynı sayaçlara yazar.
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from starlette.responses import JSONResponse
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+class AdmissionController:
+    def __init__(self, max_in_flight: int, queue_size: int, queue_timeout: float, max_body_bytes: int = 0):
+        self.max_in_flight = max_in_flight  # 0 = sınırsız
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.max_body_bytes = max_body_bytes
+        self.in_flight = 0
+        self.waiters = deque()
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = {}
+        self.count_lock = threading.Lock()  # count() sync endpoint thread'lerinden de çağrılır
+        self.service_ewma = 0.0
+        self.max_wait = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_in_flight > 0
+
+    def count(self, reason: str):
+        with self.count_lock:
+            self.rejected[reason] = self.rejected.get(reason, 0) + 1
+
+    def retry_after(self) -> int:
+        if not self.enabled:
+            return 1
+        backlog = (len(self.waiters) + 1) / self.max_in_flight
+        return max(1, math.ceil(self.service_ewma * backlog))
+
+    async def acquire(self):
+        # None: kabul; aksi halde reddetme nedeni
+        if not self.enabled:
+            self.in_flight += 1
+            self.admitted += 1
+            return None
+        if self.in_flight < self.max_in_flight and not self.waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return None
+        if len(self.waiters) >= self.queue_size:
+            return "queue_full"
+
+        fut = asyncio.get_running_loop().create_future()
+        self.waiters.append(fut)
+        self.queued += 1
+        t = time.perf_counter()
+        try:
+            await asyncio.wait_for(fut, self.queue_timeout)
+        except asyncio.TimeoutError:
+            return "queue_timeout"
+        except asyncio.CancelledError:
+            # istemci giderken slot tam o anda devredilmiş olabilir
+            if fut.done() and not fut.cancelled():
+                self.release(0.0)
+            raise
+        finally:
+            if fut in self.waiters:
+                self.waiters.remove(fut)
+        self.max_wait = max(self.max_wait, time.perf_counter() - t)
+        self.admitted += 1
+        return None
+
+    @asynccontextmanager
+    async def slot(self):
+        # stream uçları için: tek skorlama grubu boyunca slot; reddedilirse AdmissionRejected
+        reason = await self.acquire()
+        if reason is not None:
+            self.count(reason)
+            raise AdmissionRejected(reason, self.retry_after())
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - t)
+
+    def release(self, service_time: float):
+        if service_time:
+            self.service_ewma = service_time if not self.service_ewma else 0.9 * self.service_ewma + 0.1 * service_time
+        while self.waiters:
+            fut = self.waiters.popleft()
+            if not fut.done():
+                fut.set_result(True)  # slot devredildi, in_flight değişmez
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "max_in_flight": self.max_in_flight,
+            "queue_size": self.queue_size,
+            "queue_timeout_seconds": self.queue_timeout,
+            "max_body_bytes": self.max_body_bytes,
+            "in_flight": self.in_flight,
+            "waiting": len(self.waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "service_ewma_ms": round(self.service_ewma * 1000, 2),
+            "rejected": self.rejected.copy(),
+        }
+
+
+class AdmissionMiddleware:
+    """
+    Sadece paths'teki POST isteklerine uygulanır; diğer uçlar (health, ready, history) etkilenmez.
+    stream_paths: gövdeyi stream edip boyutu kendisi sınırlayan uçlar; middleware'den
+    dokunulmadan geçer, uç her skorlama grubu için controller.slot() alır.
+    """
+
+    def __init__(self, app, controller: AdmissionController, paths, stream_paths=()):
+        self.app = app
+        self.controller = controller
+        self.paths = set(paths) - set(stream_paths)
+
+    def too_large(self):
+        self.controller.count("body_too_large")
+        return JSONResponse(
+            {"error": f"request body too large (max {self.controller.max_body_bytes} bytes)"}, status_code=413
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        ctl = self.controller
+
+        if ctl.max_body_bytes:
+            length = dict(scope["headers"]).get(b"content-length")
+            if length is not None and length.isdigit() and int(length) > ctl.max_body_bytes:
+                await self.too_large()(scope, receive, send)
+                return
+            receive, send, state = self.limit_body(receive, send, ctl.max_body_bytes)
+        else:
+            state = None
+
+        reason = await ctl.acquire()
+        if reason is not None:
+            ctl.count(reason)
+            response = JSONResponse(
+                {"error": "server busy", "reason": reason},
+                status_code=429,
+                headers={"Retry-After": str(ctl.retry_after())},
+            )
+            await response(scope, receive, send)
+            return
+
+        t = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        except Exception:
+            # gövde sınırı aşıldıysa (BodyTooLarge ya da uygulamanın ona sardığı hata) cevap aşağıda
+            if state is None or not state["exceeded"]:
+                raise
+        finally:
+            ctl.release(time.perf_counter() - t)
+        if state is not None and state["exceeded"] and not state["started"]:
+            await self.too_large()(scope, receive, state["send"])
+
+    @staticmethod
+    def limit_body(receive, send, max_bytes):
+        # Content-Length'siz gövde: okunan baytlar sayılır, sınır aşılınca receive
+        # BodyTooLarge fırlatır. Uygulama bunu kendi hatasına (ör. FastAPI'nin 400'ü)
+        # çevirebileceği için o andan sonraki cevabı yutulur, yerine 413 gönderilir.
+        state = {"received": 0, "exceeded": False, "started": False, "send": send}
+
+        async def limited_receive():
+            message = await receive()
+            if message["type"] == "http.request":
+                state["received"] += len(message.get("body", b""))
+                if state["received"] > max_bytes:
+                    state["exceeded"] = True
+                    raise BodyTooLarge()
+            return message
+
+        async def guarded_send(message):
+            if state["exceeded"]:
+                return
+            if message["type"] == "http.response.start":
+                state["started"] = True
+            await send(message)
+
+        return limited_receive, guarded_send, state
@@ -0,0 +1,144 @@
+# batcher.py
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from queue import Queue, Empty
+
+
+class MicroBatcher:
+    """
+    Eşzamanlı /predict çağrılarını kısa bir pencere (window_ms) ya da
+    max_batch_size dolana kadar toplayıp tek vektörize geçişte skorlar.
+    score_fn: list[str] -> list[sonuç], sıra korunur.
+    """
+
+    def __init__(self, score_fn, window_ms: float = 3.0, max_batch_size: int = 64):
+        self.score_fn = score_fn
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.queue = Queue()
+        self.thread = None
+        self.running = False
+
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.errors = 0
+        self.max_batch_seen = 0
+        self.size_hist = {}
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.recent_waits = deque(maxlen=2000)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        if not self.running:
+            return
+        self.running = False
+        self.queue.put(None)  # worker'ı uyandır
+        self.thread.join(timeout)
+
+    def submit(self, text: str) -> Future:
+        fut = Future()
+        if not self.running:
+            fut.set_exception(RuntimeError("micro-batcher is not running"))
+            return fut
+        self.queue.put((text, fut, time.perf_counter()))
+        return fut
+
+    def score(self, text: str):
+        return self.submit(text).result()
+
+    def _collect(self):
+        first = self.queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except Empty:
+                break
+            if item is None:
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while self.running or not self.queue.empty():
+            batch = self._collect()
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            texts = [text for text, _, _ in batch]
+            try:
+                results = self.score_fn(texts)
+            except Exception as e:
+                for _, fut, _ in batch:
+                    fut.set_exception(e)
+                with self.lock:
+                    self.errors += 1
+                continue
+
+            for (_, fut, _), result in zip(batch, results):
+                fut.set_result(result)
+            self._record(batch, started)
+
+    def _record(self, batch, started):
+        size = len(batch)
+        # histogram kovaları: 1, 2, 4, 8, ...
+        bucket = 1
+        while bucket < size:
+            bucket *= 2
+        with self.lock:
+            self.batches += 1
+            self.items += size
+            self.max_batch_seen = max(self.max_batch_seen, size)
+            self.size_hist[bucket] = self.size_hist.get(bucket, 0) + 1
+            for _, _, enqueued in batch:
+                wait = started - enqueued
+                self.wait_total += wait
+                self.wait_max = max(self.wait_max, wait)
+                self.recent_waits.append(wait)
+
+    def stats(self) -> dict:
+        with self.lock:
+            waits = sorted(self.recent_waits)
+
+            def q(p):
+                if not waits:
+                    return 0.0
+                return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 3)
+
+            return {
+                "window_ms": self.window * 1000,
+                "max_batch_size": self.max_batch_size,
+                "queue_depth": self.queue.qsize(),
+                "batches": self.batches,
+                "items": self.items,
+                "errors": self.errors,
+                "batch_size": {
+                    "mean": round(self.items / self.batches, 2) if self.batches else 0.0,
+                    "max": self.max_batch_seen,
+                    "histogram": {f"<={k}": v for k, v in sorted(self.size_hist.items())},
+                },
+                "queue_wait_ms": {
+                    "mean": round(self.wait_total / self.items * 1000, 3) if self.items else 0.0,
+                    "max": round(self.wait_max * 1000, 3),
+                    "p50": q(0.50),
+                    "p95": q(0.95),
+                    "p99": q(0.99),
+                },
+            }
@@ -0,0 +1,148 @@
+# history_db.py
+"""
+history tablosunda karışık okuma/yazma yükü: eski bağlantı modeli (her işlemde
+connect + rollback journal) ile db.py'deki kalıcı WAL bağlantılarını karşılaştırır.
+
+    python benchmarks/history_db.py --seconds 5 --writers 4 --readers 4
+"""
+import argparse
+import json
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import db
+
+
+def sample_item(i):
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "text_preview": f"benchmark abstract {i} " * 8,
+        "text_len": 1200,
+        "final_label": "ai" if i % 2 else "human",
+        "logreg_ai": 61.5,
+        "svm_ai": 72.25,
+        "nb_ai": 55.0,
+    }
+
+
+# ==== ESKİ MODEL: her işlemde yeni bağlantı, varsayılan journal ====
+def legacy_conn(path):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def legacy_insert(path, item):
+    conn = legacy_conn(path)
+    conn.execute(db.INSERT_HISTORY_SQL, db.history_row(item))
+    conn.commit()
+    conn.close()
+
+
+def legacy_list(path, limit=50):
+    conn = legacy_conn(path)
+    rows = [dict(r) for r in conn.execute("SELECT * FROM history ORDER BY id DESC LIMIT ?", (limit,))]
+    conn.close()
+    return rows
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def run(mode, path, seconds, writers, readers, prefill):
+    items = [sample_item(i) for i in range(prefill)]
+    if mode == "legacy":
+        conn = legacy_conn(path)
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, created_at TEXT NOT NULL,
+            text_preview TEXT NOT NULL, text_len INTEGER NOT NULL, final_label TEXT NOT NULL,
+            logreg_ai REAL, svm_ai REAL, nb_ai REAL)
+        """)
+        conn.executemany(db.INSERT_HISTORY_SQL, [db.history_row(item) for item in items])
+        conn.commit()
+        conn.close()
+        insert = lambda item: legacy_insert(path, item)
+        read = lambda: legacy_list(path)
+    else:
+        db.DB_PATH = Path(path)
+        db.init_db()
+        db.insert_history_many(items)
+        insert = db.insert_history
+        read = db.list_history
+
+    stop = threading.Event()
+    lat = {"write": [], "read": []}
+    errors = {"write": 0, "read": 0}
+    lock = threading.Lock()
+
+    def worker(kind):
+        local, failed, i = [], 0, 0
+        while not stop.is_set():
+            t = time.perf_counter()
+            try:
+                if kind == "write":
+                    insert(sample_item(i))
+                else:
+                    read()
+            except sqlite3.OperationalError:
+                failed += 1
+                continue
+            local.append(time.perf_counter() - t)
+            i += 1
+        with lock:
+            lat[kind].extend(local)
+            errors[kind] += failed
+
+    threads = [threading.Thread(target=worker, args=("write",)) for _ in range(writers)]
+    threads += [threading.Thread(target=worker, args=("read",)) for _ in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    if mode != "legacy":
+        db.close_all_conns()
+
+    result = {}
+    for kind, values in lat.items():
+        result[kind] = {
+            "ops": len(values),
+            "ops_per_sec": round(len(values) / seconds, 1),
+            "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+            "errors": errors[kind],
+        }
+    return result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--writers", type=int, default=4)
+    ap.add_argument("--readers", type=int, default=4)
+    ap.add_argument("--prefill", type=int, default=20000)
+    args = ap.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("legacy", "pooled_wal"):
+            path = str(Path(tmp) / f"{mode}.sqlite3")
+            results[mode] = run(mode, path, args.seconds, args.writers, args.readers, args.prefill)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
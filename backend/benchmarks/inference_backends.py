@@ -0,0 +1,116 @@
+# inference_backends.py
+"""
+Eşzamanlı skorlama verimi: istek thread'inde skorlama (INFERENCE_BACKEND=thread) ile
+önceden ısıtılmış süreç havuzu (INFERENCE_BACKEND=process, inference_pool.py).
+
+Her ölçümde --concurrency kadar thread (uvicorn threadpool'u gibi) --seconds boyunca
+--batch metinlik istekler gönderir. process için worker sayısı 1'den çekirdek sayısına
+kadar ikiye katlanarak denenir; "per_worker_rps" çekirdek başına ölçeklenmeyi gösterir.
+
+    python benchmarks/inference_backends.py --seconds 5 --concurrency 8
+    python benchmarks/inference_backends.py --batch 32 --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_MODELS_DIR = BACKEND_DIR.parent / "ml" / "models"
+sys.path.insert(0, str(BACKEND_DIR))
+sys.path.insert(0, str(BACKEND_DIR.parent / "ml" / "src"))
+
+SAMPLE_TEXT = (
+    "In this paper we study the problem of detecting machine generated abstracts. "
+    "Our experiments on several benchmark datasets show consistent improvements over prior work, "
+    "and an ablation study highlights the contribution of each component."
+)
+
+
+def resolve_bundle(models_dir):
+    import model_registry
+
+    registry_dir = models_dir / "registry"
+    version = model_registry.read_current(registry_dir)
+    return registry_dir / version if version else models_dir / "ensemble_bundle"
+
+
+def measure(predict, concurrency, seconds, batch):
+    latencies = [[] for _ in range(concurrency)]
+    stop = threading.Event()
+
+    def client(i):
+        n = 0
+        while not stop.is_set():
+            # her istek farklı metin: cache/branch tahmini etkisi olmasın
+            texts = [f"{SAMPLE_TEXT} {i} {n} {j}" for j in range(batch)]
+            t = time.perf_counter()
+            predict(texts)
+            latencies[i].append(time.perf_counter() - t)
+            n += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    lat = np.concatenate([np.asarray(x) for x in latencies]) * 1000
+    return {
+        "requests": int(lat.size),
+        "rps": round(lat.size / elapsed, 1),
+        "texts_per_s": round(lat.size * batch / elapsed, 1),
+        "p50_ms": round(float(np.percentile(lat, 50)), 3),
+        "p99_ms": round(float(np.percentile(lat, 99)), 3),
+    }
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({min(2 ** i, cpus) for i in range(cpus.bit_length() + 1)})
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--models-dir", type=Path, default=DEFAULT_MODELS_DIR)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--concurrency", type=int, default=max(4, cpus * 2))
+    ap.add_argument("--batch", type=int, default=1, help="istek başına metin sayısı")
+    ap.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    args = ap.parse_args()
+
+    from ensemble import FusedEnsemble
+    from inference_pool import InferencePool
+
+    bundle_dir = resolve_bundle(args.models_dir.resolve())
+    ensemble = FusedEnsemble.load_bundle(bundle_dir, mmap_mode="r")
+    ensemble.predict_proba([SAMPLE_TEXT] * 16)
+
+    rows = [{"backend": "thread", "workers": None,
+             **measure(ensemble.predict_proba, args.concurrency, args.seconds, args.batch)}]
+    for n in args.workers:
+        pool = InferencePool(bundle_dir, n, ensemble, warmup_texts=[SAMPLE_TEXT])
+        pool.start()
+        try:
+            row = {"backend": "process", "workers": n,
+                   **measure(pool.predict_proba, args.concurrency, args.seconds, args.batch)}
+        finally:
+            pool.shutdown(wait=True)
+        row["per_worker_rps"] = round(row["rps"] / n, 1)
+        row["speedup_vs_thread"] = round(row["rps"] / rows[0]["rps"], 2)
+        rows.append(row)
+
+    print(json.dumps({
+        "cpus": cpus, "concurrency": args.concurrency, "batch": args.batch,
+        "seconds": args.seconds, "results": rows,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
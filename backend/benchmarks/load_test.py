@@ -0,0 +1,432 @@
+# load_test.py
+"""
+Servis yolunun tekrarlanabilir yük / gecikme testi.
+
+Uygulamayı yerel model artifact'larıyla ve geçici bir SQLite dosyasıyla ayrı bir
+uvicorn sürecinde başlatır (ya da --url ile çalışan bir sunucuya bağlanır), sonra
+her uç için iki tür yük uygular:
+
+  closed  N istemci, her biri cevabı alınca bir sonrakini gönderir (--concurrency)
+  open    sabit ortalama hızda Poisson varışlar (--rates, istek/sn); gecikme planlanan
+          gönderim anından ölçülür, sunucu yavaşladığında kuyrukta bekleme de sayılır
+
+Uçlar: predict (POST /predict), batch (POST /predict/batch, --batch-size metin),
+history (GET /history?limit=50). Metinler data/processed/*.csv'den sabit tohumla
+örneklenir; gerçek uzunluk dağılımı korunur. Prediction cache varsayılan olarak
+kapalıdır (aynı metinler tekrar edildiğinden cache'i ölçmüş oluruz), --server-env ile
+başka ayarlar verilebilir.
+
+Çıktı JSON: commit, ortam, ayarlar ve senaryo başına istek sayısı, hata dağılımı,
+throughput, p50/p95/p99/max (ms). --compare önceki bir çıktıyla karşılaştırır;
+p99 ya da throughput --threshold'dan fazla kötüleşen senaryo varsa çıkış kodu 1.
+
+    python benchmarks/load_test.py --output bench_main.json
+    python benchmarks/load_test.py --endpoints predict --concurrency 1 8 --rates 50 --duration 5
+    python benchmarks/load_test.py --compare bench_main.json --threshold 0.15
+    python benchmarks/load_test.py --server-env MICROBATCH_ENABLED=1 INFERENCE_BACKEND=process
+
+--url ile history ucu ölçülürse önce o sunucuya /predict/batch ile 1000 kayıt yazılır.
+İstemci ve sunucu aynı makinedeyse CPU'yu paylaşırlar; commit'ler arası karşılaştırma
+aynı makinede, aynı ayarlarla yapılmalıdır.
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+REPO_DIR = BACKEND_DIR.parent
+DEFAULT_MODELS_DIR = REPO_DIR / "ml" / "models"
+DEFAULT_DATA = sorted((REPO_DIR / "data" / "processed").glob("*.csv"))
+
+ENDPOINTS = ("predict", "batch", "history")
+# sonuçların karşılaştırılabilir olması için sabit sunucu ayarları (--server-env ile ezilebilir)
+DEFAULT_SERVER_ENV = {"PREDICT_CACHE_SIZE": "0", "MODEL_LOAD_BLOCKING": "1"}
+READY_TIMEOUT_S = 120
+HISTORY_PREFILL_ROWS = 1000
+
+
+def load_texts(paths, text_col: str, n: int, seed: int):
+    texts = []
+    for path in paths:
+        with open(path, encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                text = (row.get(text_col) or "").strip()
+                if text:
+                    texts.append(text)
+    if not texts:
+        raise SystemExit(f"metin bulunamadı: {[str(p) for p in paths]} ({text_col!r} kolonu)")
+    rng = random.Random(seed)
+    return [rng.choice(texts) for _ in range(n)]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def git_commit():
+    def run(*cmd):
+        return subprocess.run(cmd, cwd=REPO_DIR, capture_output=True, text=True).stdout.strip()
+
+    commit = run("git", "rev-parse", "HEAD")
+    if not commit:
+        return None
+    dirty = bool(run("git", "status", "--porcelain", "--untracked-files=no"))
+    return {"commit": commit, "dirty": dirty}
+
+
+class Server:
+    """Geçici history DB'li uvicorn süreci; with bloğundan çıkınca kapanır ve dosyalar silinir."""
+
+    def __init__(self, models_dir: Path, env: dict, log_path: Path = None):
+        self.models_dir = models_dir
+        self.env = env
+        self.log_path = log_path
+        self.tmp = None
+        self.proc = None
+        self.url = None
+
+    def __enter__(self):
+        self.tmp = tempfile.TemporaryDirectory(prefix="humanorai_load_")
+        port = free_port()
+        env = {
+            **os.environ,
+            "HISTORY_DB_PATH": str(Path(self.tmp.name) / "history.sqlite3"),
+            "MODELS_DIR": str(self.models_dir),
+            **self.env,
+        }
+        log = open(self.log_path, "w") if self.log_path else subprocess.DEVNULL
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning", "--no-access-log"],
+            cwd=BACKEND_DIR, env=env, stdout=log, stderr=log,
+        )
+        self.url = f"http://127.0.0.1:{port}"
+        try:
+            wait_ready(self.url, self.proc)
+        except BaseException:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        if self.proc is not None and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(30)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+        self.tmp.cleanup()
+
+
+def wait_ready(url: str, proc=None):
+    deadline = time.monotonic() + READY_TIMEOUT_S
+    while time.monotonic() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise SystemExit(f"sunucu başlamadı (çıkış kodu {proc.returncode}); --server-log ile bakın")
+        try:
+            if httpx.get(f"{url}/ready", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise SystemExit(f"{url}/ready {READY_TIMEOUT_S} sn içinde hazır olmadı")
+
+
+class Workload:
+    """Uç adından istek üretir; her çağrı kendi rng'siyle (thread başına) metin seçer."""
+
+    def __init__(self, endpoint: str, texts, batch_size: int):
+        self.endpoint = endpoint
+        self.texts = texts
+        self.batch_size = batch_size
+
+    def send(self, client: httpx.Client, rng: random.Random):
+        if self.endpoint == "predict":
+            return client.post("/predict", json={"text": rng.choice(self.texts)})
+        if self.endpoint == "batch":
+            items = [{"text": rng.choice(self.texts)} for _ in range(self.batch_size)]
+            return client.post("/predict/batch", json={"items": items})
+        return client.get("/history", params={"limit": 50})
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.statuses = {}
+
+    def add(self, seconds: float, status):
+        with self.lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if status == 200:
+                self.latencies.append(seconds)
+
+
+def send_timed(workload, client, rng, recorder, started: float):
+    try:
+        status = workload.send(client, rng).status_code
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    recorder.add(time.perf_counter() - started, status)
+
+
+def run_closed(url, workload, concurrency: int, duration: float, seed: int, timeout: float):
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+
+    def client_loop(i):
+        rng = random.Random(seed * 1000 + i)
+        with httpx.Client(base_url=url, timeout=timeout) as client:
+            while time.perf_counter() < deadline:
+                send_timed(workload, client, rng, recorder, time.perf_counter())
+
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return recorder, time.perf_counter() - start
+
+
+def run_open(url, workload, rate: float, duration: float, seed: int, timeout: float, max_in_flight: int):
+    recorder = Recorder()
+    local = threading.local()
+    clients = []
+    rng = random.Random(seed)
+
+    def task(scheduled, text_seed):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = httpx.Client(base_url=url, timeout=timeout)
+            clients.append(client)
+        send_timed(workload, client, random.Random(text_seed), recorder, scheduled)
+
+    pool = ThreadPoolExecutor(max_in_flight)
+    start = time.perf_counter()
+    scheduled = start
+    sent = 0
+    try:
+        while True:
+            scheduled += rng.expovariate(rate)
+            if scheduled - start >= duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            # havuz doluysa iş kuyrukta bekler; gecikme yine planlanan andan sayılır
+            pool.submit(task, scheduled, rng.random())
+            sent += 1
+    finally:
+        pool.shutdown(wait=True)
+        for client in clients:
+            client.close()
+    return recorder, time.perf_counter() - start, sent
+
+
+def summarize(recorder: Recorder, elapsed: float):
+    lat = np.asarray(recorder.latencies) * 1000
+    ok = int(lat.size)
+    total = sum(recorder.statuses.values())
+    row = {
+        "requests": total,
+        "ok": ok,
+        "errors": {str(k): v for k, v in sorted(recorder.statuses.items(), key=str) if k != 200},
+        "throughput_rps": round(ok / elapsed, 2) if elapsed > 0 else 0.0,
+        "elapsed_s": round(elapsed, 3),
+    }
+    if ok:
+        row.update({
+            "p50_ms": round(float(np.percentile(lat, 50)), 3),
+            "p95_ms": round(float(np.percentile(lat, 95)), 3),
+            "p99_ms": round(float(np.percentile(lat, 99)), 3),
+            "max_ms": round(float(lat.max()), 3),
+            "mean_ms": round(float(lat.mean()), 3),
+        })
+    return row
+
+
+def scenario_key(row) -> str:
+    return f"{row['endpoint']}/{row['mode']}/{row['level']}"
+
+
+def prefill_history(url, texts, rows: int):
+    # /history ölçümü boş tabloda yapılmasın
+    with httpx.Client(base_url=url, timeout=120) as client:
+        for lo in range(0, rows, 500):
+            batch = texts[lo:lo + 500] or texts[:500]
+            client.post("/predict/batch", json={"items": [{"text": t} for t in batch]})
+
+
+def run_suite(url, args, texts):
+    results = []
+    for endpoint in args.endpoints:
+        workload = Workload(endpoint, texts, args.batch_size)
+        # ısınma: bağlantılar, threadpool, sayfa cache'i
+        run_closed(url, workload, max(args.concurrency), args.warmup, args.seed, args.timeout)
+        for concurrency in args.concurrency:
+            recorder, elapsed = run_closed(url, workload, concurrency, args.duration, args.seed, args.timeout)
+            row = {"endpoint": endpoint, "mode": "closed", "level": concurrency, **summarize(recorder, elapsed)}
+            results.append(row)
+            log_row(row)
+        for rate in args.rates:
+            recorder, elapsed, sent = run_open(
+                url, workload, rate, args.duration, args.seed, args.timeout, args.max_in_flight,
+            )
+            row = {
+                "endpoint": endpoint, "mode": "open", "level": rate,
+                "offered_rps": round(sent / args.duration, 2), **summarize(recorder, elapsed),
+            }
+            results.append(row)
+            log_row(row)
+    return results
+
+
+def log_row(row):
+    print(
+        f"{scenario_key(row):<24} {row['throughput_rps']:>9.1f} rps  "
+        f"p50 {row.get('p50_ms', float('nan')):>8.2f}  p95 {row.get('p95_ms', float('nan')):>8.2f}  "
+        f"p99 {row.get('p99_ms', float('nan')):>8.2f} ms  errors {sum(row['errors'].values())}",
+        file=sys.stderr,
+    )
+
+
+def compare(current: dict, baseline: dict, threshold: float):
+    # p99 ve throughput'taki göreli değişim; eşik aşılırsa regresyon
+    base = {scenario_key(r): r for r in baseline["results"]}
+    rows, regressions = [], []
+    for row in current["results"]:
+        key = scenario_key(row)
+        old = base.get(key)
+        if old is None or "p99_ms" not in old or "p99_ms" not in row:
+            continue
+
+        def change(field):
+            return round((row[field] - old[field]) / old[field], 4) if old[field] else None
+
+        diff = {
+            "scenario": key,
+            "throughput_change": change("throughput_rps"),
+            "p50_change": change("p50_ms"),
+            "p99_change": change("p99_ms"),
+        }
+        diff["regression"] = bool(
+            (diff["p99_change"] is not None and diff["p99_change"] > threshold)
+            or (diff["throughput_change"] is not None and diff["throughput_change"] < -threshold)
+        )
+        if diff["regression"]:
+            regressions.append(key)
+        rows.append(diff)
+    return {
+        "baseline_commit": (baseline.get("meta", {}).get("git") or {}).get("commit"),
+        "threshold": threshold,
+        "scenarios": rows,
+        "regressions": regressions,
+    }
+
+
+def parse_env(pairs):
+    env = {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise SystemExit(f"--server-env KEY=VALUE bekleniyor: {pair!r}")
+        env[key] = value
+    return env
+
+
+def main():
+    ap = argparse.ArgumentParser(description="backend yük / gecikme testi")
+    ap.add_argument("--url", help="çalışan sunucu (verilmezse geçici DB ile uvicorn başlatılır)")
+    ap.add_argument("--models-dir", type=Path, default=DEFAULT_MODELS_DIR)
+    ap.add_argument("--data", type=Path, nargs="+", default=DEFAULT_DATA)
+    ap.add_argument("--text-col", default="text")
+    ap.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="closed-loop istemci sayıları")
+    ap.add_argument("--rates", type=float, nargs="*", default=[20.0, 50.0], help="open-loop hızları (istek/sn)")
+    ap.add_argument("--duration", type=float, default=10.0, help="senaryo başına saniye")
+    ap.add_argument("--warmup", type=float, default=2.0, help="uç başına ısınma saniyesi")
+    ap.add_argument("--batch-size", type=int, default=16)
+    ap.add_argument("--max-in-flight", type=int, default=256, help="open-loop eşzamanlı istek sınırı")
+    ap.add_argument("--timeout", type=float, default=30.0)
+    ap.add_argument("--samples", type=int, default=2000, help="örneklenen metin sayısı")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--server-env", nargs="*", default=[], metavar="KEY=VALUE")
+    ap.add_argument("--server-log", type=Path)
+    ap.add_argument("--output", type=Path, help="JSON sonuç dosyası (verilmezse stdout)")
+    ap.add_argument("--compare", type=Path, help="önceki bir çıktı; regresyon varsa çıkış kodu 1")
+    ap.add_argument("--threshold", type=float, default=0.10)
+    args = ap.parse_args()
+
+    texts = load_texts(args.data, args.text_col, args.samples, args.seed)
+    server_env = {**DEFAULT_SERVER_ENV, **parse_env(args.server_env)}
+    lengths = np.array([len(t) for t in texts])
+    meta = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "server": args.url or "local",
+        "server_env": server_env if not args.url else None,
+        "data": [str(p) for p in args.data],
+        "text_chars": {
+            "p50": int(np.percentile(lengths, 50)),
+            "p95": int(np.percentile(lengths, 95)),
+            "max": int(lengths.max()),
+        },
+        "settings": {
+            "endpoints": args.endpoints, "concurrency": args.concurrency, "rates": args.rates,
+            "duration_s": args.duration, "warmup_s": args.warmup, "batch_size": args.batch_size,
+            "max_in_flight": args.max_in_flight, "samples": args.samples, "seed": args.seed,
+        },
+    }
+
+    if args.url:
+        wait_ready(args.url)
+        if "history" in args.endpoints:
+            prefill_history(args.url, texts, HISTORY_PREFILL_ROWS)
+        results = run_suite(args.url, args, texts)
+    else:
+        with Server(args.models_dir.resolve(), server_env, args.server_log) as server:
+            if "history" in args.endpoints:
+                prefill_history(server.url, texts, HISTORY_PREFILL_ROWS)
+            results = run_suite(server.url, args, texts)
+
+    report = {"meta": meta, "results": results}
+    exit_code = 0
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            report["comparison"] = compare(report, json.load(f), args.threshold)
+        for key in report["comparison"]["regressions"]:
+            print(f"REGRESYON: {key}", file=sys.stderr)
+        exit_code = 1 if report["comparison"]["regressions"] else 0
+
+    out = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(out + "\n", encoding="utf-8")
+    else:
+        print(out)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
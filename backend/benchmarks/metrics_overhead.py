@@ -0,0 +1,141 @@
+# metrics_overhead.py
+"""
+Ölçüm (metrics.py) maliyeti: aynı /predict istekleri üç ayarla.
+
+  off          METRICS_ENABLED=0
+  metrics      METRICS_ENABLED=1, SERVER_TIMING_ENABLED=0
+  server_timing METRICS_ENABLED=1, SERVER_TIMING_ENABLED=1 (varsayılan)
+
+İstekler ağ olmadan doğrudan ASGI uygulamasına verilir (middleware + threadpool dahil),
+böylece fark soket/istemci gürültüsünde kaybolmaz. Her ayar ayrı süreçte (ayarlar
+import anında okunur) --passes kez ölçülür, en iyi geçiş alınır; ayarlar --rounds kez
+sırayla çalışır ve turların medyanı raporlanır.
+Prediction cache kapalı, history geçici bir SQLite dosyasına yazılır.
+
+    python benchmarks/metrics_overhead.py --requests 3000 --rounds 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+MODES = {
+    "off": {"METRICS_ENABLED": "0"},
+    "metrics": {"METRICS_ENABLED": "1", "SERVER_TIMING_ENABLED": "0"},
+    "server_timing": {"METRICS_ENABLED": "1", "SERVER_TIMING_ENABLED": "1"},
+}
+
+SAMPLE_TEXT = (
+    "In this paper we study the problem of detecting machine generated abstracts. "
+    "Our experiments on several benchmark datasets show consistent improvements over prior work."
+)
+
+
+async def call(app, body: bytes):
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/predict", "raw_path": b"/predict", "query_string": b"",
+        "root_path": "", "server": ("bench", 80), "client": ("bench", 1),
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    }
+    sent = False
+    status = []
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            await asyncio.sleep(3600)
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await app(scope, receive, send)
+    return status[0]
+
+
+def run_mode(n_requests: int, passes: int):
+    # alt süreç: ayarlar ortam değişkenlerinden
+    sys.path.insert(0, str(BACKEND_DIR))
+    import db
+
+    tmp = tempfile.mkdtemp(prefix="metrics_bench_")
+    db.DB_PATH = Path(tmp) / "history.sqlite3"
+    import main
+
+    main.startup()
+    main.warmup.wait(120)
+    bodies = [json.dumps({"text": f"{SAMPLE_TEXT} {i}"}).encode() for i in range(n_requests)]
+
+    async def go():
+        for body in bodies[:200]:  # ısınma
+            await call(main.app, body)
+        latencies = []
+        for body in bodies:
+            t = time.perf_counter()
+            status = await call(main.app, body)
+            latencies.append(time.perf_counter() - t)
+            assert status == 200, status
+        return latencies
+
+    best = None
+    for _ in range(passes):
+        us = sorted(x * 1e6 for x in asyncio.run(go()))
+        row = {
+            "mean_us": round(statistics.fmean(us), 1),
+            "p50_us": round(us[len(us) // 2], 1),
+            "p99_us": round(us[int(len(us) * 0.99)], 1),
+        }
+        if best is None or row["mean_us"] < best["mean_us"]:
+            best = row
+    main.shutdown()
+    print(json.dumps(best))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=3000)
+    ap.add_argument("--rounds", type=int, default=3)
+    ap.add_argument("--passes", type=int, default=3, help="süreç başına ölçüm geçişi")
+    ap.add_argument("--child", choices=list(MODES), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        run_mode(args.requests, args.passes)
+        return
+
+    runs = {mode: [] for mode in MODES}
+    for _ in range(args.rounds):
+        for mode, env in MODES.items():
+            out = subprocess.run(
+                [sys.executable, __file__, "--child", mode,
+                 "--requests", str(args.requests), "--passes", str(args.passes)],
+                env={**os.environ, "PREDICT_CACHE_SIZE": "0", **env},
+                capture_output=True, text=True, check=True,
+            )
+            runs[mode].append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    results = {
+        mode: {key: statistics.median(r[key] for r in rows) for key in rows[0]}
+        for mode, rows in runs.items()
+    }
+    base = results["off"]["mean_us"]
+    for mode, row in results.items():
+        row["overhead_us"] = round(row["mean_us"] - base, 1)
+        row["overhead_pct"] = round(100 * (row["mean_us"] - base) / base, 2)
+    print(json.dumps({
+        "requests": args.requests, "rounds": args.rounds, "passes": args.passes, "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# worker_memory.py
+"""
+N worker sürecinin model yükledikten sonraki bellek kullanımı (Linux, /proc/self/smaps_rollup).
+
+  pipelines    : eski yol, her worker üç joblib pipeline'ı yükler
+  bundle_copy  : registry/CURRENT (yoksa ensemble_bundle), mmap_mode=None (diziler her worker'a kopyalanır)
+  bundle_mmap  : aynı bundle, mmap_mode="r" (diziler page cache'ten paylaşılır)
+
+Worker'lar modeli yükleyip bir tahmin yaptıktan sonra hepsi ayaktayken ölçülür;
+PSS paylaşılan sayfaları süreç sayısına böldüğü için "worker başına ek bellek" ölçüsüdür.
+
+    python benchmarks/worker_memory.py --workers 4
+    python benchmarks/worker_memory.py --workers 4 --models-dir ../../ml/models
+"""
+import argparse
+import json
+import multiprocessing as mp
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+DEFAULT_MODELS_DIR = BACKEND_DIR.parent / "ml" / "models"
+ML_SRC_DIR = BACKEND_DIR.parent / "ml" / "src"
+
+MODES = ("pipelines", "bundle_copy", "bundle_mmap")
+SAMPLE_TEXTS = ["We propose a novel transformer architecture for abstract classification."] * 8
+
+
+def memory_kb():
+    # Rss / Pss satırları (kB)
+    out = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                out[key.lower()] = int(rest.split()[0])
+    return out
+
+
+def load(mode, models_dir):
+    sys.path.insert(0, str(ML_SRC_DIR))
+    from ensemble import FusedEnsemble
+
+    if mode == "pipelines":
+        import joblib
+        return FusedEnsemble.from_models({
+            name: joblib.load(models_dir / f"{name}.joblib")
+            for name in ("logreg", "svm_calibrated", "multinomial_nb")
+        })
+    mmap_mode = "r" if mode == "bundle_mmap" else None
+    import model_registry
+    registry_dir = models_dir / "registry"
+    version = model_registry.read_current(registry_dir)
+    bundle_dir = registry_dir / version if version else models_dir / "ensemble_bundle"
+    return FusedEnsemble.load_bundle(bundle_dir, mmap_mode=mmap_mode)
+
+
+def worker(mode, models_dir, barrier, results):
+    # ağır import'lar baseline'a dahil: yalnızca model yüklemenin farkı ölçülür
+    import numpy  # noqa: F401
+    import scipy.sparse  # noqa: F401
+    import sklearn.feature_extraction.text  # noqa: F401
+    sys.path.insert(0, str(ML_SRC_DIR))
+    import ensemble  # noqa: F401
+
+    before = memory_kb()
+    model = load(mode, models_dir)
+    model.predict_proba(SAMPLE_TEXTS)
+
+    barrier.wait()  # hepsi yüklendi: paylaşılan sayfalar şimdi N'e bölünür
+    after = memory_kb()
+    results.put({
+        "rss_before_kb": before["rss"],
+        "rss_after_kb": after["rss"],
+        "pss_before_kb": before["pss"],
+        "pss_after_kb": after["pss"],
+    })
+    barrier.wait()
+
+
+def run(mode, models_dir, n_workers):
+    ctx = mp.get_context("spawn")  # uvicorn --workers gibi: her süreç kendi import'unu yapar
+    barrier = ctx.Barrier(n_workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(mode, models_dir, barrier, results)) for _ in range(n_workers)]
+    for p in procs:
+        p.start()
+    rows = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+
+    pss_delta = [r["pss_after_kb"] - r["pss_before_kb"] for r in rows]
+    rss_delta = [r["rss_after_kb"] - r["rss_before_kb"] for r in rows]
+    return {
+        "workers": n_workers,
+        "model_pss_per_worker_mb": round(sum(pss_delta) / len(rows) / 1024, 2),
+        "model_pss_total_mb": round(sum(pss_delta) / 1024, 2),
+        "model_rss_per_worker_mb": round(sum(rss_delta) / len(rows) / 1024, 2),
+        "pss_per_worker_mb": round(sum(r["pss_after_kb"] for r in rows) / len(rows) / 1024, 2),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--models-dir", type=Path, default=DEFAULT_MODELS_DIR)
+    ap.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    args = ap.parse_args()
+
+    results = {}
+    for mode in args.modes:
+        results[mode] = run(mode, args.models_dir.resolve(), args.workers)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
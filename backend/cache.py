@@ -0,0 +1,109 @@
+# cache.py
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def normalize_text(text: str) -> str:
+    # TF-IDF tokenizasyonu boşluk farkını görmez; "a  b\n" ile "a b" aynı sonucu verir
+    return " ".join(text.split())
+
+
+class PredictionCache:
+    """
+    Normalize edilmiş metin + model sürümü anahtarlı LRU (boyut sınırı + TTL).
+    Aynı anahtar için eşzamanlı istekler tek bir hesaplamayı bekler (in-flight dedup).
+    """
+
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl_seconds
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.inflight = {}            # key -> Future
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(text: str, model_version: str) -> str:
+        h = hashlib.sha256()
+        h.update(model_version.encode("utf-8"))
+        h.update(b"\0")
+        h.update(normalize_text(text).encode("utf-8"))
+        return h.hexdigest()
+
+    def get_or_compute(self, text: str, model_version: str, compute):
+        key = self.make_key(text, model_version)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+                self.expirations += 1
+
+            fut = self.inflight.get(key)
+            if fut is not None:
+                self.coalesced += 1
+                owner = False
+            else:
+                fut = Future()
+                self.inflight[key] = fut
+                self.misses += 1
+                owner = True
+
+        if not owner:
+            return fut.result()
+
+        try:
+            value = compute()
+        except Exception as e:
+            with self.lock:
+                self.inflight.pop(key, None)
+            fut.set_exception(e)
+            raise
+
+        with self.lock:
+            # hesaplama sürerken invalidate edildiyse eski sonucu saklama
+            if self.inflight.pop(key, None) is fut:
+                self.entries[key] = (time.monotonic() + self.ttl, value)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+        fut.set_result(value)
+        return value
+
+    def invalidate(self):
+        with self.lock:
+            self.entries.clear()
+            self.inflight.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl,
+                "inflight": len(self.inflight),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            }
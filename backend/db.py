@@ -1,67 +1,563 @@
 # db.py
+import logging
+import os
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
 from pathlib import Path
+from queue import Queue, Empty, Full
 
 BASE_DIR = Path(__file__).resolve().parent
-DB_PATH = BASE_DIR / "data" / "history.sqlite3"
+# HISTORY_DB_PATH: benchmark / test için ayrı dosya
+DB_PATH = Path(os.getenv("HISTORY_DB_PATH") or BASE_DIR / "data" / "history.sqlite3")
 
-def get_conn():
-    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
+# WAL: /history okumaları ile /predict yazımları birbirini bloklamaz
+PRAGMAS = (
+    # yeni DB'de tablolar oluşmadan (ve WAL'dan önce) verilmeli; mevcut DB'de etkisiz,
+    # dönüştürmek için: python retention.py --enable-incremental-vacuum
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",     # WAL'da commit başına fsync yok, checkpoint'te var
+    "PRAGMA cache_size=-65536",      # 64 MB page cache
+    "PRAGMA mmap_size=268435456",    # 256 MB memory-mapped I/O
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+# thread başına uzun ömürlü bağlantı; sqlite3 aynı SQL metnini bağlantı
+# içinde prepared statement olarak cache'ler (cached_statements)
+_local = threading.local()
+_all_conns = []
+_conns_lock = threading.Lock()
+_generation = 0  # close_all_conns() her çağrıldığında artar
+
+def open_conn(path=None):
+    path = path or DB_PATH
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, cached_statements=256)
     conn.row_factory = sqlite3.Row
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
     return conn
 
+def get_conn():
+    conn = getattr(_local, "conn", None)
+    # fork sonrası ebeveynin bağlantısı kullanılmaz; DB_PATH değiştiyse
+    # ya da bağlantılar kapatıldıysa yeniden aç
+    key = (os.getpid(), DB_PATH, _generation)
+    if conn is None or _local.key != key:
+        conn = open_conn(DB_PATH)
+        _local.conn, _local.key = conn, key
+        with _conns_lock:
+            _all_conns.append(conn)
+    return conn
+
+def close_all_conns():
+    # shutdown'da çağrılır; eski bağlantıyı tutan thread bir sonraki çağrıda yenisini açar
+    global _generation
+    with _conns_lock:
+        conns = list(_all_conns)
+        _all_conns.clear()
+        _generation += 1
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+# (sürüm, SQL listesi); init_db() PRAGMA user_version'a bakıp eksikleri sırayla uygular.
+# Yeni şema değişikliği = listenin sonuna yeni sürüm eklemek.
+MIGRATIONS = [
+    (1, [
+        # keyset sayfalama + filtreler için
+        "CREATE INDEX IF NOT EXISTS idx_history_created_at ON history(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_history_label_id ON history(final_label, id)",
+        "CREATE INDEX IF NOT EXISTS idx_history_logreg_ai ON history(logreg_ai)",
+        "CREATE INDEX IF NOT EXISTS idx_history_svm_ai ON history(svm_ai)",
+        "CREATE INDEX IF NOT EXISTS idx_history_nb_ai ON history(nb_ai)",
+    ]),
+    (2, [
+        # created_at artık yazma anında atanıyor (stamp_created_at); write-behind öncesi
+        # satırlarda id sırasıyla çelişen created_at'ler koşan maksimuma çekilir
+        """
+        UPDATE history SET created_at = fixed.created_at
+        FROM (SELECT id, MAX(created_at) OVER (ORDER BY id) AS created_at FROM history) AS fixed
+        WHERE history.id = fixed.id AND history.created_at < fixed.created_at
+        """,
+    ]),
+]
+
+SCORE_COLUMNS = ("logreg_ai", "svm_ai", "nb_ai")
+
 def init_db():
     conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS history (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        created_at TEXT NOT NULL,
-        text_preview TEXT NOT NULL,
-        text_len INTEGER NOT NULL,
-        final_label TEXT NOT NULL,
-        logreg_ai REAL,
-        svm_ai REAL,
-        nb_ai REAL
-    )
-    """)
-    conn.commit()
-    conn.close()
+    with conn:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at TEXT NOT NULL,
+            text_preview TEXT NOT NULL,
+            text_len INTEGER NOT NULL,
+            final_label TEXT NOT NULL,
+            logreg_ai REAL,
+            svm_ai REAL,
+            nb_ai REAL
+        )
+        """)
+    migrate(conn)
 
-def insert_history(item: dict):
-    conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("""
-    INSERT INTO history (created_at, text_preview, text_len, final_label, logreg_ai, svm_ai, nb_ai)
-    VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, (
-        item["created_at"],
+def schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    for version, statements in MIGRATIONS:
+        if schema_version(conn) >= version:
+            continue
+        # IMMEDIATE: aynı anda açılan worker'lar migration'ı iki kez çalıştırmasın
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version(conn) < version:
+                for sql in statements:
+                    conn.execute(sql)
+                conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+INSERT_HISTORY_SQL = """
+INSERT INTO history (created_at, text_preview, text_len, final_label, logreg_ai, svm_ai, nb_ai)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
+def history_row(item: dict, created_at: str = None):
+    return (
+        created_at or item["created_at"],
         item["text_preview"],
         item["text_len"],
         item["final_label"],
         item.get("logreg_ai"),
         item.get("svm_ai"),
         item.get("nb_ai"),
-    ))
-    conn.commit()
-    conn.close()
+    )
+
+# yazım süresi ölçümü: main.py metrics'i bağlar -> observer(seconds, rows, failed)
+_write_observer = None
+
+def set_write_observer(observer):
+    global _write_observer
+    _write_observer = observer
+
+@contextmanager
+def observe_write(rows: int):
+    observer = _write_observer
+    if observer is None:
+        yield
+        return
+    t = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        observer(time.perf_counter() - t, rows, True)
+        raise
+    observer(time.perf_counter() - t, rows, False)
+
+def stamp_created_at(conn) -> str:
+    # created_at isteğin geldiği an değil, yazma kilidi (BEGIN IMMEDIATE) alındıktan sonraki an:
+    # write-behind kuyrukları ve worker'lar arasında id sırası ile created_at sırası aynı kalır.
+    # Saat geri giderse son satırınkine sabitlenir; time_range_filter bu sıraya güveniyor
+    now = datetime.now(timezone.utc).isoformat()
+    row = conn.execute("SELECT created_at FROM history ORDER BY id DESC LIMIT 1").fetchone()
+    return max(now, row[0]) if row else now
+
+def insert_history(item: dict):
+    insert_history_many([item])
+
+def insert_history_many(items: list):
+    # tek transaction + executemany: batch başına bir commit
+    if not items:
+        return
+    conn = get_conn()
+    # with conn: commit, hata olursa rollback (bağlantı açık kalıyor)
+    with observe_write(len(items)), conn:
+        conn.execute("BEGIN IMMEDIATE")
+        created_at = stamp_created_at(conn)
+        conn.executemany(INSERT_HISTORY_SQL, [history_row(item, created_at) for item in items])
+
+class HistoryWriter:
+    """
+    Write-behind history: /predict kayıtları sınırlı bir kuyruğa atılır, arka plan
+    thread'i flush_interval veya batch_size dolunca tek transaction'da executemany yapar.
+
+    Kuyruk doluysa:
+      policy="drop"  -> kayıt atılır, istek hiç beklemez (dropped sayacı artar)
+      policy="block" -> istek en fazla block_timeout saniye bekler, sonra kayıt atılır
+    stop() kuyrukta kalan her şeyi yazıp thread'i kapatır; stop sonrası gelen kayıtlar
+    doğrudan insert_history ile yazılır.
+    """
+
+    def __init__(self, max_queue: int = 10000, flush_interval: float = 0.5,
+                 batch_size: int = 500, policy: str = "drop", block_timeout: float = 1.0):
+        if policy not in ("drop", "block"):
+            raise ValueError(f"unknown history queue policy: {policy}")
+        self.queue = Queue(maxsize=max_queue)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.thread = None
+        self.running = False
+
+        self.lock = threading.Lock()
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        if not self.running:
+            return
+        self.running = False
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+    def submit(self, item: dict) -> bool:
+        if not self.running:
+            insert_history(item)
+            return True
+        try:
+            if self.policy == "block":
+                self.queue.put(item, timeout=self.block_timeout)
+            else:
+                self.queue.put_nowait(item)
+            return True
+        except Full:
+            with self.lock:
+                self.dropped += 1
+            return False
+
+    def submit_many(self, items: list):
+        for item in items:
+            self.submit(item)
+
+    def flush(self, timeout: float = 5.0):
+        # o ana kadar kuyruğa girenlerin yazılmasını bekle (/history okumadan önce)
+        if not self.running:
+            return
+        done = threading.Event()
+        self.queue.put(done)
+        done.wait(timeout)
+
+    def _run(self):
+        while True:
+            msg = self.queue.get()
+            batch, waiters, stop = [], [], False
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if msg is None:
+                    stop = True
+                    break
+                if isinstance(msg, threading.Event):
+                    waiters.append(msg)
+                    break
+                batch.append(msg)
+                if len(batch) >= self.batch_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    msg = self.queue.get(timeout=remaining)
+                except Empty:
+                    break
+
+            self._write(batch)
+            for done in waiters:
+                done.set()
+            if stop:
+                return
+
+    def _write(self, batch):
+        if not batch:
+            return
+        try:
+            insert_history_many(batch)
+        except Exception:
+            logging.getLogger(__name__).exception("history batch write failed (%d rows)", len(batch))
+            with self.lock:
+                self.failed += len(batch)
+            return
+        with self.lock:
+            self.written += len(batch)
+            self.batches += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "policy": self.policy,
+                "queue_depth": self.queue.qsize(),
+                "max_queue": self.queue.maxsize,
+                "flush_interval_ms": self.flush_interval * 1000,
+                "batch_size": self.batch_size,
+                "written": self.written,
+                "batches": self.batches,
+                "dropped": self.dropped,
+                "failed": self.failed,
+            }
+
+def time_range_filter(since: str = None, until: str = None):
+    # created_at yazma kilidi altında atandığı için (stamp_created_at) id ile aynı sırada artar: tarih sınırını
+    # created_at index'inde tek seek ile id sınırına çevir, tarama id sırasında kalsın
+    # (+created_at: planner'ın index'i alıp ORDER BY için sıralama yapmasını engeller)
+    where, params = [], []
+    if since is not None:
+        where.append("+created_at >= ?")
+        where.append("id >= (SELECT id FROM history WHERE created_at >= ? ORDER BY created_at, id LIMIT 1)")
+        params += [since, since]
+    if until is not None:
+        where.append("+created_at < ?")
+        where.append("id < COALESCE((SELECT id FROM history WHERE created_at >= ? ORDER BY created_at, id LIMIT 1), 9223372036854775807)")
+        params += [until, until]
+    return where, params
+
+def list_history(limit: int = 50, cursor: int = None, label: str = None,
+                 since: str = None, until: str = None, score_ranges: dict = None):
+    """
+    Keyset sayfalama: sonuçlar id DESC, cursor verilirse id < cursor olanlar gelir.
+    since/until created_at ile aynı ISO formatında (UTC) olmalı; since dahil, until hariç.
+    score_ranges: {"logreg_ai": (min, max), ...}; None olan sınır uygulanmaz.
+    """
+    where, params = [], []
+    if cursor is not None:
+        where.append("id < ?")
+        params.append(cursor)
+    if label is not None:
+        where.append("final_label = ?")
+        params.append(label)
+    time_where, time_params = time_range_filter(since, until)
+    where += time_where
+    params += time_params
+    # +column: skor index'i seçilip ORDER BY id için tüm eşleşenler sıralanmasın;
+    # tarama id DESC sırasında kalır, LIMIT dolunca durur (created_at ile aynı)
+    for column, (low, high) in (score_ranges or {}).items():
+        if column not in SCORE_COLUMNS:
+            raise ValueError(f"unknown score column: {column}")
+        if low is not None:
+            where.append(f"+{column} >= ?")
+            params.append(low)
+        if high is not None:
+            where.append(f"+{column} <= ?")
+            params.append(high)
+
+    sql = "SELECT * FROM history"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
 
-def list_history(limit: int = 50):
     conn = get_conn()
     cur = conn.cursor()
-    cur.execute("""
-    SELECT * FROM history
-    ORDER BY id DESC
-    LIMIT ?
-    """, (limit,))
+    cur.execute(sql, params)
     rows = [dict(r) for r in cur.fetchall()]
-    conn.close()
+    cur.close()
     return rows
 
-def clear_history():
+def iter_history(since_id: int = None, since: str = None, chunk_size: int = 1000):
+    """
+    Export için: id ASC sırasında satırları chunk_size'lık listeler halinde üretir.
+    Tek bir sunucu tarafı cursor + fetchmany; bellek kullanımı tablo boyutundan bağımsız.
+    Kendi bağlantısını açar (generator farklı thread'lerde ilerleyebilir).
+    """
+    where, params = time_range_filter(since=since)
+    if since_id is not None:
+        where.append("id > ?")
+        params.append(since_id)
+
+    sql = "SELECT * FROM history"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY id ASC"
+
+    conn = open_conn()
+    try:
+        cur = conn.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [dict(r) for r in rows]
+        cur.close()
+    finally:
+        conn.close()
+
+# ==== RETENTION / PARTITION ====
+
+def first_id_at_or_after(created_at: str):
     conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("DELETE FROM history")
-    conn.commit()
-    conn.close()
+    row = conn.execute(
+        "SELECT id FROM history WHERE created_at >= ? ORDER BY created_at, id LIMIT 1",
+        (created_at,),
+    ).fetchone()
+    return row[0] if row else None
+
+def max_history_id() -> int:
+    row = get_conn().execute("SELECT MAX(id) FROM history").fetchone()
+    return row[0] or 0
+
+def oldest_kept_id_for_rows(max_rows: int):
+    # en yeni max_rows satırın en küçük id'si; daha azı varsa None
+    row = get_conn().execute(
+        "SELECT id FROM history ORDER BY id DESC LIMIT 1 OFFSET ?", (max_rows - 1,)
+    ).fetchone()
+    return row[0] if row else None
+
+def delete_history_before(boundary_id: int, batch_size: int = 1000, pause: float = 0.01,
+                          stop_event=None) -> int:
+    """
+    id < boundary_id olan satırları batch_size'lık küçük transaction'larla siler;
+    aralarda pause kadar bekleyerek yazma kilidini /predict'e bırakır.
+    """
+    conn = get_conn()
+    deleted = 0
+    while stop_event is None or not stop_event.is_set():
+        with conn:
+            cur = conn.execute(
+                "DELETE FROM history WHERE id IN (SELECT id FROM history WHERE id < ? ORDER BY id LIMIT ?)",
+                (boundary_id, batch_size),
+            )
+        deleted += cur.rowcount
+        if cur.rowcount < batch_size:
+            break
+        time.sleep(pause)
+    return deleted
+
+def incremental_vacuum(pages: int = 0) -> int:
+    # auto_vacuum=INCREMENTAL: boş sayfaları dosyadan geri ver (0 = hepsi); tam VACUUM yok
+    conn = get_conn()
+    before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    # execute() bu pragma'yı tek adım çalıştırıp bir sayfa bırakıyor; executescript sonuna kadar koşar
+    conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+    after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return before - after
+
+def auto_vacuum_mode() -> int:
+    # 0 NONE, 1 FULL, 2 INCREMENTAL
+    return get_conn().execute("PRAGMA auto_vacuum").fetchone()[0]
+
+def enable_incremental_vacuum():
+    # eski DB'ler için tek seferlik dönüşüm: auto_vacuum ancak VACUUM ile değişir
+    conn = get_conn()
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("VACUUM")
+
+def partition_path(month: str) -> Path:
+    # month: "YYYY_MM"; ana DB'nin yanında ayrı dosya
+    return Path(DB_PATH).parent / f"history_{month}.sqlite3"
+
+def month_bounds(month: str):
+    year, mon = (int(x) for x in month.split("_"))
+    start = f"{year:04d}-{mon:02d}-01T00:00:00+00:00"
+    if mon == 12:
+        end = f"{year + 1:04d}-01-01T00:00:00+00:00"
+    else:
+        end = f"{year:04d}-{mon + 1:02d}-01T00:00:00+00:00"
+    return start, end
+
+def list_partitions():
+    folder = Path(DB_PATH).parent
+    months = sorted(p.stem[len("history_"):] for p in folder.glob("history_????_??.sqlite3"))
+    return [{"month": m, "path": str(partition_path(m)), "bytes": partition_path(m).stat().st_size} for m in months]
+
+def archive_month(month: str, batch_size: int = 1000, pause: float = 0.01, stop_event=None) -> int:
+    """
+    Bir ayın satırlarını ana tablodan history_YYYY_MM.sqlite3 dosyasına taşır.
+    Kopyalama INSERT OR IGNORE ile idempotent; yarıda kalırsa tekrar çalıştırılabilir.
+    Taşınan aylar /history ve /history/export'ta görünmez; drop_partition() ile anında silinir.
+    """
+    start, end = month_bounds(month)
+    lo = first_id_at_or_after(start)
+    if lo is None:
+        return 0
+    hi = first_id_at_or_after(end) or max_history_id() + 1
+    if hi <= lo:
+        return 0
+
+    # ATTACH thread-local bağlantıyı kirletmesin
+    conn = open_conn()
+    moved = 0
+    try:
+        conn.execute("ATTACH DATABASE ? AS part", (str(partition_path(month)),))
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS part.history (
+            id INTEGER PRIMARY KEY,
+            created_at TEXT NOT NULL,
+            text_preview TEXT NOT NULL,
+            text_len INTEGER NOT NULL,
+            final_label TEXT NOT NULL,
+            logreg_ai REAL,
+            svm_ai REAL,
+            nb_ai REAL
+        )
+        """)
+        while stop_event is None or not stop_event.is_set():
+            ids = [r[0] for r in conn.execute(
+                "SELECT id FROM main.history WHERE id >= ? AND id < ? AND created_at >= ? AND created_at < ? "
+                "ORDER BY id LIMIT ?",
+                (lo, hi, start, end, batch_size),
+            )]
+            if not ids:
+                break
+            marks = ",".join("?" * len(ids))
+            with conn:
+                conn.execute(f"INSERT OR IGNORE INTO part.history SELECT * FROM main.history WHERE id IN ({marks})", ids)
+                conn.execute(f"DELETE FROM main.history WHERE id IN ({marks})", ids)
+            moved += len(ids)
+            lo = ids[-1] + 1
+            time.sleep(pause)
+        conn.execute("DETACH DATABASE part")
+    finally:
+        conn.close()
+    return moved
+
+def drop_partition(month: str) -> bool:
+    # ayın tamamı tek dosyada: silmek anlık, ana tabloya dokunmaz
+    removed = False
+    base = partition_path(month)
+    for path in (base, Path(str(base) + "-wal"), Path(str(base) + "-shm")):
+        if path.exists():
+            path.unlink()
+            removed = True
+    return removed
+
+def month_key(year: int, month: int) -> str:
+    return f"{year:04d}_{month:02d}"
+
+def months_between(first_created_at: str, last_month_exclusive: str):
+    # first_created_at'in ayından last_month_exclusive'e ("YYYY_MM") kadar olan aylar
+    year, mon = int(first_created_at[:4]), int(first_created_at[5:7])
+    end_year, end_mon = (int(x) for x in last_month_exclusive.split("_"))
+    months = []
+    while (year, mon) < (end_year, end_mon):
+        months.append(month_key(year, mon))
+        mon += 1
+        if mon > 12:
+            year, mon = year + 1, 1
+    return months
+
+def oldest_history_created_at():
+    row = get_conn().execute("SELECT created_at FROM history ORDER BY id LIMIT 1").fetchone()
+    return row[0] if row else None
+
+def clear_history():
+    # tek büyük DELETE yerine küçük batch'ler; sonra boşalan sayfaları geri ver
+    delete_history_before(max_history_id() + 1, batch_size=5000, pause=0)
+    incremental_vacuum()
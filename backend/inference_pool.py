@@ -0,0 +1,143 @@
+# inference_pool.py
+"""
+Skorlamayı önceden ısıtılmış worker süreçlerinde çalıştırır (INFERENCE_BACKEND=process).
+
+Tokenizasyon ve sayım saf Python; GIL'i tuttuğu için threadpool'daki eşzamanlı
+istekler birbirini bekler. Havuzdaki her süreç bundle'ı bir kez mmap ile açar
+(diziler page cache'ten paylaşılır, N süreç = tek kopya) ve iş almadan önce ısınır.
+
+Süreçler arası taşınan: gidişte metin listesi, dönüşte tek bir (model, n, 2)
+float dizisi (dict yerine tek pickle buffer'ı). Büyük batch'ler worker sayısı
+kadar parçaya bölünüp paralel skorlanır.
+
+Havuz kapatıldıktan sonra gelen (reload sırasında eski modeli tutan) istekler
+süreç içindeki ensemble ile skorlanır; istek hata almaz.
+"""
+import multiprocessing as mp
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# bu boyutun üstündeki batch'ler worker'lara bölünür
+SPLIT_MIN_TEXTS = 64
+WORKER_START_TIMEOUT_S = 120
+
+_ensemble = None  # worker süreci başına bir kez yüklenir
+
+
+def _init_worker(bundle_dir, mmap_mode, warmup_texts, barrier):
+    global _ensemble
+    # Ctrl+C / SIGINT ana süreçte (uvicorn) karşılanır
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    from ensemble import FusedEnsemble
+
+    _ensemble = FusedEnsemble.load_bundle(bundle_dir, mmap_mode=mmap_mode)
+    _ensemble.predict_proba(list(warmup_texts))
+    _ensemble.predict_proba(list(warmup_texts) * 4)  # sparse yol da ısınsın
+    # hiçbir worker, hepsi ısınmadan iş almaz: start() döndüğünde havuz tamamen hazır
+    barrier.wait(timeout=WORKER_START_TIMEOUT_S)
+
+
+def _score(texts, cascade_margin, timed=False):
+    timings = {} if timed else None
+    if cascade_margin is None:
+        probas = _ensemble.predict_proba(texts, timings)
+    else:
+        probas = _ensemble.predict_proba_cascade(texts, cascade_margin, timings)
+    names = _ensemble.model_names
+    return names, np.stack([probas[name] for name in names]), timings
+
+
+def _ping():
+    return os.getpid()
+
+
+class InferencePool:
+    def __init__(self, bundle_dir, workers: int, fallback, mmap_mode="r", warmup_texts=()):
+        self.bundle_dir = str(bundle_dir)
+        self.workers = max(1, workers)
+        self.fallback = fallback  # süreç içi FusedEnsemble
+        self.mmap_mode = mmap_mode
+        self.warmup_texts = list(warmup_texts)
+        self.lock = threading.Lock()
+        self.executor = None
+        self.tasks = 0
+        self.fallbacks = 0
+
+    @property
+    def running(self) -> bool:
+        return self.executor is not None
+
+    def start(self):
+        with self.lock:
+            if self.executor is not None:
+                return
+            # spawn: uvicorn süreci thread'li, fork kilit kopyalayabilir; Windows'ta da aynı davranış
+            ctx = mp.get_context("spawn")
+            executor = ProcessPoolExecutor(
+                self.workers,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(self.bundle_dir, self.mmap_mode, self.warmup_texts, ctx.Barrier(self.workers)),
+            )
+            # worker sayısı kadar eşzamanlı iş: boşta worker olmadığından her submit bir süreç açar
+            try:
+                for f in [executor.submit(_ping) for _ in range(self.workers)]:
+                    f.result()
+            except Exception:
+                # bundle açılamadı / ısınma patladı: yarım havuz bırakma
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+            self.executor = executor
+
+    def shutdown(self, wait: bool = False):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            # kuyruktaki işler tamamlanır, yenileri fallback'e düşer
+            executor.shutdown(wait=wait)
+
+    def predict_proba(self, texts, cascade_margin=None, timings=None):
+        # timings: worker'larda ölçülen aşama süreleri toplanır (bölünen batch'te parça toplamı)
+        executor = self.executor
+        if not texts:
+            return self.fallback.predict_proba(texts)
+        if executor is None:
+            return self._local(texts, cascade_margin, timings)
+        n_parts = min(self.workers, len(texts) // SPLIT_MIN_TEXTS) or 1
+        bounds = np.linspace(0, len(texts), n_parts + 1).astype(int)
+        try:
+            futures = [
+                executor.submit(_score, texts[lo:hi], cascade_margin, timings is not None)
+                for lo, hi in zip(bounds[:-1], bounds[1:])
+            ]
+        except RuntimeError:
+            # havuz bu arada kapatıldı (reload / rollback)
+            return self._local(texts, cascade_margin, timings)
+        self.tasks += len(futures)
+        parts = [f.result() for f in futures]
+        names = parts[0][0]
+        stacked = np.concatenate([arr for _, arr, _ in parts], axis=1)
+        if timings is not None:
+            for _, _, part in parts:
+                for key, seconds in part.items():
+                    timings[key] = timings.get(key, 0.0) + seconds
+        return {name: stacked[i] for i, name in enumerate(names)}
+
+    def _local(self, texts, cascade_margin, timings=None):
+        self.fallbacks += 1
+        if cascade_margin is None:
+            return self.fallback.predict_proba(texts, timings)
+        return self.fallback.predict_proba_cascade(texts, cascade_margin, timings)
+
+    def stats(self) -> dict:
+        return {
+            "backend": "process",
+            "workers": self.workers,
+            "running": self.running,
+            "tasks": self.tasks,
+            "fallbacks": self.fallbacks,
+        }
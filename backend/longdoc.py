@@ -0,0 +1,130 @@
+# longdoc.py
+"""
+Uzun metinleri örtüşen pencerelere bölüp skorlamak için yardımcılar.
+
+WindowChunker metni parça parça alır (upload stream'i gibi) ve en fazla
+window_chars uzunluğunda, overlap_chars kadar örtüşen pencereler üretir; kesimler
+mümkünse boşlukta yapılır. Tampon bir okuma konumuyla (pos) tüketilir, kesim başına
+kopyalanmaz; tüketilmiş baş kısım ancak tamponun yarısını geçince atılır (toplam iş
+metin uzunluğunda doğrusal). Tek parça halinde gelen büyük metinler text_slices ile
+sınırlı parçalara bölünerek verilmeli: feed() bir parçanın bütün pencerelerini döndürür.
+
+LongDocAggregator pencere skorlarını toplar: model başına uzunluk ağırlıklı
+ortalama, en yüksek AI yüzdesi ve AI çıkan pencere oranı. Segment listesi
+max_segments ile sınırlıdır; özet her zaman tüm pencereler üzerinden hesaplanır.
+"""
+
+
+class WindowChunker:
+    def __init__(self, window_chars: int = 1500, overlap_chars: int = 300):
+        if window_chars <= 0 or not 0 <= overlap_chars < window_chars:
+            raise ValueError("0 <= overlap_chars < window_chars olmalı")
+        self.window = window_chars
+        self.overlap = overlap_chars
+        self.buf = ""
+        self.pos = 0           # buf'ta henüz tüketilmemiş kısmın başı
+        self.buf_start = 0     # buf[pos]'un belgedeki konumu
+        self.emitted_until = 0 # son pencerenin bitişi
+        self.total_chars = 0
+
+    def feed(self, text: str):
+        # (start, end, pencere) listesi
+        self.total_chars += len(text)
+        if self.pos * 2 > len(self.buf):
+            # tüketilmiş baş kısmı at (kopya, kalan kısım kadar)
+            self.buf, self.pos = self.buf[self.pos:], 0
+        self.buf += text
+        out = []
+        while len(self.buf) - self.pos > self.window:
+            out.append(self._cut())
+        return out
+
+    def finish(self):
+        # kalan metin önceki pencerenin örtüşmesinden ibaret değilse son pencere
+        rest = self.buf[self.pos:]
+        self.buf, self.pos = "", 0
+        end = self.buf_start + len(rest)
+        if end > self.emitted_until and rest.strip():
+            self.emitted_until = end
+            return [(self.buf_start, end, rest)]
+        return []
+
+    def _cut(self):
+        buf, pos, window = self.buf, self.pos, self.window
+        # pencerenin ikinci yarısındaki son boşlukta kes; yoksa sert kes (konumlar pos'a göre)
+        cut = buf.rfind(" ", pos + window // 2, pos + window)
+        for sep in ("\n", "\t"):
+            cut = max(cut, buf.rfind(sep, pos + window // 2, pos + window))
+        cut = cut - pos if cut > pos else window
+        segment = (self.buf_start, self.buf_start + cut, buf[pos:pos + cut])
+        self.emitted_until = self.buf_start + cut
+
+        # sonraki pencere, kesimden overlap kadar önce, kelime başında başlar
+        start = cut - self.overlap
+        if self.overlap:
+            space = buf.find(" ", pos + start, pos + cut)
+            start = space - pos + 1 if space >= 0 else start
+        start = max(start, 1)
+        self.pos += start
+        self.buf_start += start
+        return segment
+
+
+def text_slices(text: str, size: int = 1 << 16):
+    # tek parça halinde gelen metni (JSON gövdesi) stream'deki gibi sınırlı parçalara böl
+    for i in range(0, len(text), size):
+        yield text[i:i + size]
+
+
+class LongDocAggregator:
+    def __init__(self, max_segments: int = 1000):
+        self.max_segments = max_segments
+        self.segments = []
+        self.n_segments = 0
+        self.weights = {}  # model -> çalıştığı pencerelerin toplam uzunluğu (kaskadda farklı)
+        self.sums = {}     # model -> uzunluk ağırlıklı ai_pct toplamı
+        self.max_ai = {}   # model -> en yüksek ai_pct
+        self.ai_segments = 0
+        self.first_preview = None
+
+    def add(self, windows, preds_list, vote):
+        # windows: [(start, end, text)], preds_list: score_texts() çıktısındaki preds'ler
+        for (start, end, text), preds in zip(windows, preds_list):
+            length = end - start
+            label = vote(preds)
+            self.n_segments += 1
+            if label == "ai":
+                self.ai_segments += 1
+            if self.first_preview is None:
+                self.first_preview = text
+            for p in preds:
+                self.weights[p["model"]] = self.weights.get(p["model"], 0) + length
+                self.sums[p["model"]] = self.sums.get(p["model"], 0.0) + p["ai_pct"] * length
+                self.max_ai[p["model"]] = max(self.max_ai.get(p["model"], 0.0), p["ai_pct"])
+            if len(self.segments) < self.max_segments:
+                self.segments.append({
+                    "start": start,
+                    "end": end,
+                    "label": label,
+                    "predictions": [{"model": p["model"], "ai_pct": p["ai_pct"]} for p in preds],
+                })
+
+    def aggregate_preds(self):
+        preds = []
+        for model, total in self.sums.items():
+            ai_pct = round(total / self.weights[model], 2) if self.weights[model] else 0.0
+            preds.append({
+                "model": model,
+                "ai_pct": ai_pct,
+                "human_pct": round(100.0 - ai_pct, 2),
+                "max_segment_ai_pct": self.max_ai[model],
+            })
+        return preds
+
+    def result(self):
+        return {
+            "n_segments": self.n_segments,
+            "ai_segment_ratio": round(self.ai_segments / self.n_segments, 4) if self.n_segments else 0.0,
+            "segments": self.segments,
+            "segments_truncated": self.n_segments > len(self.segments),
+        }
@@ -1,84 +1,512 @@
 # main.py
-from fastapi import FastAPI
+from fastapi import FastAPI, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from typing import List, Optional
 from pathlib import Path
-import joblib
+import os
+import sys
+import csv
+import io
+import json
+import codecs
+import asyncio
+import tempfile
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
-from db import init_db, insert_history, list_history, clear_history
+from db import (
+    init_db, insert_history, insert_history_many, list_history, iter_history, clear_history,
+    close_all_conns, list_partitions, HistoryWriter, set_write_observer,
+)
+from batcher import MicroBatcher
+from cache import PredictionCache
+from retention import RetentionWorker
+from warmup import ModelWarmup
+from longdoc import WindowChunker, LongDocAggregator, text_slices
+from upload import READERS, DuplexStreamingResponse, SpoolPipe, detect_format
+from inference_pool import InferencePool
+from admission import AdmissionController, AdmissionMiddleware, AdmissionRejected
+from metrics import Metrics, MetricsMiddleware
+from shadow import ShadowEvaluator, list_results as list_shadow_results
 
 app = FastAPI(title="HumanOrAI API")
 
 # ==== MODEL PATHS ====
-BASE_DIR = Path(__file__).resolve().parents[2]  # HumanOrAI/
-MODELS_DIR = BASE_DIR / "ml" / "models"
+BASE_DIR = Path(__file__).resolve().parents[1]  # HumanOrAI/
+MODELS_DIR = Path(os.getenv("MODELS_DIR") or BASE_DIR / "ml" / "models")
+ML_SRC_DIR = BASE_DIR / "ml" / "src"
 
+# fused ensemble ve bundle formatı ml/src/ensemble.py'de
+sys.path.insert(0, str(ML_SRC_DIR))
+from ensemble import FusedEnsemble, majority_vote, cascade_vote
+import model_registry
+from reloader import ModelReloader
+
+REGISTRY_DIR = MODELS_DIR / "registry"
+ENSEMBLE_DIR = MODELS_DIR / "ensemble_bundle"
 LOGREG_PATH = MODELS_DIR / "logreg.joblib"
 SVM_PATH = MODELS_DIR / "svm_calibrated.joblib"
 NB_PATH = MODELS_DIR / "multinomial_nb.joblib"
 
-# modeller (pipeline olmalı: vectorizer + model)
-logreg = None
-svm = None
-nb = None
+class ServingModel:
+    # ensemble + sürüm tek nesne: hot reload'da ikisi birlikte, tek atamayla değişir
+    def __init__(self, ensemble, version, source, info=None, bundle_dir=None):
+        self.ensemble = ensemble  # tek TF-IDF geçişiyle logreg + svm_calibrated + multinomial_nb
+        self.version = version    # registry sürümü ya da artifact hash'i; cache anahtarına girer
+        self.source = source      # registry | bundle | pipelines
+        self.info = info or {}
+        self.bundle_dir = bundle_dir  # process havuzu bu dizini mmap'ler
+        self.pool = None              # INFERENCE_BACKEND=process ise InferencePool
+
+    def predict_proba(self, texts, cascade_margin=None, timings=None):
+        if self.pool is not None:
+            return self.pool.predict_proba(texts, cascade_margin, timings)
+        if cascade_margin is not None:
+            return self.ensemble.predict_proba_cascade(texts, cascade_margin, timings)
+        return self.ensemble.predict_proba(texts, timings)
+
+    def describe(self):
+        return {
+            "version": self.version,
+            "source": self.source,
+            "models": self.ensemble.model_names,
+            "created_at": self.info.get("created_at"),
+            "metrics": self.info.get("metrics", []),
+            "inference": self.pool.stats() if self.pool is not None else {"backend": "thread"},
+        }
+
+serving = None
+
+MAX_BATCH_ITEMS = 5000
+
+# /predict tek geçişte skorlar; daha uzun metinler /predict/long'a (pencereli, stream)
+PREDICT_MAX_CHARS = int(os.getenv("PREDICT_MAX_CHARS", "100000"))
+PREDICT_BATCH_MAX_CHARS = int(os.getenv("PREDICT_BATCH_MAX_CHARS", "5000000"))
+LONGDOC_WINDOW_CHARS = int(os.getenv("LONGDOC_WINDOW_CHARS", "1500"))
+LONGDOC_OVERLAP_CHARS = int(os.getenv("LONGDOC_OVERLAP_CHARS", "300"))
+LONGDOC_BATCH_WINDOWS = int(os.getenv("LONGDOC_BATCH_WINDOWS", "64"))
+LONGDOC_MAX_SEGMENTS = int(os.getenv("LONGDOC_MAX_SEGMENTS", "1000"))
+LONGDOC_MAX_CHARS = int(os.getenv("LONGDOC_MAX_CHARS", "50000000"))
+# JSON gövde ({"text": ...}) json.loads için bütün olarak okunur: bayt sınırı okurken uygulanır.
+# Varsayılan: LONGDOC_MAX_CHARS + kaçış payı (\n, \", \uXXXX); çok büyük ya da ASCII dışı
+# karakteri bol belgeler text/plain ile stream edilmeli
+LONGDOC_MAX_JSON_BYTES = int(os.getenv(
+    "LONGDOC_MAX_JSON_BYTES", str(2 * LONGDOC_MAX_CHARS + 1024 if LONGDOC_MAX_CHARS else 0)
+))
+
+# /predict/upload: CSV/JSONL gövde satır satır okunur, NDJSON sonuç akıtılır
+UPLOAD_BATCH_ROWS = int(os.getenv("UPLOAD_BATCH_ROWS", "256"))
+UPLOAD_MAX_RECORD_CHARS = int(os.getenv("UPLOAD_MAX_RECORD_CHARS", "1000000"))
+UPLOAD_SPOOL_MAX_MEMORY = int(os.getenv("UPLOAD_SPOOL_MAX_MEMORY", str(8 << 20)))
+
+# /explain: model başına en çok katkı yapan terimler (top_k varsayılanı / üst sınırı)
+EXPLAIN_TOP_K = int(os.getenv("EXPLAIN_TOP_K", "10"))
+EXPLAIN_MAX_TOP_K = int(os.getenv("EXPLAIN_MAX_TOP_K", "100"))
+
+# modeller arka planda yüklenip ısıtılır; /ready o zamana kadar 503 döner.
+# MODEL_LOAD_BLOCKING=1: eski davranış, startup yükleme bitene kadar bekler
+MODEL_LOAD_BLOCKING = os.getenv("MODEL_LOAD_BLOCKING", "0") == "1"
+WARMUP_TEXTS = [
+    "",
+    "We propose a simple baseline.",
+    "In this paper we study the problem of detecting machine generated abstracts. "
+    "Our experiments on several benchmark datasets show consistent improvements over prior work.",
+]
+warmup = ModelWarmup()
+
+# thread: skorlama istek thread'inde (varsayılan). process: önceden ısıtılmış
+# INFERENCE_WORKERS süreçlik havuzda (inference_pool.py), GIL paylaşılmaz
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0")) or os.cpu_count() or 1
+
+# bundle dizileri mmap ile açılır: N worker aynı page cache kopyasını paylaşır ("" = RAM'e kopyala)
+MODEL_MMAP_MODE = os.getenv("MODEL_MMAP_MODE", "r") or None
+
+# opt-in kaskad: ucuz modeller önce; çoğunluk kesinleşince (ya da ortalama olasılık
+# 0.5'ten CASCADE_MARGIN kadar uzaksa) kalan modeller çalışmaz. Yanıtta models_run
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "0") == "1"
+CASCADE_MARGIN = float(os.getenv("CASCADE_MARGIN", "0"))
+FINAL_RULE = "cascade" if CASCADE_ENABLED else "majority_vote"
+
+# opt-in: eşzamanlı /predict çağrılarını tek vektörize geçişte topla
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "0") == "1"
+MICROBATCH_WINDOW_MS = float(os.getenv("MICROBATCH_WINDOW_MS", "3"))
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "64"))
+batcher = None
+
+# aynı metin tekrar tekrar geliyor: sonuçları normalize metin + model sürümüyle sakla
+PREDICT_CACHE_SIZE = int(os.getenv("PREDICT_CACHE_SIZE", "10000"))
+PREDICT_CACHE_TTL = float(os.getenv("PREDICT_CACHE_TTL", "3600"))
+predict_cache = PredictionCache(PREDICT_CACHE_SIZE, PREDICT_CACHE_TTL) if PREDICT_CACHE_SIZE > 0 else None
+
+# kabul kontrolü (admission.py): eşzamanlı skorlama sınırı + süreli, sınırlı bekleme kuyruğu.
+# Aşılırsa 429 + Retry-After; gövde sınırı aşılırsa 413 (Content-Length varsa gövde okunmadan,
+# chunked gövdede sınır aşıldığı anda).
+# ADMISSION_MAX_IN_FLIGHT=0: sınırsız (sadece gövde boyutu kontrolü)
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv(
+    "ADMISSION_MAX_IN_FLIGHT",
+    str(max(4 * (os.cpu_count() or 1), MICROBATCH_MAX_SIZE if MICROBATCH_ENABLED else 0)),
+))
+ADMISSION_QUEUE_SIZE = int(os.getenv("ADMISSION_QUEUE_SIZE", "64"))
+ADMISSION_QUEUE_TIMEOUT_MS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", "2000"))
+ADMISSION_MAX_BODY_BYTES = int(os.getenv("ADMISSION_MAX_BODY_BYTES", str(16 << 20)))
+admission = AdmissionController(
+    ADMISSION_MAX_IN_FLIGHT, ADMISSION_QUEUE_SIZE, ADMISSION_QUEUE_TIMEOUT_MS / 1000.0, ADMISSION_MAX_BODY_BYTES,
+)
+# /predict/long ve /predict/upload gövdeyi stream eder; boyut sınırları uçların içinde
+# (LONGDOC_MAX_CHARS, UPLOAD_MAX_RECORD_CHARS), ADMISSION_MAX_BODY_BYTES onlara uygulanmaz.
+# Slotu istek boyunca değil, her skorlama grubu için alırlar (score_admitted)
+app.add_middleware(
+    AdmissionMiddleware,
+    controller=admission,
+    paths=["/predict", "/predict/batch", "/explain"],
+    stream_paths=["/predict/long", "/predict/upload"],
+)
+
+# /metrics (Prometheus text) + aşama süreleri için Server-Timing header'ı (metrics.py).
+# METRICS_ENABLED=0: ölçüm kodu hiç çalışmaz, /metrics 404
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "1") == "1"
+metrics = Metrics() if METRICS_ENABLED else None
+if metrics is not None:
+    # en dışta: admission'ın 429/413'leri de sayılır
+    app.add_middleware(MetricsMiddleware, metrics=metrics, server_timing=SERVER_TIMING_ENABLED)
+
+# history yazımları istek yolundan çıkarılır (HistoryWriter docstring'inde drop/block politikası)
+HISTORY_WRITE_BEHIND = os.getenv("HISTORY_WRITE_BEHIND", "1") == "1"
+HISTORY_QUEUE_SIZE = int(os.getenv("HISTORY_QUEUE_SIZE", "10000"))
+HISTORY_FLUSH_INTERVAL_MS = float(os.getenv("HISTORY_FLUSH_INTERVAL_MS", "500"))
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "500"))
+HISTORY_QUEUE_POLICY = os.getenv("HISTORY_QUEUE_POLICY", "drop")
+history_writer = None
+
+# gölge değerlendirme (shadow.py): registry'deki aday sürüm /predict girdilerinin
+# SHADOW_SAMPLE_RATE kadarıyla arka planda skorlanır, sonuçlar ayrı SQLite dosyasına.
+# SHADOW_MODEL_VERSION boşsa kapalı
+SHADOW_MODEL_VERSION = os.getenv("SHADOW_MODEL_VERSION", "")
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0.05"))
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "256"))
+SHADOW_BATCH_SIZE = int(os.getenv("SHADOW_BATCH_SIZE", "32"))
+SHADOW_FLUSH_INTERVAL_MS = float(os.getenv("SHADOW_FLUSH_INTERVAL_MS", "1000"))
+SHADOW_MAX_DUTY = float(os.getenv("SHADOW_MAX_DUTY", "0.1"))
+SHADOW_DB_PATH = Path(os.getenv("SHADOW_DB_PATH") or Path(__file__).resolve().parent / "data" / "shadow.sqlite3")
+shadow = None
+
+# saklama politikası (retention.py); hepsi 0 ise arka plan görevi çalışmaz
+retention = RetentionWorker(
+    max_age_days=float(os.getenv("HISTORY_MAX_AGE_DAYS", "0")),
+    max_rows=int(os.getenv("HISTORY_MAX_ROWS", "0")),
+    partition_keep_months=int(os.getenv("HISTORY_PARTITION_KEEP_MONTHS", "0")),
+    interval=float(os.getenv("HISTORY_RETENTION_INTERVAL_S", "300")),
+    batch_size=int(os.getenv("HISTORY_PURGE_BATCH", "1000")),
+)
 
 class PredictRequest(BaseModel):
     text: str
 
+class BatchItem(BaseModel):
+    text: str
+    id: Optional[str] = None
+
+class PredictBatchRequest(BaseModel):
+    items: List[BatchItem]
+
 def pct(x: float) -> float:
     return round(float(x) * 100.0, 2)
 
-def majority_vote(preds):
-    # preds: [{"model": "...", "ai_pct": 12.3, ...}]
-    votes_ai = sum(1 for p in preds if p["ai_pct"] >= 50.0)
-    return "ai" if votes_ai >= 2 else "human"
+def load_pipelines(status):
+    import joblib  # sadece eski model klasöründe gerekiyor
+
+    paths = {"logreg": LOGREG_PATH, "svm_calibrated": SVM_PATH, "multinomial_nb": NB_PATH}
+
+    def load(name):
+        with status.step(f"load:{name}"):
+            model = joblib.load(paths[name])
+        status.set_model(name, "loaded")
+        return name, model
+
+    # üç pipeline paralel okunur (dosya I/O + numpy dizileri GIL dışında)
+    with ThreadPoolExecutor(max_workers=len(paths)) as pool:
+        models = dict(pool.map(load, paths))
+    with status.step("fuse"):
+        loaded = FusedEnsemble.from_models(models)
+    return loaded, model_registry.artifact_version(paths.values())
+
+def warm_up(loaded, status):
+    # ilk gerçek istekten önce analyzer, sparse yollar ve mmap sayfaları ısınsın
+    with status.step("warmup"):
+        probas = loaded.predict_proba(WARMUP_TEXTS)
+    for name, proba in probas.items():
+        ok = (
+            proba.shape == (len(WARMUP_TEXTS), 2)
+            and bool(np.isfinite(proba).all())
+            and bool(np.allclose(proba.sum(axis=1), 1.0))
+        )
+        status.set_model(name, "ready" if ok else "failed")
+        if not ok:
+            raise RuntimeError(f"warm-up check failed for {name}")
+
+def load_serving_model(version, status):
+    # version=None: registry/CURRENT, yoksa ensemble_bundle, yoksa üç pipeline
+    status.set_state("loading")
+    if version is None:
+        version = model_registry.read_current(REGISTRY_DIR)
+
+    info = None
+    bundle_dir = None
+    if version is not None:
+        with status.step("verify"):
+            info = model_registry.verify(REGISTRY_DIR, version)
+        with status.step(f"load:{version}"):
+            loaded = model_registry.load_version(REGISTRY_DIR, version, mmap_mode=MODEL_MMAP_MODE, check=False)
+        source = "registry"
+        bundle_dir = model_registry.version_dir(REGISTRY_DIR, version)
+    elif (ENSEMBLE_DIR / "manifest.json").exists():
+        with status.step("load:ensemble_bundle"):
+            loaded = FusedEnsemble.load_bundle(ENSEMBLE_DIR, mmap_mode=MODEL_MMAP_MODE)
+            version = model_registry.artifact_version(sorted(ENSEMBLE_DIR.iterdir()))
+        source = "bundle"
+        bundle_dir = ENSEMBLE_DIR
+    else:
+        # eski model klasörü: üç pipeline'dan fused ensemble'ı burada kur
+        loaded, version = load_pipelines(status)
+        source = "pipelines"
+    for name in loaded.model_names:
+        status.set_model(name, "loaded")
+
+    status.set_state("warming")
+    warm_up(loaded, status)
+    model = ServingModel(loaded, version, source, info, bundle_dir)
+
+    if INFERENCE_BACKEND == "process":
+        if model.bundle_dir is None:
+            # pipeline'lardan kurulan ensemble worker'lara bundle olarak verilir
+            model.bundle_dir = Path(tempfile.mkdtemp(prefix="humanorai_bundle_"))
+            loaded.save_bundle(model.bundle_dir)
+        model.pool = InferencePool(
+            model.bundle_dir, INFERENCE_WORKERS, loaded,
+            mmap_mode=MODEL_MMAP_MODE, warmup_texts=WARMUP_TEXTS,
+        )
+        with status.step("pool"):
+            model.pool.start()
+    return model
+
+def activate_model(model):
+    global serving
+    if model.pool is not None:
+        model.pool.start()  # rollback: önceki modelin havuzu kapatılmıştı
+    previous, serving = serving, model
+    if previous is not None and previous.pool is not None and previous is not model:
+        # eski süreçler kuyruktaki işleri bitirip kapanır; geç kalan istekler süreç içinde skorlanır
+        previous.pool.shutdown()
+    # eski sürümün cache kayıtları artık okunmaz (anahtarda sürüm var); yer açılsın
+    if predict_cache is not None:
+        predict_cache.invalidate()
+    return previous
+
+# hot reload: POST /models/reload ya da registry/CURRENT değişikliği (MODEL_WATCH_INTERVAL_S > 0)
+MODEL_WATCH_INTERVAL_S = float(os.getenv("MODEL_WATCH_INTERVAL_S", "0"))
+reloader = ModelReloader(REGISTRY_DIR, load_serving_model, activate_model, MODEL_WATCH_INTERVAL_S)
+
+def load_models(status):
+    global batcher
+    model = load_serving_model(None, status)
+    activate_model(model)
+    reloader.set_active(model)
+    reloader.start()
+
+    if MICROBATCH_ENABLED:
+        batcher = MicroBatcher(
+            score_texts,
+            window_ms=MICROBATCH_WINDOW_MS,
+            max_batch_size=MICROBATCH_MAX_SIZE,
+        )
+        batcher.start()
+    status.set_state("ready")
+
+def observe_history_write(seconds, rows, failed):
+    metrics.stage("history_insert", seconds)
+    if failed:
+        metrics.inc("errors_total", stage="history_insert")
+    else:
+        metrics.inc("history_rows_written_total", rows)
+
+def collect_component_metrics():
+    # diğer bileşenlerin stats() değerleri scrape anında okunur
+    adm = admission.stats()
+    out = [
+        ("admission_in_flight", "gauge", "Admitted requests being processed", [({}, adm["in_flight"])]),
+        ("admission_waiting", "gauge", "Requests waiting in the admission queue", [({}, adm["waiting"])]),
+        ("admission_rejected_total", "counter", "Rejected requests by reason",
+         [({"reason": reason}, n) for reason, n in sorted(adm["rejected"].items())]),
+    ]
+    if history_writer is not None:
+        hw = history_writer.stats()
+        out += [
+            ("history_queue_depth", "gauge", "History records waiting to be written", [({}, hw["queue_depth"])]),
+            ("history_dropped_total", "counter", "History records dropped on a full queue", [({}, hw["dropped"])]),
+        ]
+    if shadow is not None:
+        ss = shadow.stats()
+        out += [
+            ("shadow_queue_depth", "gauge", "Shadow samples waiting to be scored", [({}, ss["queue_depth"])]),
+            ("shadow_samples_total", "counter", "Shadow samples by outcome",
+             [({"outcome": key}, ss[key]) for key in ("sampled", "shed", "not_ready", "scored", "failed")]),
+            ("shadow_agreement_ratio", "gauge", "Share of shadow samples where candidate and production labels agree",
+             [({"candidate": ss["candidate_version"] or ""}, ss["agreement"])]),
+        ]
+    if predict_cache is not None:
+        cs = predict_cache.stats()
+        out += [
+            ("cache_entries", "gauge", "Prediction cache entries", [({}, cs["size"])]),
+            ("cache_lookups_total", "counter", "Prediction cache lookups by result",
+             [({"result": key}, cs[key]) for key in ("hits", "misses", "coalesced")]),
+        ]
+    return out
+
+if metrics is not None:
+    metrics.add_collector(collect_component_metrics)
+    set_write_observer(observe_history_write)
+
+def load_shadow_candidate():
+    # aday üretim modeliyle aynı şekilde (checksum kontrolü + mmap) yüklenir
+    ensemble = model_registry.load_version(REGISTRY_DIR, SHADOW_MODEL_VERSION, mmap_mode=MODEL_MMAP_MODE)
+    return ensemble, SHADOW_MODEL_VERSION
+
+def start_shadow():
+    global shadow
+    if not SHADOW_MODEL_VERSION or SHADOW_SAMPLE_RATE <= 0:
+        return
+    # aday üretimle aynı kuralla oylanır: kaskad etiketi majority_vote ile karşılaştırılmasın
+    shadow = ShadowEvaluator(
+        load_shadow_candidate, cascade_vote if CASCADE_ENABLED else majority_vote, SHADOW_DB_PATH,
+        sample_rate=SHADOW_SAMPLE_RATE,
+        max_queue=SHADOW_QUEUE_SIZE,
+        batch_size=SHADOW_BATCH_SIZE,
+        flush_interval=SHADOW_FLUSH_INTERVAL_MS / 1000.0,
+        max_duty=SHADOW_MAX_DUTY,
+        cascade_margin=CASCADE_MARGIN if CASCADE_ENABLED else None,
+    )
+    shadow.start()
 
 @app.on_event("startup")
 def startup():
-    global logreg, svm, nb
+    global history_writer
     init_db()
-    # modelleri yükle
-    logreg = joblib.load(LOGREG_PATH)
-    svm = joblib.load(SVM_PATH)
-    nb = joblib.load(NB_PATH)
+    if HISTORY_WRITE_BEHIND:
+        history_writer = HistoryWriter(
+            max_queue=HISTORY_QUEUE_SIZE,
+            flush_interval=HISTORY_FLUSH_INTERVAL_MS / 1000.0,
+            batch_size=HISTORY_BATCH_SIZE,
+            policy=HISTORY_QUEUE_POLICY,
+        )
+        history_writer.start()
+    retention.start()
+    start_shadow()
+
+    if MODEL_LOAD_BLOCKING:
+        warmup.run(load_models)
+    else:
+        warmup.start(load_models)
+
+@app.on_event("shutdown")
+def shutdown():
+    warmup.wait(timeout=30)
+    reloader.stop()
+    if serving is not None and serving.pool is not None:
+        serving.pool.shutdown(wait=True)
+    if batcher is not None:
+        batcher.stop()
+    if shadow is not None:
+        shadow.stop()
+    # kuyrukta bekleyen history kayıtlarını yazmadan kapanma
+    retention.stop()
+    if history_writer is not None:
+        history_writer.stop()
+    close_all_conns()
 
 @app.get("/health")
 def health():
-    return {"ok": True}
+    # liveness: süreç ayakta; trafik için /ready'ye bakılmalı
+    return {"ok": True, "ready": warmup.ready}
 
-@app.post("/predict")
-def predict(req: PredictRequest):
-    text = req.text.strip()
-    if not text:
-        return {"error": "text empty"}
+@app.get("/ready")
+def ready(response: Response):
+    stats = warmup.stats()
+    if not stats["ready"]:
+        response.status_code = 503
+    return {**stats, "model_version": current_version()}
 
-    # predict_proba -> [human, ai] gibi gelecek varsaydım
-    # Eğer sıralama farklıysa düzeltiriz (label encoder vs.)
-    preds = []
+def current_version():
+    model = serving
+    return model.version if model is not None else None
 
-    for name, model in [("logreg", logreg), ("svm_calibrated", svm), ("multinomial_nb", nb)]:
-        proba = model.predict_proba([text])[0]
-        # burada class order kontrolü:
-        # model.classes_ örn: ['ai','human'] olabilir. ona göre ai index buluyoruz.
-        classes = list(model.classes_)
-        ai_idx = classes.index("ai") if "ai" in classes else 1
-        human_idx = classes.index("human") if "human" in classes else 0
+def not_ready(response: Response):
+    response.status_code = 503
+    return {"error": "models not ready"}
 
-        ai_p = proba[ai_idx]
-        human_p = proba[human_idx]
+def score_texts(texts, model=None):
+    # tüm metinler tek sparse matris + model başına tek predict_proba
+    # ensemble kolonları sınıf sırasından bağımsız olarak [human, ai] döner
+    # serving bir kez okunur: reload araya girse de tüm batch aynı sürümle skorlanır
+    model = model or serving
+    margin = CASCADE_MARGIN if CASCADE_ENABLED else None
+    if metrics is None:
+        probas = model.predict_proba(texts, margin)
+    else:
+        timings = {}
+        t = time.perf_counter()
+        try:
+            probas = model.predict_proba(texts, margin, timings)
+        except Exception as exc:
+            # ensemble.tag_model: hata bir head'de olduysa o modele yazılır
+            model_name = getattr(exc, "model", None)
+            if model_name:
+                metrics.inc("errors_total", stage="model", model=model_name)
+            else:
+                metrics.inc("errors_total", stage="inference")
+            raise
+        stages = [("inference", None, time.perf_counter() - t)]
+        for key, seconds in timings.items():
+            stages.append(("featurize", None, seconds) if key == "featurize" else ("model", key, seconds))
+        metrics.stages(stages)
+    results = []
 
-        preds.append({
-            "model": name,
-            "ai_pct": pct(ai_p),
-            "human_pct": pct(human_p)
-        })
+    for i in range(len(texts)):
+        preds = []
+        for name in model.ensemble.model_names:
+            human_p, ai_p = probas[name][i]
+            if np.isnan(ai_p):
+                continue  # kaskadda bu metin için çalışmadı
 
-    final_label = majority_vote(preds)
+            preds.append({
+                "model": name,
+                "ai_pct": pct(ai_p),
+                "human_pct": pct(human_p)
+            })
+        results.append((model.version, preds))
 
-    # history kaydı
-    preview = text.replace("\n", " ").strip()[:220]
-    created_at = datetime.now(timezone.utc).isoformat()
+    if metrics is not None:
+        # kaskad kapalıyken her model her metni skorlar
+        metrics.inc_many("texts_scored_total", "model", [
+            (name, len(texts) - int(np.isnan(probas[name][:, 1]).sum()) if margin is not None else len(texts))
+            for name in model.ensemble.model_names
+        ])
+    return results
+
+def final_vote(preds):
+    if metrics is None:
+        return cascade_vote(preds) if CASCADE_ENABLED else majority_vote(preds)
+    t = time.perf_counter()
+    label = cascade_vote(preds) if CASCADE_ENABLED else majority_vote(preds)
+    metrics.stage("vote", time.perf_counter() - t)
+    return label
 
+def history_item(text, preds, final_label):
     # tek tek model yüzdelerini DB’ye yazmak için ayıkla
     def pick_ai(model_name):
         for p in preds:
@@ -86,27 +514,531 @@ def predict(req: PredictRequest):
                 return p["ai_pct"]
         return None
 
-    insert_history({
-        "created_at": created_at,
-        "text_preview": preview,
+    # created_at'i db yazarken atar (stamp_created_at)
+    return {
+        "text_preview": text.replace("\n", " ").strip()[:220],
         "text_len": len(text),
         "final_label": final_label,
         "logreg_ai": pick_ai("logreg"),
         "svm_ai": pick_ai("svm_calibrated"),
         "nb_ai": pick_ai("multinomial_nb"),
-    })
+    }
 
+def predict_response(text, preds, final_label, version):
     return {
         "text_len": len(text),
-        "final": {"label": final_label, "rule": "majority_vote"},
-        "predictions": preds
+        "final": {"label": final_label, "rule": FINAL_RULE, "models_run": [p["model"] for p in preds]},
+        "predictions": preds,
+        "model_version": version,
     }
 
+def log_history(items):
+    # "history": istek yolundaki maliyet (write-behind'da kuyruğa atma); asıl yazım history_insert
+    t = time.perf_counter()
+    if history_writer is not None:
+        history_writer.submit_many(items)
+    elif len(items) == 1:
+        insert_history(items[0])
+    else:
+        insert_history_many(items)
+    if metrics is not None:
+        metrics.stage("history", time.perf_counter() - t)
+
+def infer_one(text):
+    if batcher is not None:
+        return batcher.score(text)
+    return score_texts([text])[0]
+
+@app.post("/predict")
+def predict(req: PredictRequest, response: Response):
+    if not warmup.ready:
+        return not_ready(response)
+    text = req.text.strip()
+    if not text:
+        return {"error": "text empty"}
+    if PREDICT_MAX_CHARS and len(text) > PREDICT_MAX_CHARS:
+        admission.count("text_too_long")
+        response.status_code = 413
+        return {"error": f"text too long (max {PREDICT_MAX_CHARS} chars), use /predict/long"}
+
+    if predict_cache is not None:
+        version, preds = predict_cache.get_or_compute(text, current_version(), lambda: infer_one(text))
+    else:
+        version, preds = infer_one(text)
+    final_label = final_vote(preds)
+
+    # history kaydı
+    log_history([history_item(text, preds, final_label)])
+    if shadow is not None:
+        shadow.submit(text, preds, final_label, version)
+
+    return predict_response(text, preds, final_label, version)
+
+@app.post("/predict/batch")
+def predict_batch(req: PredictBatchRequest, response: Response):
+    if not warmup.ready:
+        return not_ready(response)
+    if len(req.items) > MAX_BATCH_ITEMS:
+        return {"error": f"too many items (max {MAX_BATCH_ITEMS})"}
+
+    texts = [item.text.strip() for item in req.items]
+    if PREDICT_BATCH_MAX_CHARS and sum(map(len, texts)) > PREDICT_BATCH_MAX_CHARS:
+        admission.count("batch_too_large")
+        response.status_code = 413
+        return {"error": f"batch too large (max {PREDICT_BATCH_MAX_CHARS} chars in total)"}
+    results = [{"id": item.id, "error": "text empty"} for item in req.items]
+    for i, text in enumerate(texts):
+        if PREDICT_MAX_CHARS and len(text) > PREDICT_MAX_CHARS:
+            admission.count("text_too_long")
+            results[i]["error"] = f"text too long (max {PREDICT_MAX_CHARS} chars)"
+            texts[i] = ""
+
+    valid = [i for i, text in enumerate(texts) if text]
+    scored = score_texts([texts[i] for i in valid]) if valid else []
+
+    history_items = []
+    for i, (version, preds) in zip(valid, scored):
+        final_label = final_vote(preds)
+        results[i] = {"id": req.items[i].id, **predict_response(texts[i], preds, final_label, version)}
+        history_items.append(history_item(texts[i], preds, final_label))
+
+    # history: tek bulk insert
+    log_history(history_items)
+
+    return {"items": results}
+
+@app.post("/explain")
+def explain(
+    req: PredictRequest,
+    response: Response,
+    top_k: int = Query(EXPLAIN_TOP_K, ge=1, le=EXPLAIN_MAX_TOP_K),
+):
+    """
+    /predict ile aynı skorlar + model başına AI ve human yönüne en çok iten terimler.
+    Sayım/TF-IDF satırı bir kez çıkarılır, katkılar lineer ağırlıklardan okunur (ensemble.explain);
+    ek model geçişi yok. offsets gönderilen metne göre karakter aralıkları.
+    Her zaman üç model de çalışır (kaskad yok), process havuzu kullanılmaz, history'ye yazılmaz.
+    """
+    if not warmup.ready:
+        return not_ready(response)
+    text = req.text.strip()
+    if not text:
+        return {"error": "text empty"}
+    if PREDICT_MAX_CHARS and len(text) > PREDICT_MAX_CHARS:
+        admission.count("text_too_long")
+        response.status_code = 413
+        return {"error": f"text too long (max {PREDICT_MAX_CHARS} chars)"}
+
+    model = serving
+    t = time.perf_counter()
+    # strip edilmemiş metin: offsets istemcinin gönderdiğiyle hizalı (boşluklar token değil)
+    explained = model.ensemble.explain(req.text, top_k=top_k)
+    if metrics is not None:
+        metrics.stage("explain", time.perf_counter() - t)
+
+    preds = []
+    for name in model.ensemble.model_names:
+        out = explained["models"][name]
+        human_p, ai_p = out["proba"]
+        preds.append({
+            "model": name,
+            "ai_pct": pct(ai_p),
+            "human_pct": pct(human_p),
+            "bias": round(out["bias"], 6),
+            "top_ai": out["top_ai"],
+            "top_human": out["top_human"],
+        })
+    final_label = final_vote(preds)
+    return {
+        **predict_response(text, preds, final_label, model.version),
+        "n_terms": explained["n_terms"],
+    }
+
+async def score_admitted(fn, batch):
+    # stream uçları: admission slotu upload süresince değil, sadece skorlama sırasında tutulur
+    async with admission.slot():
+        return await run_in_threadpool(fn, batch)
+
+def server_busy(response: Response, exc: AdmissionRejected):
+    response.status_code = 429
+    response.headers["Retry-After"] = str(exc.retry_after)
+    return {"error": "server busy", "reason": exc.reason}
+
+async def read_body_capped(request, max_bytes: int):
+    # None: gövde max_bytes'ı aşıyor (kalanı okunmaz); max_bytes=0 sınırsız
+    length = request.headers.get("content-length")
+    if max_bytes and length is not None and length.isdigit() and int(length) > max_bytes:
+        return None
+    chunks, size = [], 0
+    async for raw in request.stream():
+        size += len(raw)
+        if max_bytes and size > max_bytes:
+            return None
+        chunks.append(raw)
+    return b"".join(chunks)
+
+async def iter_body_text(request, pieces=None):
+    # request body'si parça parça, UTF-8 decode edilmiş halde (çok baytlı karakterler bölünmez)
+    if pieces is not None:
+        for piece in pieces:
+            yield piece
+        return
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    async for raw in request.stream():
+        yield decoder.decode(raw)
+    yield decoder.decode(b"", final=True)
+
+@app.post("/predict/long")
+async def predict_long(
+    request: Request,
+    response: Response,
+    window_chars: int = Query(None, ge=100, le=100000),
+    overlap_chars: int = Query(None, ge=0),
+):
+    """
+    Uzun belge: gövde parça parça okunur, örtüşen pencerelere bölünür, pencereler
+    LONGDOC_BATCH_WINDOWS'luk gruplar halinde tek vektörize geçişte skorlanır.
+    Bellekte en fazla bir grup pencere + okunan son parça bulunur; skorlama
+    threadpool'da çalışır, event loop upload sırasında bloklanmaz.
+
+    Gövde düz metin (text/plain) ya da {"text": "..."} JSON olabilir. JSON gövde
+    ayrıştırılmak için bütün olarak okunur (en fazla LONGDOC_MAX_JSON_BYTES); büyük
+    belgeler için text/plain tercih edilmeli.
+    """
+    if not warmup.ready:
+        return not_ready(response)
+    window = window_chars or LONGDOC_WINDOW_CHARS
+    overlap = LONGDOC_OVERLAP_CHARS if overlap_chars is None else overlap_chars
+    if overlap >= window:
+        return {"error": "overlap_chars must be smaller than window_chars"}
+
+    chunker = WindowChunker(window, overlap)
+    agg = LongDocAggregator(LONGDOC_MAX_SEGMENTS)
+    model = serving  # belge boyunca tek sürüm
+
+    def score_batch(windows):
+        scored = score_texts([w[2] for w in windows], model)
+        agg.add(windows, [preds for _, preds in scored], final_vote)
+
+    pending = []
+    if request.headers.get("content-type", "").startswith("application/json"):
+        body = await read_body_capped(request, LONGDOC_MAX_JSON_BYTES)
+        if body is None:
+            response.status_code = 413
+            return {"error": f"JSON body too large (max {LONGDOC_MAX_JSON_BYTES} bytes); send text/plain to stream"}
+        # onlarca MB'lık gövdede json.loads event loop'u bloklamasın
+        try:
+            text = (await run_in_threadpool(json.loads, body))["text"]
+        except (ValueError, KeyError, TypeError):
+            return {"error": "expected {\"text\": ...}"}
+        if not isinstance(text, str):
+            return {"error": "text must be a string"}
+        # stream'deki gibi sınırlı parçalar: pending bir parçanın pencerelerinden büyümez
+        pieces = text_slices(text)
+    else:
+        pieces = None
+
+    try:
+        async for piece in iter_body_text(request, pieces):
+            if LONGDOC_MAX_CHARS and chunker.total_chars + len(piece) > LONGDOC_MAX_CHARS:
+                response.status_code = 413
+                return {"error": f"document too large (max {LONGDOC_MAX_CHARS} chars)"}
+            pending.extend(chunker.feed(piece))
+            while len(pending) >= LONGDOC_BATCH_WINDOWS:
+                batch, pending = pending[:LONGDOC_BATCH_WINDOWS], pending[LONGDOC_BATCH_WINDOWS:]
+                await score_admitted(score_batch, batch)
+        pending.extend(chunker.finish())
+        if pending:
+            await score_admitted(score_batch, pending)
+    except AdmissionRejected as e:
+        return server_busy(response, e)
+
+    if agg.n_segments == 0:
+        return {"error": "text empty"}
+
+    preds = agg.aggregate_preds()
+    final_label = final_vote(preds)
+    item = history_item(agg.first_preview, preds, final_label)
+    item["text_len"] = chunker.total_chars
+    await run_in_threadpool(log_history, [item])
+
+    return {
+        "text_len": chunker.total_chars,
+        "final": {"label": final_label, "rule": FINAL_RULE, "aggregate": "length_weighted_mean"},
+        "predictions": preds,
+        "model_version": model.version,
+        "window_chars": window,
+        "overlap_chars": overlap,
+        **agg.result(),
+    }
+
+@app.post("/predict/upload")
+async def predict_upload(
+    request: Request,
+    response: Response,
+    fmt: Optional[str] = Query(None, alias="format"),
+    text_field: str = "text",
+    id_field: str = "id",
+    batch_size: int = Query(None, ge=1, le=MAX_BATCH_ITEMS),
+    log: bool = False,
+):
+    """
+    Toplu skorlama: gövde CSV (header'lı, data/processed/*.csv gibi) ya da JSONL.
+    Satırlar okundukça batch_size'lık gruplar halinde skorlanır ve her satır için bir
+    NDJSON satırı akıtılır; dosya sunucuda hiçbir zaman bütün olarak tutulmaz.
+    Cevabı upload bitince okuyan istemciler için çıktı SpoolPipe'ta (RAM'de en fazla
+    UPLOAD_SPOOL_MAX_MEMORY, fazlası geçici dosyada) bekler.
+    Son satır {"done": true, ...} özetidir. log=true ise sonuçlar history'ye
+    batch başına tek bulk insert ile yazılır.
+    """
+    if not warmup.ready:
+        return not_ready(response)
+    fmt = fmt or detect_format(request.headers.get("content-type", ""))
+    if fmt not in READERS:
+        return {"error": "format must be csv or jsonl (query ?format= or Content-Type)"}
+    reader = READERS[fmt](text_field, id_field, UPLOAD_MAX_RECORD_CHARS)
+    batch_size = batch_size or UPLOAD_BATCH_ROWS
+    model = serving  # tüm dosya tek sürümle
+
+    def score_rows(rows):
+        lines, history_items = [], []
+        valid = [r for r in rows if r[2] and r[2].strip()]
+        scored = score_texts([r[2].strip() for r in valid], model) if valid else []
+        by_row = {r[0]: s for r, s in zip(valid, scored)}
+        for row_no, row_id, text in rows:
+            out = {"row": row_no, "id": row_id}
+            if row_no not in by_row:
+                out["error"] = "invalid row" if text is None else "text empty"
+            else:
+                version, preds = by_row[row_no]
+                final_label = final_vote(preds)
+                out.update(predict_response(text.strip(), preds, final_label, version))
+                if log:
+                    history_items.append(history_item(text.strip(), preds, final_label))
+            lines.append(json.dumps(out, ensure_ascii=False) + "\n")
+        if history_items:
+            log_history(history_items)
+        return "".join(lines), len(valid)
+
+    pipe = SpoolPipe(UPLOAD_SPOOL_MAX_MEMORY)
+
+    async def produce():
+        pending, rows, scored = [], 0, 0
+
+        async def flush(batch):
+            nonlocal rows, scored
+            chunk, n = await score_admitted(score_rows, batch)
+            rows += len(batch)
+            scored += n
+            pipe.write(chunk.encode("utf-8"))
+
+        try:
+            try:
+                async for piece in iter_body_text(request):
+                    pending.extend(reader.feed(piece))
+                    while len(pending) >= batch_size:
+                        batch, pending = pending[:batch_size], pending[batch_size:]
+                        await flush(batch)
+                pending.extend(reader.finish())
+                if pending:
+                    await flush(pending)
+                summary = {"done": True, "rows": rows, "scored": scored, "errors": rows - scored, "model_version": model.version}
+            except ValueError as e:
+                # akış başladıktan sonra status değiştirilemez: hata son satırda
+                summary = {"done": False, "error": str(e), "rows": rows}
+            except AdmissionRejected as e:
+                summary = {"done": False, "error": "server busy", "reason": e.reason, "rows": rows}
+            pipe.write((json.dumps(summary) + "\n").encode("utf-8"))
+        finally:
+            # hangi yoldan çıkılırsa çıkılsın cevap akışı bitsin
+            pipe.close()
+
+    async def results():
+        task = asyncio.create_task(produce())
+        try:
+            async for data in pipe.iter_bytes():
+                yield data
+            await task
+        finally:
+            task.cancel()
+
+    return DuplexStreamingResponse(results(), media_type="application/x-ndjson")
+
+@app.get("/batcher/stats")
+def batcher_stats():
+    if batcher is None:
+        return {"enabled": False}
+    return {"enabled": True, **batcher.stats()}
+
+@app.get("/admission/stats")
+def admission_stats():
+    return admission.stats()
+
+@app.get("/metrics")
+def metrics_text():
+    if metrics is None:
+        return JSONResponse({"enabled": False}, status_code=404)
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/shadow/stats")
+def shadow_stats():
+    if shadow is None:
+        return {"enabled": False}
+    return {"enabled": True, "production_version": current_version(), **shadow.stats()}
+
+@app.get("/shadow/results")
+def shadow_results(
+    limit: int = Query(50, ge=1, le=1000),
+    candidate_version: Optional[str] = None,
+    disagree_only: bool = False,
+):
+    if shadow is None:
+        return {"enabled": False}
+    return {"items": list_shadow_results(SHADOW_DB_PATH, limit, candidate_version, disagree_only)}
+
+@app.get("/cache/stats")
+def cache_stats():
+    if predict_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, "model_version": current_version(), **predict_cache.stats()}
+
+class ReloadRequest(BaseModel):
+    version: Optional[str] = None
+
+@app.get("/models")
+def models():
+    return {**reloader.stats(), "registry": model_registry.list_versions(REGISTRY_DIR)}
+
+@app.post("/models/reload")
+def models_reload(req: ReloadRequest = None, wait: bool = False):
+    # version yoksa registry/CURRENT yeniden okunur; eski model yeni sürüm hazır olana kadar cevap verir
+    if not warmup.ready:
+        return {"error": "models not ready"}
+    version = req.version if req is not None else None
+    if version is not None:
+        try:
+            model_registry.version_dir(REGISTRY_DIR, version)
+        except ValueError as e:
+            return {"error": str(e)}
+    result = reloader.reload(version, wait=wait)
+    if wait and "error" not in result:
+        return reloader.stats()
+    return result
+
+@app.post("/models/rollback")
+def models_rollback():
+    return reloader.rollback()
+
+MAX_HISTORY_LIMIT = 1000
+
+def to_utc_iso(value):
+    # created_at, datetime.now(timezone.utc).isoformat() formatında saklanıyor
+    if value is None:
+        return None
+    dt = datetime.fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).isoformat()
+
 @app.get("/history")
-def history(limit: int = 50):
-    return {"items": list_history(limit=limit)}
+def history(
+    limit: int = 50,
+    cursor: Optional[int] = None,
+    label: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    logreg_min: Optional[float] = None,
+    logreg_max: Optional[float] = None,
+    svm_min: Optional[float] = None,
+    svm_max: Optional[float] = None,
+    nb_min: Optional[float] = None,
+    nb_max: Optional[float] = None,
+):
+    limit = max(1, min(limit, MAX_HISTORY_LIMIT))
+    try:
+        since, until = to_utc_iso(since), to_utc_iso(until)
+    except ValueError:
+        return {"error": "since/until must be ISO-8601 dates"}
+
+    if history_writer is not None:
+        history_writer.flush()
+
+    items = list_history(
+        limit=limit,
+        cursor=cursor,
+        label=label,
+        since=since,
+        until=until,
+        score_ranges={
+            "logreg_ai": (logreg_min, logreg_max),
+            "svm_ai": (svm_min, svm_max),
+            "nb_ai": (nb_min, nb_max),
+        },
+    )
+    # sonraki sayfa: ?cursor=next_cursor
+    next_cursor = items[-1]["id"] if len(items) == limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+EXPORT_COLUMNS = ["id", "created_at", "text_preview", "text_len", "final_label", "logreg_ai", "svm_ai", "nb_ai"]
+
+def export_ndjson(chunks):
+    for rows in chunks:
+        yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+def export_csv(chunks):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    # boş export'ta da header dönsün
+    if buf.tell():
+        yield buf.getvalue()
+
+@app.get("/history/export")
+def history_export(
+    fmt: str = Query("ndjson", alias="format"),
+    since_id: Optional[int] = None,
+    since: Optional[str] = None,
+    chunk_size: int = 1000,
+):
+    # artımlı çekim: bir önceki export'un son id'si -> since_id
+    if fmt not in ("ndjson", "csv"):
+        return {"error": "format must be ndjson or csv"}
+    try:
+        since = to_utc_iso(since)
+    except ValueError:
+        return {"error": "since must be an ISO-8601 date"}
+    chunk_size = max(1, min(chunk_size, 10000))
+
+    if history_writer is not None:
+        history_writer.flush()
+
+    chunks = iter_history(since_id=since_id, since=since, chunk_size=chunk_size)
+    if fmt == "csv":
+        return StreamingResponse(
+            export_csv(chunks),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=history.csv"},
+        )
+    return StreamingResponse(export_ndjson(chunks), media_type="application/x-ndjson")
+
+@app.get("/history/writer")
+def history_writer_stats():
+    if history_writer is None:
+        return {"enabled": False}
+    return {"enabled": True, **history_writer.stats()}
+
+@app.get("/history/retention")
+def history_retention():
+    return {"enabled": retention.enabled, **retention.stats(), "partitions": list_partitions()}
 
 @app.delete("/history")
 def history_clear():
+    if history_writer is not None:
+        history_writer.flush()
     clear_history()
     return {"ok": True}
@@ -0,0 +1,216 @@
+# metrics.py
+"""
+Sıcak yol ölçümü: aşama süresi histogramları, sayaçlar ve Prometheus text formatı.
+
+  stage_duration_seconds{stage, model}  featurize / model / vote / inference / explain / history / history_insert
+  request_duration_seconds{path}        uçtan uca istek süresi (middleware)
+  requests_total{path, method, status}
+  texts_scored_total{model}             model başına skorlanan metin
+  errors_total{stage, model}            model sadece hata bir modele ait olduğunda (stage="model")
+  history_rows_written_total
+
+Histogram kovaları sabit; observe() tek bisect + iki toplama. Sıcak yoldaki
+çağrılar (stages(), request()) seriyi hazır anahtarla bulur ve kilidi bir kez alır;
+istek başına toplam ek maliyet benchmarks/metrics_overhead.py ile ölçülür. Aşama süreleri bir
+istek içinde (contextvar) ayrıca toplanır ve MetricsMiddleware bunları
+Server-Timing header'ı olarak döndürür. Sync endpoint'ler threadpool'da çalışsa da
+contextvar kopyalanır; kopya aynı sözlüğü gösterdiği için ekleme görünür.
+Microbatcher ve history writer thread'lerindeki ölçümler sadece histogramlara gider.
+
+add_collector() ile başka modüllerin stats() değerleri scrape anında okunur.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+PREFIX = "humanorai"
+
+# 50 µs .. 10 s
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+HELP = {
+    "stage_duration_seconds": "Time spent per call in each serving stage",
+    "request_duration_seconds": "End-to-end HTTP request duration",
+    "requests_total": "HTTP requests by path, method and status",
+    "texts_scored_total": "Texts scored per model",
+    "errors_total": "Errors per stage and model",
+    "history_rows_written_total": "History rows written to SQLite",
+}
+
+# istek başına aşama süreleri (Server-Timing); middleware dışında None
+request_timings = ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # son kova +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+def format_labels(labels) -> str:
+    if not labels:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in labels
+    )
+    return "{" + body + "}"
+
+
+def format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metrics:
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix: str = PREFIX):
+        self.buckets = tuple(buckets)
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.histograms = {}  # (ad, etiketler) -> Histogram
+        self.counters = {}    # (ad, etiketler) -> değer
+        self.stage_histograms = {}  # (aşama, model) -> Histogram; histograms'takiyle aynı nesne
+        self.collectors = []
+
+    def _histogram(self, key):
+        # kilit altında çağrılır
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = self.histograms[key] = Histogram(self.buckets)
+        return hist
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self._histogram(key).observe(seconds)
+
+    def inc(self, name: str, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def inc_many(self, name: str, label: str, counts):
+        # counts: [(etiket değeri, artış)]; tek kilit
+        with self.lock:
+            for value, amount in counts:
+                key = (name, ((label, value),))
+                self.counters[key] = self.counters.get(key, 0) + amount
+
+    def stages(self, items):
+        # items: [(aşama, model ya da None, saniye)]; histogram + (istek içindeysek) Server-Timing
+        with self.lock:
+            for stage, model, seconds in items:
+                hist = self.stage_histograms.get((stage, model))
+                if hist is None:
+                    labels = (("model", model), ("stage", stage)) if model else (("stage", stage),)
+                    hist = self.stage_histograms[(stage, model)] = self._histogram(("stage_duration_seconds", labels))
+                hist.observe(seconds)
+        timings = request_timings.get()
+        if timings is not None:
+            for stage, model, seconds in items:
+                key = model or stage
+                timings[key] = timings.get(key, 0.0) + seconds
+
+    def stage(self, stage: str, seconds: float, model: str = None):
+        self.stages(((stage, model, seconds),))
+
+    def request(self, path: str, method: str, status: int, seconds: float):
+        with self.lock:
+            self._histogram(("request_duration_seconds", (("path", path),))).observe(seconds)
+            key = ("requests_total", (("method", method), ("path", path), ("status", str(status))))
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def add_collector(self, collect):
+        # collect() -> [(ad, tip, açıklama, [(etiket sözlüğü, değer), ...]), ...]
+        self.collectors.append(collect)
+
+    def render(self) -> str:
+        with self.lock:
+            histograms = {key: (list(h.counts), h.sum) for key, h in self.histograms.items()}
+            counters = dict(self.counters)
+
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {self.prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+
+        for name in sorted({name for name, _ in histograms}):
+            header(name, "histogram", HELP.get(name, name))
+            full = f"{self.prefix}_{name}"
+            for key in sorted(k for k in histograms if k[0] == name):
+                labels = key[1]
+                counts, total = histograms[key]
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{full}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{full}_sum{format_labels(labels)} {total!r}")
+                lines.append(f"{full}_count{format_labels(labels)} {cumulative}")
+
+        for name in sorted({name for name, _ in counters}):
+            header(name, "counter", HELP.get(name, name))
+            for key in sorted(k for k in counters if k[0] == name):
+                lines.append(f"{self.prefix}_{name}{format_labels(key[1])} {format_value(counters[key])}")
+
+        for collect in self.collectors:
+            for name, kind, help_text, samples in collect():
+                header(name, kind, help_text)
+                for labels, value in samples:
+                    if value is None:
+                        continue
+                    lines.append(f"{self.prefix}_{name}{format_labels(sorted(labels.items()))} {format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    İstek süresi/sayısı ölçer, istek boyunca aşama sürelerini toplar ve
+    server_timing=True ise Server-Timing header'ı ekler ("app" = cevap başlayana kadar).
+    Eşleşmeyen yollar (404) tek "unmatched" etiketinde toplanır.
+    """
+
+    def __init__(self, app, metrics: Metrics, server_timing: bool = True):
+        self.app = app
+        self.metrics = metrics
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = {}
+        token = request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    parts = [f"{key};dur={seconds * 1000:.3f}" for key, seconds in timings.items()]
+                    parts.append(f"app;dur={(time.perf_counter() - start) * 1000:.3f}")
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", ", ".join(parts).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            request_timings.reset(token)
+            path = scope["path"] if status != 404 else "unmatched"
+            self.metrics.request(path, scope["method"], status, time.perf_counter() - start)
@@ -0,0 +1,154 @@
+# reloader.py
+"""
+Çalışırken model değiştirme (hot reload).
+
+Yeni sürüm arka plan thread'inde yüklenir, checksum + warm-up kontrolünden geçer,
+sonra activate_fn ile tek atamada devreye alınır; o ana kadar istekler eski
+modelle cevaplanır. Kontrolden geçemeyen sürüm hiç devreye girmez; rollback()
+bir önceki modele döner.
+
+  load_fn(version, status) -> ServingModel    (status: warmup.ModelWarmup)
+  activate_fn(model)       -> önceki ServingModel
+
+watch_interval > 0 ise registry/CURRENT izlenir: birden fazla uvicorn worker'ı
+CURRENT değişince kendi kendine yeni sürüme geçer.
+"""
+import logging
+import threading
+from datetime import datetime, timezone
+
+import model_registry
+from warmup import ModelWarmup
+
+
+class ModelReloader:
+    def __init__(self, registry_dir, load_fn, activate_fn, watch_interval: float = 0.0):
+        self.registry_dir = registry_dir
+        self.load_fn = load_fn
+        self.activate_fn = activate_fn
+        self.watch_interval = watch_interval
+        self.reload_lock = threading.Lock()  # aynı anda tek reload / rollback
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.watch_thread = None
+
+        self.lock = threading.Lock()
+        self.active = None
+        self.previous = None
+        self.status = None         # son reload'un ModelWarmup'ı
+        self.failed_version = None  # watcher aynı bozuk sürümü tekrar denemesin
+        self.reloads = 0
+        self.failures = 0
+        self.rollbacks = 0
+        self.last_reload = None
+        self.last_error = None
+
+    def set_active(self, model):
+        with self.lock:
+            self.active = model
+
+    def start(self):
+        if self.watch_interval <= 0 or self.watch_thread is not None:
+            return
+        self.stop_event.clear()
+        self.watch_thread = threading.Thread(target=self._watch, name="model-watch", daemon=True)
+        self.watch_thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        self.stop_event.set()
+        if self.watch_thread is not None:
+            self.watch_thread.join(timeout)
+            self.watch_thread = None
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def reload(self, version: str = None, wait: bool = False) -> dict:
+        if not self.reload_lock.acquire(blocking=False):
+            return {"error": "reload already in progress"}
+        status = ModelWarmup()
+        with self.lock:
+            self.status = status
+        if wait:
+            self._reload(version, status)
+        else:
+            self.thread = threading.Thread(
+                target=self._reload, args=(version, status), name="model-reload", daemon=True
+            )
+            self.thread.start()
+        return {"started": True, "version": version, **status.stats()}
+
+    def _reload(self, version, status):
+        try:
+            loaded = {}
+
+            def load(st):
+                loaded["model"] = self.load_fn(version, st)
+                if version is not None and model_registry.read_current(self.registry_dir) != version:
+                    # diğer worker'lar (watcher) da bu sürüme geçsin
+                    model_registry.set_current(self.registry_dir, version)
+                previous = self.activate_fn(loaded["model"])
+                with self.lock:
+                    self.previous = previous
+                    self.active = loaded["model"]
+                st.set_state("ready")
+
+            status.run(load)
+            with self.lock:
+                self.last_reload = datetime.now(timezone.utc).isoformat()
+                if status.ready:
+                    self.reloads += 1
+                    self.failed_version = None
+                    self.last_error = None
+                else:
+                    self.failures += 1
+                    self.failed_version = version
+                    self.last_error = status.last_error
+        finally:
+            self.reload_lock.release()
+
+    def rollback(self) -> dict:
+        if not self.reload_lock.acquire(blocking=False):
+            return {"error": "reload already in progress"}
+        try:
+            with self.lock:
+                previous = self.previous
+            if previous is None:
+                return {"error": "no previous model to roll back to"}
+            if previous.source == "registry":
+                # watcher yeni sürümü tekrar yüklemesin
+                model_registry.set_current(self.registry_dir, previous.version)
+            current = self.activate_fn(previous)
+            with self.lock:
+                self.previous, self.active = current, previous
+                self.rollbacks += 1
+            return {"rolled_back_to": previous.version}
+        finally:
+            self.reload_lock.release()
+
+    def _watch(self):
+        while not self.stop_event.wait(self.watch_interval):
+            try:
+                current = model_registry.read_current(self.registry_dir)
+                with self.lock:
+                    active = self.active.version if self.active is not None else None
+                    failed = self.failed_version
+                if current and current != active and current != failed:
+                    self.reload(current, wait=True)
+            except Exception:
+                logging.getLogger(__name__).exception("model watch failed")
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "active": self.active.describe() if self.active is not None else None,
+                "previous": self.previous.describe() if self.previous is not None else None,
+                "watch_interval_seconds": self.watch_interval,
+                "reloading": self.reload_lock.locked(),
+                "reloads": self.reloads,
+                "failures": self.failures,
+                "rollbacks": self.rollbacks,
+                "last_reload": self.last_reload,
+                "last_error": self.last_error,
+                "last_status": self.status.stats() if self.status is not None else None,
+            }
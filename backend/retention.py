@@ -0,0 +1,181 @@
+# retention.py
+"""
+history tablosu için saklama politikası.
+
+  max_age_days          : bundan eski satırlar silinir (0 = kapalı)
+  max_rows              : en yeni max_rows satır kalır (0 = kapalı)
+  partition_keep_months : > 0 ise, son N ay dışındaki tamamlanmış aylar
+                          data/history_YYYY_MM.sqlite3 dosyalarına taşınır;
+                          max_age'i geçen ay dosyaları tek unlink ile silinir
+
+Silmeler küçük batch'lerle yapılır, sonunda PRAGMA incremental_vacuum ile yer geri verilir.
+
+Elle çalıştırma:
+    python retention.py --max-age-days 90
+    python retention.py --enable-incremental-vacuum   # eski DB'ler için tek seferlik
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import db
+
+
+class RetentionWorker:
+    def __init__(self, max_age_days: float = 0, max_rows: int = 0, partition_keep_months: int = 0,
+                 interval: float = 300.0, batch_size: int = 1000, pause: float = 0.01,
+                 vacuum_pages: int = 0):
+        self.max_age_days = max_age_days
+        self.max_rows = max_rows
+        self.partition_keep_months = partition_keep_months
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self.vacuum_pages = vacuum_pages
+        self.stop_event = threading.Event()
+        self.thread = None
+
+        self.lock = threading.Lock()
+        self.runs = 0
+        self.deleted = 0
+        self.archived = 0
+        self.dropped_partitions = 0
+        self.reclaimed_pages = 0
+        self.last_run = None
+        self.last_error = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_age_days or self.max_rows or self.partition_keep_months)
+
+    def start(self):
+        if self.thread is not None or not self.enabled:
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="history-retention", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        if self.thread is None:
+            return
+        self.stop_event.set()
+        self.thread.join(timeout)
+        self.thread = None
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.getLogger(__name__).exception("history retention run failed")
+                with self.lock:
+                    self.last_error = str(e)
+            self.stop_event.wait(self.interval)
+
+    def run_once(self, now: datetime = None) -> dict:
+        now = now or datetime.now(timezone.utc)
+        summary = {"deleted": 0, "archived": 0, "dropped_partitions": [], "reclaimed_pages": 0}
+
+        if self.partition_keep_months:
+            summary["archived"] = self._archive(now)
+
+        if self.max_age_days:
+            cutoff = (now - timedelta(days=self.max_age_days)).isoformat()
+            for part in db.list_partitions():
+                _, month_end = db.month_bounds(part["month"])
+                if month_end <= cutoff and db.drop_partition(part["month"]):
+                    summary["dropped_partitions"].append(part["month"])
+            boundary = db.first_id_at_or_after(cutoff)
+            if boundary is None:
+                # cutoff'tan yeni satır yok: hepsi eski
+                boundary = db.max_history_id() + 1
+            summary["deleted"] += db.delete_history_before(
+                boundary, self.batch_size, self.pause, self.stop_event
+            )
+
+        if self.max_rows:
+            boundary = db.oldest_kept_id_for_rows(self.max_rows)
+            if boundary is not None:
+                summary["deleted"] += db.delete_history_before(
+                    boundary, self.batch_size, self.pause, self.stop_event
+                )
+
+        if summary["deleted"] or summary["archived"]:
+            summary["reclaimed_pages"] = db.incremental_vacuum(self.vacuum_pages)
+
+        with self.lock:
+            self.runs += 1
+            self.deleted += summary["deleted"]
+            self.archived += summary["archived"]
+            self.dropped_partitions += len(summary["dropped_partitions"])
+            self.reclaimed_pages += summary["reclaimed_pages"]
+            self.last_run = now.isoformat()
+            self.last_error = None
+        return summary
+
+    def _archive(self, now: datetime) -> int:
+        oldest = db.oldest_history_created_at()
+        if oldest is None:
+            return 0
+        # son partition_keep_months ay (içinde bulunulan ay dahil) ana tabloda kalır
+        year, month = now.year, now.month - (self.partition_keep_months - 1)
+        while month < 1:
+            year, month = year - 1, month + 12
+        moved = 0
+        for key in db.months_between(oldest, db.month_key(year, month)):
+            if self.stop_event.is_set():
+                break
+            moved += db.archive_month(key, self.batch_size, self.pause, self.stop_event)
+        return moved
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "max_age_days": self.max_age_days,
+                "max_rows": self.max_rows,
+                "partition_keep_months": self.partition_keep_months,
+                "interval_seconds": self.interval,
+                "batch_size": self.batch_size,
+                "runs": self.runs,
+                "deleted": self.deleted,
+                "archived": self.archived,
+                "dropped_partitions": self.dropped_partitions,
+                "reclaimed_pages": self.reclaimed_pages,
+                "last_run": self.last_run,
+                "last_error": self.last_error,
+            }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="history retention / partition bakımı")
+    ap.add_argument("--max-age-days", type=float, default=0)
+    ap.add_argument("--max-rows", type=int, default=0)
+    ap.add_argument("--partition-keep-months", type=int, default=0)
+    ap.add_argument("--batch-size", type=int, default=1000)
+    ap.add_argument("--drop-partition", metavar="YYYY_MM")
+    ap.add_argument("--enable-incremental-vacuum", action="store_true")
+    args = ap.parse_args()
+
+    db.init_db()
+    if args.enable_incremental_vacuum:
+        t = time.perf_counter()
+        db.enable_incremental_vacuum()
+        print(f"auto_vacuum={db.auto_vacuum_mode()} ({time.perf_counter() - t:.1f}s)")
+    if args.drop_partition:
+        print("dropped" if db.drop_partition(args.drop_partition) else "not found", args.drop_partition)
+
+    worker = RetentionWorker(
+        max_age_days=args.max_age_days,
+        max_rows=args.max_rows,
+        partition_keep_months=args.partition_keep_months,
+        batch_size=args.batch_size,
+    )
+    if worker.enabled:
+        print(json.dumps(worker.run_once(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+# upload.py
+"""
+Dosya yükleyerek toplu skorlama için artımlı satır okuyucular.
+
+Okuyuculara request body'sinin decode edilmiş parçaları verilir; feed() o ana kadar
+tamamlanmış satırları (row_no, id, text) olarak döndürür, yarım kalan kayıt bir
+sonraki parçaya kadar tamponda bekler. Tampon hiçbir zaman tek bir kayıttan + gelen
+parçadan büyük olmaz; max_record_chars'ı aşan kayıt ValueError verir.
+
+CSV'de tırnak içindeki satır sonları (çok satırlı abstract'lar) kaydı bölmez:
+kayıt sınırı, o ana kadarki tırnak sayısı çift olan satır sonudur.
+"""
+import asyncio
+import csv
+import io
+import json
+import tempfile
+
+from starlette.responses import StreamingResponse
+
+
+class RowReader:
+    def __init__(self, text_field: str = "text", id_field: str = "id", max_record_chars: int = 1_000_000):
+        self.text_field = text_field
+        self.id_field = id_field
+        self.max_record_chars = max_record_chars
+        self.buf = ""
+        self.rows = 0
+
+    def feed(self, text: str):
+        if not self.rows and not self.buf:
+            text = text.lstrip("\ufeff")
+        self.buf += text
+        cut = self._boundary()
+        if cut <= 0:
+            if len(self.buf) > self.max_record_chars:
+                raise ValueError(f"record too large (max {self.max_record_chars} chars)")
+            return []
+        chunk, self.buf = self.buf[:cut], self.buf[cut:]
+        return self._parse(chunk)
+
+    def finish(self):
+        chunk, self.buf = self.buf, ""
+        return self._parse(chunk) if chunk.strip() else []
+
+    def _row(self, record):
+        # (row_no, id, text); text None -> satır hatalı
+        self.rows += 1
+        if not isinstance(record, dict):
+            return self.rows, None, None
+        text = record.get(self.text_field)
+        row_id = record.get(self.id_field)
+        return self.rows, row_id if row_id not in ("", None) else self.rows, text if isinstance(text, str) else None
+
+
+class JsonlRowReader(RowReader):
+    def _boundary(self):
+        return self.buf.rfind("\n") + 1
+
+    def _parse(self, chunk):
+        out = []
+        for line in chunk.splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            out.append(self._row(record))
+        return out
+
+
+class CsvRowReader(RowReader):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.header = None
+        self.scan = 0    # buf'ta tırnakları sayılmış kısmın sonu
+        self.quotes = 0  # buf[:scan] içindeki tırnak sayısı
+
+    def _boundary(self):
+        buf, i, quotes = self.buf, self.scan, self.quotes
+        cut, quotes_at_cut = 0, 0
+        while True:
+            nl = buf.find("\n", i)
+            if nl < 0:
+                break
+            quotes += buf.count('"', i, nl + 1)
+            i = nl + 1
+            if quotes % 2 == 0:
+                cut, quotes_at_cut = i, quotes
+        # kesimden sonra kalan kısım için sayaçlar
+        self.scan, self.quotes = i - cut, quotes - quotes_at_cut
+        return cut
+
+    def finish(self):
+        self.scan = self.quotes = 0
+        return super().finish()
+
+    def _parse(self, chunk):
+        out = []
+        for values in csv.reader(io.StringIO(chunk)):
+            if not values:
+                continue
+            if self.header is None:
+                self.header = values
+                if self.text_field not in values:
+                    raise ValueError(f"CSV header has no {self.text_field!r} column")
+                continue
+            out.append(self._row(dict(zip(self.header, values))))
+        return out
+
+
+READERS = {"csv": CsvRowReader, "jsonl": JsonlRowReader}
+
+CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/json-lines": "jsonl",
+}
+
+
+def detect_format(content_type: str):
+    return CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+
+
+class SpoolPipe:
+    """
+    Üretici (body okuma + skorlama) ile cevap akışı arasındaki tampon.
+
+    Çoğu istemci (requests, httpx) cevabı ancak upload bitince okur; üretici cevap
+    yazılmasını beklerse body de okunmaz ve bağlantı kilitlenir. Bu yüzden çıktı
+    SpooledTemporaryFile'a yazılır: max_memory'e kadar RAM'de, sonrası diskte.
+    Cevabı eşzamanlı okuyan istemcide dosya okundukça sıfırlanır, büyümez.
+    Tek event loop içinde kullanılır (write ve okuma aynı thread'de).
+    """
+
+    def __init__(self, max_memory: int = 8 << 20):
+        self.file = tempfile.SpooledTemporaryFile(max_size=max_memory)
+        self.read_pos = 0
+        self.write_pos = 0
+        self.done = False
+        self.event = asyncio.Event()
+
+    def write(self, data: bytes):
+        self.file.seek(self.write_pos)
+        self.file.write(data)
+        self.write_pos = self.file.tell()
+        self.event.set()
+
+    def close(self):
+        self.done = True
+        self.event.set()
+
+    async def iter_bytes(self, chunk_size: int = 1 << 16):
+        try:
+            while True:
+                if self.read_pos < self.write_pos:
+                    self.file.seek(self.read_pos)
+                    data = self.file.read(min(chunk_size, self.write_pos - self.read_pos))
+                    self.read_pos += len(data)
+                    if self.read_pos == self.write_pos:
+                        # her şey okundu: dosyayı başa sar
+                        self.read_pos = self.write_pos = 0
+                        self.file.seek(0)
+                        self.file.truncate()
+                    yield data
+                elif self.done:
+                    return
+                else:
+                    self.event.clear()
+                    await self.event.wait()
+        finally:
+            self.file.close()
+
+
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    Cevap üretilirken request body'si hâlâ okunuyor. StreamingResponse, ASGI
+    spec < 2.4'te receive()'i disconnect için dinlerken body parçalarını da tüketir;
+    burada dinleyici yok, kopma request.stream() içinde ClientDisconnect olarak çıkar.
+    """
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
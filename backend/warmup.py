@@ -0,0 +1,95 @@
+# warmup.py
+"""
+Model yükleme / ısınma durumunu tutar; /ready bunun üzerinden cevap verir.
+
+  pending -> loading -> warming -> ready
+  herhangi bir adımda hata -> failed (mesaj last_error'da)
+
+Yükleme fonksiyonu arka plan thread'inde çalışır, uygulama bu sırada /health
+ve /ready isteklerini karşılar; trafik ancak ready=True olunca yönlendirilmeli.
+"""
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ModelWarmup:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.state = "pending"
+        self.steps = {}   # adım -> {"status": "running|done|failed", "ms": ...}
+        self.models = {}  # model -> "loaded" | "ready" | "failed"
+        self.last_error = None
+        self.started = None
+        self.finished = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def set_state(self, state: str):
+        with self.lock:
+            self.state = state
+
+    def set_model(self, name: str, status: str):
+        with self.lock:
+            self.models[name] = status
+
+    @contextmanager
+    def step(self, name: str):
+        with self.lock:
+            self.steps[name] = {"status": "running", "ms": None}
+        t = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            with self.lock:
+                self.steps[name] = {"status": "failed", "ms": round((time.perf_counter() - t) * 1000, 1)}
+            raise
+        with self.lock:
+            self.steps[name] = {"status": "done", "ms": round((time.perf_counter() - t) * 1000, 1)}
+
+    def run(self, load_fn):
+        # load_fn(self): adımları self.step(...) ile kaydeder, sonunda set_state("ready") der
+        with self.lock:
+            self.started = time.perf_counter()
+            self.finished = None
+            self.last_error = None
+        try:
+            load_fn(self)
+        except Exception as e:
+            logging.getLogger(__name__).exception("model load / warm-up failed")
+            with self.lock:
+                self.state = "failed"
+                self.last_error = str(e)
+        finally:
+            with self.lock:
+                self.finished = time.perf_counter()
+
+    def start(self, load_fn):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self.run, args=(load_fn,), name="model-warmup", daemon=True)
+        self.thread.start()
+
+    def wait(self, timeout: float = None) -> bool:
+        if self.thread is not None:
+            self.thread.join(timeout)
+        return self.ready
+
+    def stats(self) -> dict:
+        with self.lock:
+            elapsed = None
+            if self.started is not None:
+                end = self.finished if self.finished is not None else time.perf_counter()
+                elapsed = round((end - self.started) * 1000, 1)
+            return {
+                "ready": self.state == "ready",
+                "state": self.state,
+                "models": dict(self.models),
+                "steps": {k: dict(v) for k, v in self.steps.items()},
+                "elapsed_ms": elapsed,
+                "last_error": self.last_error,
+            }
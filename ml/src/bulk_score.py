@@ -0,0 +1,290 @@
+"""
+Büyük veri setlerini API'ye gitmeden, eğitilmiş ensemble ile toplu skorlar.
+
+    python bulk_score.py data/processed/dataset_clean.csv out/scores.csv
+    python bulk_score.py corpus.parquet out/scores_parquet --workers 8 --chunk-size 20000
+    python bulk_score.py corpus.csv out/scores.csv --resume
+
+Girdi parça parça okunur (CSV: pandas chunksize, Parquet: pyarrow iter_batches),
+parçalar process pool'a dağıtılır. Her worker modeli bir kez, mmap ile açar
+(N worker = diskteki bundle'ın tek page cache kopyası). Sonuçlar girdi sırasıyla
+parça parça yazılır:
+  .csv çıktı      -> tek dosyaya eklenir
+  diğer (dizin)   -> part-000000.parquet, part-000001.parquet, ...
+
+Çıktı kolonları: id, <model>_ai_pct (her model için), final_label (API'deki
+majority_vote ile aynı). Boş metinli satırlarda skor ve etiket boş kalır.
+
+Her parçadan sonra <çıktı>.progress.json güncellenir; --resume yazılmış parçaları
+atlar ve yarım kalan son yazımı keser. Model önceliği API ile aynı:
+registry/CURRENT (ya da --version), ensemble_bundle, üç pipeline.
+"""
+import argparse
+import json
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+import model_registry
+from ensemble import FusedEnsemble, majority_vote
+
+MODELS_DIR = Path(__file__).resolve().parents[1] / "models"
+PIPELINE_FILES = {
+    "logreg": "logreg.joblib",
+    "svm_calibrated": "svm_calibrated.joblib",
+    "multinomial_nb": "multinomial_nb.joblib",
+}
+
+PROGRESS_SUFFIX = ".progress.json"
+
+_ensemble = None  # worker başına bir kez yüklenir
+
+
+def pct(x: float) -> float:
+    return round(float(x) * 100.0, 2)
+
+
+def resolve_bundle(models_dir: Path, version=None):
+    # (bundle dizini, sürüm, geçici mi); pipeline'lar bir kez fuse edilip geçici bundle'a yazılır
+    registry_dir = models_dir / "registry"
+    version = version or model_registry.read_current(registry_dir)
+    if version is not None:
+        model_registry.verify(registry_dir, version)
+        return model_registry.version_dir(registry_dir, version), version, False
+
+    bundle_dir = models_dir / "ensemble_bundle"
+    if (bundle_dir / "manifest.json").exists():
+        return bundle_dir, model_registry.artifact_version(sorted(bundle_dir.iterdir())), False
+
+    import joblib
+
+    paths = {name: models_dir / fname for name, fname in PIPELINE_FILES.items()}
+    missing = [str(p) for p in paths.values() if not p.exists()]
+    if missing:
+        raise FileNotFoundError(f"Model bulunamadı: {', '.join(missing)}")
+    ensemble = FusedEnsemble.from_models({name: joblib.load(p) for name, p in paths.items()})
+    bundle_dir = Path(tempfile.mkdtemp(prefix="bulk_score_"))
+    ensemble.save_bundle(bundle_dir)
+    return bundle_dir, model_registry.artifact_version(paths.values()), True
+
+
+def init_worker(bundle_dir):
+    global _ensemble
+    # Ctrl+C'yi ana süreç karşılar (bekleyen işleri iptal edip checkpoint'te durur)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _ensemble = FusedEnsemble.load_bundle(bundle_dir, mmap_mode="r")
+
+
+def score_chunk(ids, texts):
+    # -> kolon sözlüğü; boş metinler skorlanmaz
+    texts = [t.strip() if isinstance(t, str) else "" for t in texts]
+    valid = [i for i, t in enumerate(texts) if t]
+    probas = _ensemble.predict_proba([texts[i] for i in valid]) if valid else {}
+
+    names = _ensemble.model_names
+    columns = {"id": list(ids)}
+    for name in names:
+        columns[f"{name}_ai_pct"] = [None] * len(texts)
+    columns["final_label"] = [None] * len(texts)
+    for j, i in enumerate(valid):
+        preds = [{"model": name, "ai_pct": pct(probas[name][j][1])} for name in names]
+        for p in preds:
+            columns[f"{p['model']}_ai_pct"][i] = p["ai_pct"]
+        columns["final_label"][i] = majority_vote(preds)
+    return columns
+
+
+def require_pyarrow():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        sys.exit("Parquet için pyarrow gerekli: pip install pyarrow")
+    return pq
+
+
+def iter_input(path: Path, text_col: str, id_col: str, chunk_size: int):
+    # (ids, texts) parçaları; id kolonu yoksa 0 tabanlı satır numarası
+    start = 0
+    if path.suffix.lower() == ".parquet":
+        pq = require_pyarrow()
+        pf = pq.ParquetFile(path)
+        names = pf.schema_arrow.names
+        if text_col not in names:
+            raise ValueError(f"'{text_col}' kolonu yok: {names}")
+        columns = [text_col] + ([id_col] if id_col in names else [])
+        for batch in pf.iter_batches(batch_size=chunk_size, columns=columns):
+            texts = batch.column(text_col).to_pylist()
+            ids = batch.column(id_col).to_pylist() if id_col in names else list(range(start, start + len(texts)))
+            start += len(texts)
+            yield ids, texts
+        return
+
+    header = pd.read_csv(path, nrows=0).columns
+    if text_col not in header:
+        raise ValueError(f"'{text_col}' kolonu yok: {list(header)}")
+    usecols = [text_col] + ([id_col] if id_col in header else [])
+    reader = pd.read_csv(path, usecols=usecols, dtype=str, keep_default_na=False, chunksize=chunk_size)
+    for df in reader:
+        texts = df[text_col].tolist()
+        ids = df[id_col].tolist() if id_col in header else list(range(start, start + len(texts)))
+        start += len(texts)
+        yield ids, texts
+
+
+class OutputWriter:
+    """Parçaları sırayla yazar; her parçadan sonra progress dosyasını atomik günceller."""
+
+    def __init__(self, out_path: Path, meta: dict, resume: bool):
+        self.out_path = out_path
+        self.progress_path = out_path.with_name(out_path.name + PROGRESS_SUFFIX)
+        self.csv = out_path.suffix.lower() == ".csv"
+        self.progress = {**meta, "chunks_done": 0, "rows_done": 0, "output_bytes": 0}
+
+        if resume and self.progress_path.exists():
+            with open(self.progress_path, encoding="utf-8") as f:
+                saved = json.load(f)
+            changed = [k for k in meta if saved.get(k) != meta[k]]
+            if changed:
+                raise ValueError(f"--resume: girdi/ayarlar değişmiş ({', '.join(changed)}); baştan çalıştırın")
+            self.progress = saved
+        elif resume:
+            print("progress dosyası yok, baştan başlanıyor", file=sys.stderr)
+
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.csv:
+            # son checkpoint'ten sonra yarım yazılmış satırlar kesilir
+            if self.progress["chunks_done"] and not out_path.exists():
+                raise ValueError(f"--resume: {out_path} bulunamadı; baştan çalıştırın")
+            self.file = open(out_path, "r+b" if self.progress["chunks_done"] else "wb")
+            self.file.truncate(self.progress["output_bytes"])
+            self.file.seek(self.progress["output_bytes"])
+        else:
+            out_path.mkdir(parents=True, exist_ok=True)
+            self.pq = require_pyarrow()
+            import pyarrow as pa
+
+            self.pa = pa
+            for part in out_path.glob("part-*.parquet"):
+                if int(part.stem.split("-")[1]) >= self.progress["chunks_done"]:
+                    part.unlink()
+
+    @property
+    def chunks_done(self) -> int:
+        return self.progress["chunks_done"]
+
+    def write(self, columns: dict):
+        df = pd.DataFrame(columns)
+        if self.csv:
+            header = self.progress["output_bytes"] == 0
+            self.file.write(df.to_csv(index=False, header=header).encode("utf-8"))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.progress["output_bytes"] = self.file.tell()
+        else:
+            part = self.out_path / f"part-{self.progress['chunks_done']:06d}.parquet"
+            tmp = part.with_suffix(".tmp")
+            self.pq.write_table(self.pa.Table.from_pandas(df, preserve_index=False), tmp)
+            os.replace(tmp, part)
+        self.progress["chunks_done"] += 1
+        self.progress["rows_done"] += len(df)
+
+        tmp = self.progress_path.with_name(self.progress_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.progress, f, indent=2)
+        os.replace(tmp, self.progress_path)
+
+    def close(self):
+        if self.csv:
+            self.file.close()
+
+
+def run(args):
+    input_path = args.input.resolve()
+    bundle_dir, version, temporary = resolve_bundle(args.models_dir, args.version)
+    try:
+        score_file(args, input_path, bundle_dir, version)
+    finally:
+        if temporary:
+            shutil.rmtree(bundle_dir, ignore_errors=True)
+
+
+def score_file(args, input_path, bundle_dir, version):
+    stat = input_path.stat()
+    meta = {
+        "input": str(input_path),
+        "input_size": stat.st_size,
+        "input_mtime": stat.st_mtime,
+        "text_col": args.text_col,
+        "chunk_size": args.chunk_size,
+        "model_version": version,
+    }
+    writer = OutputWriter(args.output, meta, args.resume)
+    skip = writer.chunks_done
+    print(f"model {version}, {args.workers} worker, {skip} parça zaten yazılmış", file=sys.stderr)
+
+    t0 = time.time()
+    rows = 0
+    # sıralı yazım + sınırlı bellek: en fazla workers * 2 parça havada
+    in_flight = deque()
+    pool = ProcessPoolExecutor(args.workers, initializer=init_worker, initargs=(str(bundle_dir),))
+
+    def drain(limit):
+        nonlocal rows
+        while len(in_flight) > limit:
+            columns = in_flight.popleft().result()
+            writer.write(columns)
+            rows += len(columns["id"])
+            if writer.chunks_done % args.log_every == 0:
+                rate = rows / max(time.time() - t0, 1e-9)
+                print(f"{writer.progress['rows_done']} satır ({rate:.0f} satır/sn)", file=sys.stderr)
+
+    try:
+        for i, (ids, texts) in enumerate(iter_input(input_path, args.text_col, args.id_col, args.chunk_size)):
+            if i < skip:
+                continue
+            in_flight.append(pool.submit(score_chunk, ids, texts))
+            drain(args.workers * 2)
+        drain(0)
+    except KeyboardInterrupt:
+        pool.shutdown(wait=False, cancel_futures=True)
+        sys.exit(f"kesildi: {writer.progress['rows_done']} satır yazıldı, --resume ile devam edilebilir")
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        writer.close()
+
+    elapsed = time.time() - t0
+    print(
+        f"tamam: {writer.progress['rows_done']} satır, bu çalıştırmada {rows} satır "
+        f"{elapsed:.1f} sn ({rows / max(elapsed, 1e-9):.0f} satır/sn)",
+        file=sys.stderr,
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser(description="toplu skorlama (CSV / Parquet)")
+    ap.add_argument("input", type=Path)
+    ap.add_argument("output", type=Path, help=".csv dosyası ya da Parquet part'ları için dizin")
+    ap.add_argument("--text-col", default="text")
+    ap.add_argument("--id-col", default="id")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--chunk-size", type=int, default=5000)
+    ap.add_argument("--models-dir", type=Path, default=MODELS_DIR)
+    ap.add_argument("--version", help="registry sürümü (varsayılan: CURRENT)")
+    ap.add_argument("--resume", action="store_true")
+    ap.add_argument("--log-every", type=int, default=10, help="kaç parçada bir ilerleme yazılsın")
+    try:
+        run(ap.parse_args())
+    except (ValueError, FileNotFoundError) as e:
+        sys.exit(f"hata: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1158 @@
+"""
+Fused ensemble: metni tek sefer vektörize edip üç modelin başlığını (head)
+aynı sparse satır üzerinde çalıştırır.
+
+Eğitimde her pipeline kendi TfidfVectorizer'ını taşıyor (svm_calibrated'da
+cv=3 yüzünden üç tane). Burada bütün sözlüklerin birleşimi üzerinde tek bir
+sayım (Featurizer) yapılır; logreg/nb'nin idf + normalizasyonu bu ortak sayım
+matrisinin kolon izdüşümü olarak uygulanır, svm_calibrated ise aynı sayımlar
+üzerinde çalışan tek bir lineer skorlayıcıya (CalibratedLinearScorer) indirgenir.
+
+HashingVectorizer + TfidfTransformer ile eğitilmiş pipeline'larda sözlük yoktur:
+HashingFeaturizer token'ları murmurhash3 ile kovalara dağıtır, ortak kolonlar
+kova numaralarıdır (boyut sözlükten değil n_features'tan gelir).
+
+Ensemble'ın tamamı numpy dizileri + küçük bir manifest'ten oluşur:
+save_bundle() bunları .npy olarak yazar, load_bundle(mmap_mode="r") ile
+açıldığında diziler page cache'ten paylaşılır (N worker = tek kopya).
+"""
+import json
+import re
+import time
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.special import expit, logsumexp
+
+# sklearn import'u tek başına ~1 sn (sklearn.base -> scipy.stats, pandas); bundle'dan
+# servis ederken gerekmiyor, bu yüzden sadece pipeline'lardan kurarken içeride import edilir
+
+MODEL_ORDER = ("logreg", "svm_calibrated", "multinomial_nb")
+BUNDLE_FORMAT = 1
+
+# kaskad sırası ucuzdan pahalıya: logreg ve nb aynı TF-IDF view'ını paylaşan tek satırlık
+# dot product'lar; svm_calibrated fold başına bir ağırlık satırı + norm hesabı (k kat iş)
+CASCADE_ORDER = ("logreg", "multinomial_nb", "svm_calibrated")
+
+# bu kadar metne kadar scipy.sparse kurulmaz: metin başına birkaç yüz kolonluk
+# numpy gather + dot (tek metinde sparse matris kurulumu hesabın kendisinden pahalı)
+DOC_PATH_MAX_TEXTS = 8
+
+# explain(): terim başına döndürülen en fazla karakter aralığı
+EXPLAIN_MAX_OFFSETS = 20
+
+# CountVectorizer'a aynen aktarılan tokenizasyon parametreleri
+ANALYZER_PARAMS = (
+    "input", "encoding", "decode_error", "strip_accents", "lowercase",
+    "preprocessor", "tokenizer", "stop_words", "token_pattern",
+    "ngram_range", "analyzer",
+)
+
+
+def is_calibrated(model) -> bool:
+    from sklearn.calibration import CalibratedClassifierCV
+    return isinstance(model, CalibratedClassifierCV)
+
+
+class HashedTfidf:
+    """HashingVectorizer + TfidfTransformer çiftini TfidfVectorizer gibi gösterir (vocabulary_ yok)."""
+
+    vocabulary_ = None
+
+    def __init__(self, hasher, tfidf):
+        if hasher.norm is not None or hasher.alternate_sign:
+            raise ValueError("HashingVectorizer norm=None, alternate_sign=False ile kurulmalı.")
+        self.hasher = hasher
+        self.tfidf = tfidf
+        self.n_features = hasher.n_features
+        self.binary = hasher.binary
+        self.norm = tfidf.norm
+        self.sublinear_tf = tfidf.sublinear_tf
+        self.use_idf = tfidf.use_idf
+
+    @property
+    def idf_(self):
+        return self.tfidf.idf_
+
+    def get_params(self):
+        return self.hasher.get_params()
+
+
+def split_pipeline(pipe):
+    # build_pipelines(): ("tfidf", TfidfVectorizer) ya da
+    # ("hash", HashingVectorizer) + ("tfidf", TfidfTransformer), ardından ("clf", ...)
+    steps = [step for _, step in pipe.steps]
+    if len(steps) == 2:
+        return steps[0], steps[1]
+    if len(steps) == 3 and type(steps[0]).__name__ == "HashingVectorizer":
+        return HashedTfidf(steps[0], steps[1]), steps[2]
+    raise ValueError(f"Beklenmeyen pipeline yapısı: {[n for n, _ in pipe.steps]}")
+
+
+def calibrated_folds(model):
+    """(vectorizer, clf, calibrator) üçlüleri; her cv fold'u için bir tane."""
+    folds = []
+    for cc in model.calibrated_classifiers_:
+        est = getattr(cc, "estimator", None) or getattr(cc, "base_estimator")
+        vec, clf = split_pipeline(est)
+        if len(cc.calibrators) != 1:
+            raise ValueError("Sadece ikili (human/ai) kalibrasyon destekleniyor.")
+        folds.append((vec, clf, cc.calibrators[0]))
+    return folds
+
+
+def same_vectorizer(a, b) -> bool:
+    if (a.norm, a.binary, a.sublinear_tf, a.use_idf) != (b.norm, b.binary, b.sublinear_tf, b.use_idf):
+        return False
+    if a.use_idf and not np.array_equal(a.idf_, b.idf_):
+        return False
+    if isinstance(a, HashedTfidf) or isinstance(b, HashedTfidf):
+        return getattr(a, "n_features", None) == getattr(b, "n_features", None)
+    return a.vocabulary_ == b.vocabulary_
+
+
+def union_vocabulary(vectorizers):
+    # kolon sırası = terimlerin utf-8 byte sırası; Featurizer aynı sırada ikili arama yapar
+    terms = set()
+    for vec in vectorizers:
+        terms.update(vec.vocabulary_)
+    return {term: i for i, term in enumerate(sorted(terms, key=lambda t: t.encode("utf-8")))}
+
+
+def view_columns(vec, union_index):
+    # view kolonu j -> ortak sayım kolonu; hashing'de kova numaraları zaten ortak
+    if union_index is None:
+        return np.arange(vec.n_features)
+    cols = np.empty(len(vec.vocabulary_), dtype=np.int64)
+    for term, j in vec.vocabulary_.items():
+        cols[j] = union_index[term]
+    return cols
+
+
+def analyzer_params(vec):
+    params = vec.get_params()
+    return {k: params[k] for k in ANALYZER_PARAMS}
+
+
+def resolve_stop_words(params: dict) -> dict:
+    # "english" gibi hazır listeler açık kelime listesine çevrilir; bundle sklearn'e bağlı kalmaz
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    stop_words = CountVectorizer(**params).get_stop_words()
+    return dict(params, stop_words=sorted(stop_words) if stop_words else None)
+
+
+def rotl32(x, r):
+    return (x << np.uint32(r)) | (x >> np.uint32(32 - r))
+
+
+def murmurhash3_32(keys):
+    """
+    bytes listesi için vektörize MurmurHash3 (x86, 32 bit, seed=0), işaretli int32.
+    sklearn.utils.murmurhash3_32 / HashingVectorizer ile aynı değerler.
+    """
+    n = len(keys)
+    lens = np.fromiter(map(len, keys), dtype=np.int64, count=n)
+    width = max(4, int(-(-lens.max() // 4) * 4)) if n else 4
+    n_blocks = width // 4
+    # S<width> sağdan \0 ile doldurur: kuyruk baytları little-endian okununca murmur'un k1'i çıkar
+    blocks = np.frombuffer(np.array(keys, dtype=f"S{width}").tobytes(), dtype="<u4").reshape(n, n_blocks)
+    full = lens // 4
+
+    c1, c2 = np.uint32(0xCC9E2D51), np.uint32(0x1B873593)
+    h = np.zeros(n, dtype=np.uint32)
+    for j in range(n_blocks):
+        k = rotl32(blocks[:, j] * c1, 15) * c2
+        mixed = rotl32(h ^ k, 13) * np.uint32(5) + np.uint32(0xE6546B64)
+        h = np.where(full > j, mixed, h)
+
+    has_tail = (lens & 3) > 0
+    tail = blocks[np.arange(n), np.minimum(full, n_blocks - 1)]
+    k = rotl32(tail * c1, 15) * c2
+    h = np.where(has_tail, h ^ k, h)
+
+    h ^= lens.astype(np.uint32)
+    h ^= h >> np.uint32(16)
+    h *= np.uint32(0x85EBCA6B)
+    h ^= h >> np.uint32(13)
+    h *= np.uint32(0xC2B2AE35)
+    h ^= h >> np.uint32(16)
+    return h.view(np.int32)
+
+
+def word_ngrams(tokens, min_n, max_n):
+    # CountVectorizer._word_ngrams ile aynı sıra
+    if max_n == 1:
+        return tokens
+    original = tokens
+    n_original = len(original)
+    if min_n == 1:
+        tokens = list(original)
+        min_n += 1
+    else:
+        tokens = []
+    for n in range(min_n, min(max_n + 1, n_original + 1)):
+        for i in range(n_original - n + 1):
+            tokens.append(" ".join(original[i: i + n]))
+    return tokens
+
+
+def build_word_analyzer(params: dict):
+    """
+    Eğitimde kullanılan ayarlar (analyzer="word", hazır stop word listesi, aksan
+    temizleme yok) için sklearn'süz analyzer. Diğer ayarlarda None döner.
+    """
+    if params["analyzer"] != "word" or params["input"] != "content" or params["strip_accents"] is not None:
+        return None
+    if isinstance(params["stop_words"], str):
+        return None
+    token_re = re.compile(params["token_pattern"])
+    if token_re.groups > 1:
+        return None
+
+    stop_words = frozenset(params["stop_words"] or ())
+    lowercase = params["lowercase"]
+    min_n, max_n = params["ngram_range"]
+    encoding, decode_error = params["encoding"], params["decode_error"]
+
+    def analyze(doc):
+        if isinstance(doc, bytes):
+            doc = doc.decode(encoding, decode_error)
+        if lowercase:
+            doc = doc.lower()
+        tokens = token_re.findall(doc)
+        if stop_words:
+            tokens = [w for w in tokens if w not in stop_words]
+        return word_ngrams(tokens, min_n, max_n)
+
+    return analyze
+
+
+def build_span_analyzer(params: dict):
+    """
+    build_word_analyzer ile aynı terimler + her terimin metindeki (başlangıç, bitiş)
+    karakter aralığı; n-gram aralığı ilk kelimenin başından son kelimenin sonuna.
+    analyze(doc) -> (terms, spans). build_word_analyzer desteklemiyorsa None.
+    """
+    if build_word_analyzer(params) is None:
+        return None
+    token_re = re.compile(params["token_pattern"])
+    group = 1 if token_re.groups else 0
+    stop_words = frozenset(params["stop_words"] or ())
+    lowercase = params["lowercase"]
+    min_n, max_n = params["ngram_range"]
+    encoding, decode_error = params["encoding"], params["decode_error"]
+
+    def analyze(doc):
+        if isinstance(doc, bytes):
+            doc = doc.decode(encoding, decode_error)
+        text, index = doc, None
+        if lowercase:
+            text = doc.lower()
+            if len(text) != len(doc):
+                # küçülünce uzayan karakterler (ör. "İ"): aralıkları orijinal metne geri eşle
+                index = [i for i, ch in enumerate(doc) for _ in ch.lower()]
+        words, spans = [], []
+        for m in token_re.finditer(text):
+            word = m.group(group)
+            if word in stop_words:
+                continue
+            start, end = m.span(group)
+            if index is not None:
+                start, end = index[start], (index[end - 1] + 1 if end > start else index[start])
+            words.append(word)
+            spans.append((start, end))
+        terms = word_ngrams(words, min_n, max_n)
+        if max_n == 1:
+            return terms, spans
+        # word_ngrams ile aynı sıra
+        term_spans = list(spans) if min_n == 1 else []
+        for n in range(max(min_n, 2), min(max_n + 1, len(words) + 1)):
+            for i in range(len(words) - n + 1):
+                term_spans.append((spans[i][0], spans[i + n - 1][1]))
+        return terms, term_spans
+
+    return analyze
+
+
+def normalize_rows(X, norm):
+    # sklearn.preprocessing.normalize(X, norm) karşılığı (csr, yerinde)
+    if norm == "l2":
+        sums = np.asarray(X.multiply(X).sum(axis=1)).ravel()
+        norms = np.sqrt(sums)
+    elif norm == "l1":
+        norms = np.asarray(abs(X).sum(axis=1)).ravel()
+    else:
+        from sklearn.preprocessing import normalize
+        return normalize(X, norm=norm, copy=False)
+    norms[norms == 0.0] = 1.0
+    X.data /= np.repeat(norms, np.diff(X.indptr))
+    return X
+
+
+def class_order(classes):
+    classes = [str(c) for c in classes]
+    return [classes.index("human"), classes.index("ai")]
+
+
+def binary_proba(pos, order):
+    # pos: classes_[1] olasılığı -> kolonlar [human, ai]
+    proba = np.empty((pos.shape[0], 2))
+    proba[:, 1] = pos
+    proba[:, 0] = 1.0 - pos
+    return proba[:, order]
+
+
+def majority_vote(preds):
+    # preds: [{"model": "...", "ai_pct": 12.3, ...}]; API ve toplu skorlama aynı kuralı kullanır
+    votes_ai = sum(1 for p in preds if p["ai_pct"] >= 50.0)
+    return "ai" if votes_ai >= 2 else "human"
+
+
+def cascade_vote(preds, n_models: int = len(MODEL_ORDER)):
+    # kaskadda çalışmayan modeller oy vermez: kesinleşmiş çoğunluk varsa o,
+    # yoksa (margin ile erken çıkış) çalışan modellerin ortalama olasılığının tarafı.
+    # Üç model de çalıştıysa majority_vote ile aynı sonucu verir
+    need = n_models // 2 + 1
+    votes_ai = sum(1 for p in preds if p["ai_pct"] >= 50.0)
+    if votes_ai >= need:
+        return "ai"
+    if len(preds) - votes_ai >= need:
+        return "human"
+    return "ai" if sum(p["ai_pct"] for p in preds) / len(preds) >= 50.0 else "human"
+
+
+def lap(timings, key, t0):
+    # timings verilmişse key'e t0'dan beri geçen süreyi ekler; yeni başlangıç zamanını döndürür
+    if timings is None:
+        return t0
+    t = time.perf_counter()
+    timings[key] = timings.get(key, 0.0) + (t - t0)
+    return t
+
+
+def tag_model(exc, name):
+    # hatanın oluştuğu head; API errors_total{model} etiketinde kullanır (süreç havuzundan
+    # pickle ile döner: exception __dict__'i korunur)
+    if getattr(exc, "model", None) is None:
+        exc.model = name
+
+
+def ai_votes(pos):
+    # API'deki oy eşiğiyle aynı: yüzdeye çevrilip 2 haneye yuvarlanmış değer >= 50
+    return np.round(pos * 100.0, 2) >= 50.0
+
+
+class Featurizer:
+    """
+    Birleşik sözlük üzerinde ham sayım (CountVectorizer.transform karşılığı).
+    Sözlük Python dict yerine sıralı bir numpy bytes dizisi olarak tutulur ve
+    np.searchsorted ile aranır; böylece mmap'lenip worker'lar arasında paylaşılabilir.
+    """
+
+    def __init__(self, params: dict, terms):
+        if callable(params.get("preprocessor")) or callable(params.get("tokenizer")) \
+                or callable(params.get("analyzer")):
+            raise ValueError("Özel preprocessor/tokenizer/analyzer bundle'a yazılamaz.")
+        self.params = params
+        self.terms = terms  # (V,) dtype=S<n>, sıralı
+        self._analyzer = None
+        self._span_analyzer = False  # False = henüz kurulmadı; None = desteklenmiyor
+
+    type_name = "vocabulary"
+
+    @classmethod
+    def from_vocabulary(cls, params: dict, union_index: dict):
+        terms = sorted(union_index, key=union_index.get)
+        return cls(resolve_stop_words(params), np.array([t.encode("utf-8") for t in terms]))
+
+    @property
+    def n_features(self) -> int:
+        return self.terms.shape[0]
+
+    @property
+    def analyzer(self):
+        if self._analyzer is None:
+            self._analyzer = build_word_analyzer(self.params)
+        if self._analyzer is None:
+            from sklearn.feature_extraction.text import CountVectorizer
+            self._analyzer = CountVectorizer(**self.params).build_analyzer()
+        return self._analyzer
+
+    @property
+    def span_analyzer(self):
+        if self._span_analyzer is False:
+            self._span_analyzer = build_span_analyzer(self.params)
+        return self._span_analyzer
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["_analyzer"] = None
+        state["_span_analyzer"] = False
+        return state
+
+    def lookup(self, tokens):
+        # token -> union kolonu; sözlükte olmayanlar -1
+        V = self.n_features
+        cols = np.full(len(tokens), -1, dtype=np.int64)
+        if not tokens or V == 0:
+            return cols
+
+        encoded = [t.encode("utf-8") for t in tokens]
+        # sözlükteki en uzun terimden uzunları numpy kırpar; kırpılan token
+        # bir terimle eşleşse bile sayılmamalı
+        fits = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)) <= self.terms.dtype.itemsize
+        keys = np.array(encoded, dtype=self.terms.dtype)
+
+        pos = np.searchsorted(self.terms, keys)
+        hit = fits & (pos < V)
+        hit[hit] = self.terms[pos[hit]] == keys[hit]
+        cols[hit] = pos[hit]
+        return cols
+
+    def transform(self, texts):
+        if isinstance(texts, str):
+            raise ValueError("Tek string değil, metin listesi bekleniyor.")
+        analyze = self.analyzer
+        rows, tokens = [], []
+        n = 0
+        for doc in texts:
+            terms = analyze(doc)
+            tokens.extend(terms)
+            rows.extend([n] * len(terms))
+            n += 1
+
+        cols = self.lookup(tokens)
+        hit = cols >= 0
+        X = sp.csr_matrix(
+            (np.ones(int(hit.sum())), (np.asarray(rows, dtype=np.int64)[hit], cols[hit])),
+            shape=(n, self.n_features),
+            dtype=np.float64,
+        )
+        X.sum_duplicates()
+        return X
+
+    def doc_counts(self, doc):
+        # tek metin: (sıralı union kolonları, sayımlar); transform()'un bir satırı
+        cols = self.lookup(self.analyzer(doc))
+        cols, counts = np.unique(cols[cols >= 0], return_counts=True)
+        return cols, counts.astype(np.float64)
+
+    def state(self):
+        params = dict(self.params)
+        params["ngram_range"] = list(params["ngram_range"])
+        if isinstance(params.get("stop_words"), (set, frozenset)):
+            params["stop_words"] = sorted(params["stop_words"])
+        return {"params": params}, {"terms": self.terms}
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        params = dict(meta["params"])
+        params["ngram_range"] = tuple(params["ngram_range"])
+        return cls(params, arrays["terms"])
+
+
+class HashingFeaturizer(Featurizer):
+    """
+    HashingVectorizer(norm=None, alternate_sign=False).transform karşılığı: sözlük
+    tutulmaz, token'ın kolonu abs(murmurhash3_32(token)) % n_features.
+    """
+
+    type_name = "hashing"
+    # bundan uzun token'lar tek tek hash'lenir (tek bir uzun token bütün batch'i genişletmesin)
+    MAX_BATCH_KEY_BYTES = 128
+
+    def __init__(self, params: dict, n_hash_features: int):
+        super().__init__(params, None)
+        self.n_hash_features = int(n_hash_features)
+
+    @classmethod
+    def from_hasher(cls, params: dict, n_features: int):
+        return cls(resolve_stop_words(params), n_features)
+
+    @property
+    def n_features(self) -> int:
+        return self.n_hash_features
+
+    def lookup(self, tokens):
+        cols = np.full(len(tokens), -1, dtype=np.int64)
+        if not tokens:
+            return cols
+        encoded = [t.encode("utf-8") for t in tokens]
+        short = [i for i, b in enumerate(encoded) if len(b) <= self.MAX_BATCH_KEY_BYTES]
+        hashes = np.empty(len(encoded), dtype=np.int64)
+        if len(short) == len(encoded):
+            hashes[:] = murmurhash3_32(encoded)
+        else:
+            hashes[short] = murmurhash3_32([encoded[i] for i in short])
+            for i, b in enumerate(encoded):
+                if len(b) > self.MAX_BATCH_KEY_BYTES:
+                    hashes[i] = murmurhash3_32([b])[0]
+        # int64'te abs(-2**31) taşmaz; sklearn'deki özel durumla aynı sonucu verir
+        cols[:] = np.abs(hashes) % self.n_hash_features
+        return cols
+
+    def state(self):
+        meta, _ = super().state()
+        meta["n_features"] = self.n_hash_features
+        return meta, {}
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        params = dict(meta["params"])
+        params["ngram_range"] = tuple(params["ngram_range"])
+        return cls(params, meta["n_features"])
+
+
+FEATURIZER_TYPES = {f.type_name: f for f in (Featurizer, HashingFeaturizer)}
+
+
+class TfidfView:
+    """Ortak sayım matrisinden tek bir fitted TfidfVectorizer çıktısını üretir."""
+
+    def __init__(self, col_map, idf, norm, binary, sublinear_tf, n_cols=None):
+        self.col_map = col_map  # union kolonu -> view kolonu, yoksa -1; None = birebir (hashing)
+        self.idf = idf
+        self.norm = norm
+        self.binary = binary
+        self.sublinear_tf = sublinear_tf
+        self.n_cols = n_cols
+
+    @classmethod
+    def from_vectorizer(cls, vec, union_index: dict):
+        idf = np.asarray(vec.idf_, dtype=np.float64) if vec.use_idf else None
+        if union_index is None:
+            return cls(None, idf, vec.norm, vec.binary, vec.sublinear_tf, n_cols=vec.n_features)
+        col_map = np.full(len(union_index), -1, dtype=np.int32)
+        col_map[view_columns(vec, union_index)] = np.arange(len(vec.vocabulary_), dtype=np.int32)
+        return cls(col_map, idf, vec.norm, vec.binary, vec.sublinear_tf)
+
+    @property
+    def n_features(self) -> int:
+        if self.col_map is None:
+            return self.n_cols
+        return int(self.col_map.max()) + 1 if self.col_map.size else 0
+
+    def transform(self, counts):
+        if self.col_map is None:
+            X = counts.astype(np.float64, copy=True)
+        else:
+            # union kolonlarını bu vectorizer'ın kolon sırasına indir
+            cols = self.col_map[counts.indices]
+            keep = cols >= 0
+            rows = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr))
+            X = sp.csr_matrix(
+                (counts.data[keep], (rows[keep], cols[keep])),
+                shape=(counts.shape[0], self.n_features),
+                dtype=np.float64,
+            )
+        X.sort_indices()
+
+        # TfidfTransformer.transform ile aynı sıra
+        if self.binary:
+            X.data[:] = 1.0
+        if self.sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1.0
+        if self.idf is not None:
+            X.data *= self.idf[X.indices]
+        if self.norm is not None:
+            X = normalize_rows(X, self.norm)
+        return X
+
+    def transform_doc(self, cols, counts):
+        # transform()'un tek satırlık karşılığı: (view kolonları, tf-idf değerleri)
+        if self.col_map is None:
+            vcols, vals = cols, counts
+        else:
+            vcols = self.col_map[cols]
+            keep = vcols >= 0
+            vcols, vals = vcols[keep], counts[keep]
+        if self.binary:
+            vals = np.ones_like(vals)
+        if self.sublinear_tf:
+            vals = np.log(vals) + 1.0
+        if self.idf is not None:
+            vals = vals * self.idf[vcols]
+        if self.norm == "l2":
+            norm = np.sqrt(vals @ vals)
+        elif self.norm == "l1":
+            norm = np.abs(vals).sum()
+        elif self.norm is None:
+            norm = 0.0
+        else:
+            raise ValueError(f"Desteklenmeyen norm: {self.norm}")
+        if norm > 0:
+            vals = vals / norm
+        return vcols, vals
+
+    def doc_positions(self, cols):
+        # transform_doc() çıktısındaki her değerin cols içindeki konumu
+        if self.col_map is None:
+            return np.arange(len(cols))
+        return np.nonzero(self.col_map[cols] >= 0)[0]
+
+    def state(self):
+        meta = {"norm": self.norm, "binary": self.binary, "sublinear_tf": self.sublinear_tf}
+        arrays = {}
+        if self.col_map is None:
+            meta["n_features"] = self.n_cols
+        else:
+            arrays["col_map"] = self.col_map
+        if self.idf is not None:
+            arrays["idf"] = self.idf
+        return meta, arrays
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        return cls(arrays.get("col_map"), arrays.get("idf"), meta["norm"], meta["binary"],
+                   meta["sublinear_tf"], n_cols=meta.get("n_features"))
+
+
+class LogisticHead:
+    """İkili LogisticRegression: p(classes_[1]) = expit(x · w + b)."""
+
+    type_name = "logistic"
+
+    def __init__(self, view_idx: int, coef, intercept: float, classes):
+        self.view_idx = view_idx
+        self.coef = coef  # (V_view,)
+        self.intercept = float(intercept)
+        self.classes = [str(c) for c in classes]
+        self.order = class_order(self.classes)
+
+    @classmethod
+    def from_classifier(cls, view_idx, clf):
+        if clf.coef_.shape[0] != 1:
+            raise ValueError("Sadece ikili LogisticRegression destekleniyor.")
+        return cls(view_idx, np.asarray(clf.coef_[0], dtype=np.float64), clf.intercept_[0], clf.classes_)
+
+    def predict_proba(self, counts, feats):
+        decision = feats[self.view_idx] @ self.coef + self.intercept
+        return binary_proba(expit(decision), self.order)
+
+    def predict_proba_doc(self, cols, counts, feats):
+        vcols, vals = feats[self.view_idx]
+        pos = expit(self.coef[vcols] @ vals + self.intercept)
+        return np.array([1.0 - pos, pos])[self.order]
+
+    def contributions_doc(self, cols, counts, feats, positions):
+        # AI log-odds'una katkılar: (cols içindeki konumlar, katkılar, sabit terim)
+        vcols, vals = feats[self.view_idx]
+        sign = 1.0 if self.order[1] == 1 else -1.0
+        return positions[self.view_idx], sign * self.coef[vcols] * vals, sign * self.intercept
+
+    def state(self):
+        return ({"view": self.view_idx, "intercept": self.intercept, "classes": self.classes},
+                {"coef": self.coef})
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        return cls(meta["view"], arrays["coef"], meta["intercept"], meta["classes"])
+
+
+class NaiveBayesHead:
+    """MultinomialNB: softmax(x · log P(t|c) + log P(c)), TF-IDF özellikleri üzerinde."""
+
+    type_name = "naive_bayes"
+
+    def __init__(self, view_idx: int, feature_log_prob, class_log_prior, classes):
+        self.view_idx = view_idx
+        self.feature_log_prob = feature_log_prob  # (n_classes, V_view)
+        self.class_log_prior = class_log_prior    # (n_classes,)
+        self.classes = [str(c) for c in classes]
+        self.order = class_order(self.classes)
+
+    @classmethod
+    def from_classifier(cls, view_idx, clf):
+        return cls(
+            view_idx,
+            np.asarray(clf.feature_log_prob_, dtype=np.float64),
+            np.asarray(clf.class_log_prior_, dtype=np.float64),
+            clf.classes_,
+        )
+
+    def predict_proba(self, counts, feats):
+        jll = np.asarray(feats[self.view_idx] @ self.feature_log_prob.T) + self.class_log_prior
+        proba = np.exp(jll - logsumexp(jll, axis=1)[:, np.newaxis])
+        return proba[:, self.order]
+
+    def predict_proba_doc(self, cols, counts, feats):
+        vcols, vals = feats[self.view_idx]
+        jll = self.feature_log_prob[:, vcols] @ vals + self.class_log_prior
+        proba = np.exp(jll - jll.max())
+        return (proba / proba.sum())[self.order]
+
+    def contributions_doc(self, cols, counts, feats, positions):
+        # x_j * (log P(j|ai) - log P(j|human)); sabit terim önsel oranı
+        vcols, vals = feats[self.view_idx]
+        human, ai = self.order
+        delta = self.feature_log_prob[ai, vcols] - self.feature_log_prob[human, vcols]
+        bias = float(self.class_log_prior[ai] - self.class_log_prior[human])
+        return positions[self.view_idx], vals * delta, bias
+
+    def state(self):
+        return ({"view": self.view_idx, "classes": self.classes},
+                {"feature_log_prob": self.feature_log_prob, "class_log_prior": self.class_log_prior})
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        return cls(meta["view"], arrays["feature_log_prob"], arrays["class_log_prior"], meta["classes"])
+
+
+class CalibratedLinearScorer:
+    """
+    CalibratedClassifierCV(LinearSVC, method="sigmoid") tek bir lineer skorlayıcıya
+    indirgenmiş hali: ortak sözlük, fold başına bir satırlık ağırlık matrisi ve
+    sigmoid parametreleri.
+
+    fold k için, c ham sayım satırı olmak üzere:
+        d_k = c · (idf_k * w_k) / ||c * idf_k|| + b_k
+        p_k = expit(-(a_k * d_k + s_k))        (clf.classes_[1] olasılığı)
+    sonuç fold'ların ortalaması. idf_k, fold'un sözlüğünde olmayan kolonlarda 0.
+    Sayımları FusedEnsemble'ın Featurizer'ı verir (predict_proba_counts / _doc).
+    """
+
+    def __init__(self, weights, idf_sq, intercepts, sig_a, sig_b, classes):
+        self.weights = weights        # (k, V)  idf_k * w_k
+        self.idf_sq = idf_sq          # (k, V)  idf_k ** 2 (l2 normu için)
+        self.intercepts = intercepts  # (k,)
+        self.sig_a = sig_a            # (k,)
+        self.sig_b = sig_b            # (k,)
+        self.classes_ = np.asarray(classes)
+        self.order = class_order(classes)
+
+    @classmethod
+    def from_calibrated(cls, model, union_index: dict = None):
+        # union_index: ensemble'ın ortak sözlüğü; hashing'de None (kova numaraları zaten ortak)
+        if model.method != "sigmoid":
+            raise ValueError("Sadece sigmoid kalibrasyon destekleniyor.")
+        folds = calibrated_folds(model)
+        vectorizers = [vec for vec, _, _ in folds]
+        for vec in vectorizers:
+            if vec.norm != "l2" or vec.binary or vec.sublinear_tf or not vec.use_idf:
+                raise ValueError("Sadece l2 normlu, ham sayımlı TF-IDF indirgenebilir.")
+
+        if isinstance(vectorizers[0], HashedTfidf):
+            union_index = None
+            V = vectorizers[0].n_features
+        else:
+            if union_index is None:
+                raise ValueError("Sözlüklü fold'lar için ortak sözlük (union_index) gerekli.")
+            V = len(union_index)
+
+        k = len(folds)
+        weights = np.zeros((k, V))
+        idf_sq = np.zeros((k, V))
+        intercepts = np.zeros(k)
+        sig_a = np.zeros(k)
+        sig_b = np.zeros(k)
+        for i, (vec, clf, calibrator) in enumerate(folds):
+            if not hasattr(clf, "coef_") or clf.coef_.shape[0] != 1:
+                raise ValueError("Fold sınıflandırıcısı ikili lineer model olmalı.")
+            cols = view_columns(vec, union_index)
+            weights[i, cols] = vec.idf_ * np.asarray(clf.coef_).ravel()
+            idf_sq[i, cols] = vec.idf_ ** 2
+            intercepts[i] = np.asarray(clf.intercept_).ravel()[0]
+            sig_a[i] = calibrator.a_
+            sig_b[i] = calibrator.b_
+
+        return cls(weights, idf_sq, intercepts, sig_a, sig_b, model.classes_)
+
+    def decision_function(self, counts):
+        num = np.asarray(counts @ self.weights.T)
+        norm = np.sqrt(np.asarray(counts.multiply(counts) @ self.idf_sq.T))
+        # boş satırda TF-IDF vektörü sıfır kalır, karar = intercept
+        scaled = np.divide(num, norm, out=np.zeros_like(num), where=norm > 0)
+        return scaled + self.intercepts
+
+    def predict_proba_counts(self, counts):
+        pos = expit(-(self.sig_a * self.decision_function(counts) + self.sig_b))
+        return binary_proba(pos.mean(axis=1), self.order)
+
+    def predict_proba_doc(self, cols, counts):
+        # cols/counts: Featurizer.doc_counts() çıktısı
+        num = self.weights[:, cols] @ counts
+        norm = np.sqrt(self.idf_sq[:, cols] @ (counts * counts))
+        decision = np.divide(num, norm, out=np.zeros_like(num), where=norm > 0) + self.intercepts
+        pos = expit(-(self.sig_a * decision + self.sig_b)).mean()
+        return np.array([1.0 - pos, pos])[self.order]
+
+    def contributions_doc(self, cols, counts):
+        """
+        Kolon başına AI log-odds katkısı: fold k'nin sigmoid öncesi değeri
+        -(a_k * d_k + s_k) kolonlara -a_k * w_kj * c_j / ||c * idf_k|| olarak ayrılır,
+        fold'ların ortalaması alınır. -> (katkılar, sabit terim)
+        """
+        norm = np.sqrt(self.idf_sq[:, cols] @ (counts * counts))
+        scale = np.divide(-self.sig_a, norm, out=np.zeros_like(norm), where=norm > 0)
+        per_fold = self.weights[:, cols] * counts * scale[:, np.newaxis]
+        bias = -(self.sig_a * self.intercepts + self.sig_b)
+        sign = 1.0 if self.order[1] == 1 else -1.0
+        return sign * per_fold.mean(axis=0), sign * float(bias.mean())
+
+    def state(self):
+        meta = {"classes": [str(c) for c in self.classes_]}
+        arrays = {
+            "weights": self.weights, "idf_sq": self.idf_sq, "intercepts": self.intercepts,
+            "sig_a": self.sig_a, "sig_b": self.sig_b,
+        }
+        return meta, arrays
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        return cls(arrays["weights"], arrays["idf_sq"], arrays["intercepts"],
+                   arrays["sig_a"], arrays["sig_b"], meta["classes"])
+
+
+class LinearCalibratedHead:
+    """FusedEnsemble içinde ortak sayım matrisini kullanan CalibratedLinearScorer."""
+
+    type_name = "calibrated_linear"
+
+    def __init__(self, scorer: CalibratedLinearScorer):
+        self.scorer = scorer
+
+    def predict_proba(self, counts, feats):
+        return self.scorer.predict_proba_counts(counts)
+
+    def predict_proba_doc(self, cols, counts, feats):
+        return self.scorer.predict_proba_doc(cols, counts)
+
+    def contributions_doc(self, cols, counts, feats, positions):
+        contrib, bias = self.scorer.contributions_doc(cols, counts)
+        return np.arange(len(cols)), contrib, bias
+
+    def state(self):
+        return self.scorer.state()
+
+    @classmethod
+    def from_state(cls, meta, arrays):
+        return cls(CalibratedLinearScorer.from_state(meta, arrays))
+
+
+HEAD_TYPES = {h.type_name: h for h in (LogisticHead, NaiveBayesHead, LinearCalibratedHead)}
+
+
+def head_from_classifier(view_idx, clf):
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.naive_bayes import MultinomialNB
+
+    if isinstance(clf, LogisticRegression):
+        return LogisticHead.from_classifier(view_idx, clf)
+    if isinstance(clf, MultinomialNB):
+        return NaiveBayesHead.from_classifier(view_idx, clf)
+    raise ValueError(f"Desteklenmeyen sınıflandırıcı: {type(clf).__name__}")
+
+
+class FusedEnsemble:
+    """
+    predict_proba(texts) -> {model_adı: ndarray (n, 2)}; kolonlar [human, ai].
+
+    timings sözlüğü verilirse aşama süreleri (saniye) üzerine eklenir:
+    "featurize" (sayım + TF-IDF view'ları) ve her model adı için head süresi.
+    """
+
+    def __init__(self, featurizer, views, heads):
+        self.featurizer = featurizer
+        self.views = views
+        self.heads = heads
+
+    @property
+    def model_names(self):
+        return list(self.heads)
+
+    @classmethod
+    def from_models(cls, models: dict):
+        # models: {"logreg": Pipeline, "svm_calibrated": CalibratedClassifierCV, ...}
+        branches = {}
+        for name in MODEL_ORDER:
+            model = models[name]
+            if is_calibrated(model):
+                branches[name] = calibrated_folds(model)
+            else:
+                vec, clf = split_pipeline(model)
+                branches[name] = [(vec, clf, None)]
+
+        vectorizers = [vec for folds in branches.values() for vec, _, _ in folds]
+        params = analyzer_params(vectorizers[0])
+        for vec in vectorizers[1:]:
+            if analyzer_params(vec) != params:
+                raise ValueError("Modeller farklı tokenizasyon ayarlarıyla eğitilmiş.")
+
+        hashed = [isinstance(vec, HashedTfidf) for vec in vectorizers]
+        if all(hashed):
+            if len({vec.n_features for vec in vectorizers}) != 1:
+                raise ValueError("Modeller farklı n_features ile hash'lenmiş.")
+            union_index = None
+            featurizer = HashingFeaturizer.from_hasher(params, vectorizers[0].n_features)
+        elif any(hashed):
+            raise ValueError("Sözlüklü ve hashing pipeline'lar aynı ensemble'da birleştirilemez.")
+        else:
+            union_index = union_vocabulary(vectorizers)
+            featurizer = Featurizer.from_vocabulary(params, union_index)
+
+        views, view_vecs = [], []
+
+        def view_for(vec):
+            # logreg ve nb aynı vectorizer'la eğitildiği için tek view'ı paylaşırlar
+            for i, other in enumerate(view_vecs):
+                if same_vectorizer(vec, other):
+                    return i
+            views.append(TfidfView.from_vectorizer(vec, union_index))
+            view_vecs.append(vec)
+            return len(views) - 1
+
+        heads = {}
+        for name, folds in branches.items():
+            model = models[name]
+            if is_calibrated(model):
+                # fold'lar ayrı TF-IDF yerine tek lineer skorlayıcıya indirgenir
+                heads[name] = LinearCalibratedHead(
+                    CalibratedLinearScorer.from_calibrated(model, union_index)
+                )
+            else:
+                vec, clf, _ = folds[0]
+                heads[name] = head_from_classifier(view_for(vec), clf)
+
+        return cls(featurizer, views, heads)
+
+    def predict_proba(self, texts, timings=None):
+        if isinstance(texts, str):
+            raise ValueError("Tek string değil, metin listesi bekleniyor.")
+        if len(texts) <= DOC_PATH_MAX_TEXTS:
+            return self.predict_proba_docs(texts, timings)
+        return self.predict_proba_sparse(texts, timings)
+
+    def predict_proba_sparse(self, texts, timings=None):
+        t = time.perf_counter() if timings is not None else 0.0
+        counts = self.featurizer.transform(texts)
+        feats = [view.transform(counts) for view in self.views]
+        t = lap(timings, "featurize", t)
+        out = {}
+        for name, head in self.heads.items():
+            try:
+                out[name] = head.predict_proba(counts, feats)
+            except Exception as exc:
+                tag_model(exc, name)
+                raise
+            t = lap(timings, name, t)
+        return out
+
+    def predict_proba_docs(self, texts, timings=None):
+        out = {name: np.empty((len(texts), 2)) for name in self.heads}
+        t = time.perf_counter() if timings is not None else 0.0
+        for i, doc in enumerate(texts):
+            cols, counts = self.featurizer.doc_counts(doc)
+            feats = [view.transform_doc(cols, counts) for view in self.views]
+            t = lap(timings, "featurize", t)
+            for name, head in self.heads.items():
+                try:
+                    out[name][i] = head.predict_proba_doc(cols, counts, feats)
+                except Exception as exc:
+                    tag_model(exc, name)
+                    raise
+                t = lap(timings, name, t)
+        return out
+
+    # ==== AÇIKLAMA (terim katkıları) ====
+
+    def explain(self, text: str, top_k: int = 10, max_offsets: int = EXPLAIN_MAX_OFFSETS):
+        """
+        Tek metin için model başına en çok katkı yapan terimler (unigram/bigram).
+
+        Sayım satırı bir kez çıkarılır; olasılıklar ve katkılar aynı TF-IDF
+        değerlerinden hesaplanır (predict_proba_docs ile aynı sonuç). Katkı, terimin
+        AI log-odds'una eklediği değerdir (pozitif: AI, negatif: human):
+          logistic           w_j * x_j
+          naive_bayes        x_j * (log P(j|ai) - log P(j|human))
+          calibrated_linear  fold'ların sigmoid öncesi katkılarının ortalaması
+        logistic ve naive_bayes'te katkılar + bias tam olarak modelin log-odds'u;
+        calibrated_linear'da fold olasılıklarının ortalaması alındığından yaklaşık.
+
+        -> {"models": {ad: {"proba": [human, ai], "bias", "top_ai", "top_human"}}, "n_terms"}
+        Terim girdileri: term, ngram, weight, count, offsets ([başlangıç, bitiş] karakter
+        aralıkları, en fazla max_offsets). Analyzer aralık vermiyorsa offsets boş.
+        """
+        span_analyzer = self.featurizer.span_analyzer
+        if span_analyzer is not None:
+            terms, spans = span_analyzer(text)
+        else:
+            terms, spans = self.featurizer.analyzer(text), None
+        token_cols = self.featurizer.lookup(terms)
+        hit = np.nonzero(token_cols >= 0)[0]
+        cols, inverse, counts = np.unique(token_cols[hit], return_inverse=True, return_counts=True)
+        counts = counts.astype(np.float64)
+        feats = [view.transform_doc(cols, counts) for view in self.views]
+        positions = [view.doc_positions(cols) for view in self.views]
+
+        # kolon konumu -> metindeki geçişleri (token sırasıyla)
+        # (girdiler Python listeleriyle kurulur; numpy skaler indekslemesi burada baskın maliyet)
+        occurrences = hit[np.argsort(inverse, kind="stable")].tolist()
+        starts = np.concatenate(([0], np.cumsum(counts.astype(np.int64)))).tolist()
+
+        def entry(p, weight):
+            idx = occurrences[starts[p]:starts[p + 1]]
+            # hashing'de aynı kovaya düşen farklı terimler birlikte listelenir
+            names = list(dict.fromkeys(terms[i] for i in idx))
+            return {
+                "term": " | ".join(names),
+                "ngram": names[0].count(" ") + 1,
+                "weight": round(weight, 6),
+                "count": len(idx),
+                "offsets": [list(spans[i]) for i in idx[:max_offsets]] if spans is not None else [],
+            }
+
+        def top(pos_idx, contrib, ranked, sign):
+            out = []
+            for j in ranked[:top_k].tolist():
+                weight = float(contrib[j])
+                if weight * sign <= 0:
+                    break
+                out.append(entry(int(pos_idx[j]), weight))
+            return out
+
+        models = {}
+        for name, head in self.heads.items():
+            proba = head.predict_proba_doc(cols, counts, feats)
+            pos_idx, contrib, bias = head.contributions_doc(cols, counts, feats, positions)
+            ranked = np.argsort(-contrib, kind="stable")
+            top_ai = top(pos_idx, contrib, ranked, 1.0)
+            top_human = top(pos_idx, contrib, ranked[::-1], -1.0)
+            models[name] = {
+                "proba": proba, "bias": float(bias), "top_ai": top_ai, "top_human": top_human,
+            }
+        return {"models": models, "n_terms": int(len(cols))}
+
+    # ==== KASKAD (erken çıkış) ====
+
+    def cascade_order(self):
+        return [name for name in CASCADE_ORDER if name in self.heads] + \
+               [name for name in self.heads if name not in CASCADE_ORDER]
+
+    def predict_proba_cascade(self, texts, margin: float = 0.0, timings=None):
+        """
+        Modeller cascade_order() sırasıyla çalışır; bir metin için çoğunluk (ör. 3 modelde
+        2 oy) kesinleşince kalan modeller o metinde çalıştırılmaz: etiket majority_vote ile
+        birebir aynıdır. margin > 0 ise ayrıca, o ana kadarki ortalama AI olasılığı
+        0.5'ten en az margin uzaktaysa da çıkılır (yaklaşık; etiket cascade_vote ile).
+
+        -> {model_adı: ndarray (n, 2)}; çalışmayan model/metin hücreleri NaN.
+        """
+        if isinstance(texts, str):
+            raise ValueError("Tek string değil, metin listesi bekleniyor.")
+        order = self.cascade_order()
+        need = len(order) // 2 + 1
+        n = len(texts)
+        out = {name: np.full((n, 2), np.nan) for name in self.heads}
+        if n == 0:
+            return out
+
+        def decided(votes_ai, ran, sum_pos):
+            done = (votes_ai >= need) | (ran - votes_ai >= need)
+            if margin > 0:
+                done |= np.abs(sum_pos / ran - 0.5) >= margin
+            return done
+
+        t = time.perf_counter() if timings is not None else 0.0
+        if n <= DOC_PATH_MAX_TEXTS:
+            for i, doc in enumerate(texts):
+                cols, counts = self.featurizer.doc_counts(doc)
+                feats = [view.transform_doc(cols, counts) for view in self.views]
+                t = lap(timings, "featurize", t)
+                votes_ai = ran = sum_pos = 0
+                for name in order:
+                    try:
+                        out[name][i] = proba = self.heads[name].predict_proba_doc(cols, counts, feats)
+                    except Exception as exc:
+                        tag_model(exc, name)
+                        raise
+                    t = lap(timings, name, t)
+                    votes_ai += int(ai_votes(proba[1]))
+                    ran += 1
+                    sum_pos += proba[1]
+                    if decided(votes_ai, ran, sum_pos):
+                        break
+            return out
+
+        counts = self.featurizer.transform(texts)
+        feats = [view.transform(counts) for view in self.views]
+        t = lap(timings, "featurize", t)
+        rows = np.arange(n)
+        votes_ai = np.zeros(n, dtype=np.int64)
+        sum_pos = np.zeros(n)
+        for ran, name in enumerate(order, start=1):
+            try:
+                if len(rows) == n:
+                    proba = self.heads[name].predict_proba(counts, feats)
+                else:
+                    # sadece hâlâ kararsız satırlar (CSR satır seçimi ucuz)
+                    proba = self.heads[name].predict_proba(counts[rows], [f[rows] for f in feats])
+            except Exception as exc:
+                tag_model(exc, name)
+                raise
+            out[name][rows] = proba
+            t = lap(timings, name, t)
+            votes_ai[rows] += ai_votes(proba[:, 1])
+            sum_pos[rows] += proba[:, 1]
+            rows = rows[~decided(votes_ai[rows], ran, sum_pos[rows])]
+            if len(rows) == 0:
+                break
+        return out
+
+    # ==== BUNDLE (mmap'lenebilir .npy dizileri + manifest.json) ====
+
+    def save_bundle(self, bundle_dir, dtype=None):
+        # dtype=np.float32: ağırlık/idf dizileri yarı boyutta yazılır (hesap yine float64'te)
+        bundle_dir = Path(bundle_dir)
+        bundle_dir.mkdir(parents=True, exist_ok=True)
+
+        def write(prefix, meta, arrays):
+            files = {}
+            for key, arr in arrays.items():
+                if dtype is not None and arr.dtype.kind == "f":
+                    arr = arr.astype(dtype)
+                fname = f"{prefix}.{key}.npy"
+                np.save(bundle_dir / fname, np.ascontiguousarray(arr), allow_pickle=False)
+                files[key] = fname
+            return {"meta": meta, "arrays": files}
+
+        manifest = {
+            "format": BUNDLE_FORMAT,
+            "models": self.model_names,
+            "featurizer": {"type": self.featurizer.type_name, **write("featurizer", *self.featurizer.state())},
+            "views": [write(f"view{i}", *view.state()) for i, view in enumerate(self.views)],
+            "heads": {
+                name: {"type": head.type_name, **write(f"head.{name}", *head.state())}
+                for name, head in self.heads.items()
+            },
+        }
+        # manifest en son yazılır: yarım kalmış bundle yüklenemez
+        with open(bundle_dir / "manifest.json", "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        return bundle_dir
+
+    @classmethod
+    def load_bundle(cls, bundle_dir, mmap_mode="r"):
+        bundle_dir = Path(bundle_dir)
+        with open(bundle_dir / "manifest.json", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != BUNDLE_FORMAT:
+            raise ValueError(f"Desteklenmeyen bundle formatı: {manifest.get('format')}")
+
+        def read(entry):
+            arrays = {
+                key: np.load(bundle_dir / fname, mmap_mode=mmap_mode, allow_pickle=False)
+                for key, fname in entry["arrays"].items()
+            }
+            return entry["meta"], arrays
+
+        entry = manifest["featurizer"]
+        featurizer = FEATURIZER_TYPES[entry.get("type", Featurizer.type_name)].from_state(*read(entry))
+        views = [TfidfView.from_state(*read(entry)) for entry in manifest["views"]]
+        heads = {
+            name: HEAD_TYPES[entry["type"]].from_state(*read(entry))
+            for name, entry in manifest["heads"].items()
+        }
+        return cls(featurizer, views, heads)
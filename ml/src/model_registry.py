@@ -0,0 +1,182 @@
+"""
+Sürümlü model kayıt defteri (registry).
+
+  ml/models/registry/
+    CURRENT                       aktif sürümün adı (tek satır)
+    20261018T051025Z-b80c0be8/    FusedEnsemble bundle dosyaları + version.json
+
+version.json: dosya checksum'ları (sha256), eğitim metrikleri (models_summary.json
+ile aynı liste), oluşturulma zamanı, sklearn sürümü. Sürüm dizinleri yazıldıktan
+sonra değişmez; yeni eğitim yeni dizin açar, devreye alma = CURRENT'ı değiştirmek.
+
+    python model_registry.py list
+    python model_registry.py verify <sürüm>
+    python model_registry.py activate <sürüm>
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+
+from ensemble import BUNDLE_FORMAT, FusedEnsemble
+
+VERSION_FILE = "version.json"
+CURRENT_FILE = "CURRENT"
+
+
+def file_sha256(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def artifact_version(paths) -> str:
+    # registry dışı modellerin (ensemble_bundle, eski pipeline'lar) sürümü: dosya
+    # içeriklerinin sırayla hash'i. API ve bulk_score aynı değeri üretsin diye burada
+    h = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+def version_dir(registry_dir, version: str) -> Path:
+    # sürüm adı dizin adı olarak kullanılıyor: "../" gibi değerleri reddet
+    if not version or Path(version).name != version or version.startswith("."):
+        raise ValueError(f"Geçersiz sürüm adı: {version!r}")
+    return Path(registry_dir) / version
+
+
+def publish(ensemble: FusedEnsemble, registry_dir, metrics=None, activate: bool = True, dtype=None) -> str:
+    """Ensemble'ı yeni bir sürüm dizinine yazar; activate=True ise CURRENT'ı ona çevirir."""
+    import sklearn
+
+    registry_dir = Path(registry_dir)
+    registry_dir.mkdir(parents=True, exist_ok=True)
+    created = datetime.now(timezone.utc)
+
+    # yarım kalan yazım asla sürüm gibi görünmesin: geçici dizine yaz, sonra rename
+    tmp_dir = registry_dir / f".tmp-{created.strftime('%Y%m%dT%H%M%S%f')}-{os.getpid()}"
+    ensemble.save_bundle(tmp_dir, dtype=dtype)
+    files = {p.name: file_sha256(p) for p in sorted(tmp_dir.iterdir())}
+
+    content = hashlib.sha256("".join(f"{k}:{v}\n" for k, v in files.items()).encode("utf-8"))
+    version = f"{created.strftime('%Y%m%dT%H%M%SZ')}-{content.hexdigest()[:8]}"
+    info = {
+        "version": version,
+        "format": BUNDLE_FORMAT,
+        "created_at": created.isoformat(),
+        "sklearn_version": sklearn.__version__,
+        "models": ensemble.model_names,
+        "files": files,
+        "metrics": metrics or [],
+    }
+    with open(tmp_dir / VERSION_FILE, "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+
+    final_dir = version_dir(registry_dir, version)
+    if final_dir.exists():
+        # aynı saniyede aynı içerik: mevcut sürüm yeterli
+        shutil.rmtree(tmp_dir)
+    else:
+        os.replace(tmp_dir, final_dir)
+
+    if activate:
+        set_current(registry_dir, version)
+    return version
+
+
+def read_version_info(registry_dir, version: str) -> dict:
+    with open(version_dir(registry_dir, version) / VERSION_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def list_versions(registry_dir):
+    registry_dir = Path(registry_dir)
+    if not registry_dir.is_dir():
+        return []
+    current = read_current(registry_dir)
+    out = []
+    for path in sorted(registry_dir.iterdir()):
+        if not path.is_dir() or path.name.startswith(".") or not (path / VERSION_FILE).exists():
+            continue
+        info = read_version_info(registry_dir, path.name)
+        out.append({
+            "version": info["version"],
+            "created_at": info["created_at"],
+            "models": info.get("models", []),
+            "metrics": info.get("metrics", []),
+            "current": info["version"] == current,
+        })
+    return out
+
+
+def read_current(registry_dir):
+    try:
+        with open(Path(registry_dir) / CURRENT_FILE, encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def set_current(registry_dir, version: str):
+    registry_dir = Path(registry_dir)
+    if not (version_dir(registry_dir, version) / VERSION_FILE).exists():
+        raise ValueError(f"Sürüm bulunamadı: {version}")
+    # os.replace atomik: okuyan taraf ya eski ya yeni adı görür
+    tmp = registry_dir / f".{CURRENT_FILE}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+    os.replace(tmp, registry_dir / CURRENT_FILE)
+
+
+def verify(registry_dir, version: str) -> dict:
+    """Checksum ve format kontrolü; sorun varsa ValueError."""
+    info = read_version_info(registry_dir, version)
+    if info.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"{version}: desteklenmeyen bundle formatı {info.get('format')}")
+    vdir = version_dir(registry_dir, version)
+    for name, expected in info["files"].items():
+        path = vdir / name
+        if not path.exists():
+            raise ValueError(f"{version}: eksik dosya {name}")
+        if file_sha256(path) != expected:
+            raise ValueError(f"{version}: checksum uyuşmuyor {name}")
+    return info
+
+
+def load_version(registry_dir, version: str, mmap_mode="r", check: bool = True) -> FusedEnsemble:
+    if check:
+        verify(registry_dir, version)
+    return FusedEnsemble.load_bundle(version_dir(registry_dir, version), mmap_mode=mmap_mode)
+
+
+def main():
+    default_dir = Path(__file__).resolve().parents[1] / "models" / "registry"
+    ap = argparse.ArgumentParser(description="model registry")
+    ap.add_argument("--registry-dir", type=Path, default=default_dir)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("list")
+    for cmd in ("verify", "activate"):
+        sub.add_parser(cmd).add_argument("version")
+    args = ap.parse_args()
+
+    if args.cmd == "list":
+        print(json.dumps(list_versions(args.registry_dir), ensure_ascii=False, indent=2))
+    elif args.cmd == "verify":
+        verify(args.registry_dir, args.version)
+        print("ok", args.version)
+    elif args.cmd == "activate":
+        verify(args.registry_dir, args.version)
+        set_current(args.registry_dir, args.version)
+        print("CURRENT ->", args.version)
+
+
+if __name__ == "__main__":
+    main()
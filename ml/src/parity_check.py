@@ -0,0 +1,178 @@
+"""
+FusedEnsemble ile sklearn pipeline'larının olasılık eşitliği (parity) kontrolü.
+
+    python parity_check.py
+    python parity_check.py --modes hashing --n-docs 300
+
+Dataset gerekmez: küçük sentetik bir korpus üzerinde train_models.build_pipelines()
+ile üç pipeline fit edilir (vocab ve hashing modlarında ayrı ayrı), ensemble
+float64 ve float32 bundle olarak yazılıp geri yüklenir; sparse (batch) ve metin
+başına (doc) yolların sklearn predict_proba ile farkı train_models'teki toleranslarla
+karşılaştırılır. Kontrol metinlerine uç girdiler de eklenir: boş metin, sadece stop
+word, sadece sözlük dışı terimler, ASCII dışı karakterler ve çok uzun bir metin.
+
+Hashing modunun dayandığı vektörize murmurhash3_32 ayrıca sklearn.utils.murmurhash3_32
+ve HashingVectorizer ile token token karşılaştırılır: 0-3 bayt kuyruklu (len % 4) ve
+MAX_BATCH_KEY_BYTES'tan uzun token'lar, çok baytlı UTF-8, işaret (alternate_sign=True
+ile HashingVectorizer'ın verdiği +-1, negatif hash'lerin kolonu).
+
+Uyuşmazlıkta RuntimeError ile çıkar (exit code != 0).
+"""
+import argparse
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from ensemble import FusedEnsemble, HashingFeaturizer, HashedTfidf, murmurhash3_32
+from train_models import build_pipelines, check_parity, PARITY_TOL, FLOAT32_PARITY_TOL
+
+SHARED_WORDS = (
+    "model data result method analysis study paper approach system network "
+    "performance evaluation training dataset task learning feature experiment"
+).split()
+AI_WORDS = (
+    "novel leverage robust comprehensive framework significantly outperforms "
+    "demonstrate effectiveness state-of-the-art furthermore notably seamless"
+).split()
+HUMAN_WORDS = (
+    "we found messy noisy tried observed surprisingly however sample field "
+    "measured bias ölçüm çalışma gözlem müşahede naïve café"
+).split()
+
+EDGE_TEXTS = [
+    "",
+    "the and of is to",                       # sadece stop word
+    "zzqx vrbl qwpt xkcdx",                   # sadece sözlük dışı
+    "çğış öüÇĞ İıŞ 数据 模型 😀 naïve",          # ASCII dışı, çok baytlı
+]
+LONG_TEXT_WORDS = 60000
+
+
+def synthetic_corpus(n_docs: int, seed: int):
+    rng = random.Random(seed)
+    texts, labels = [], []
+    for i in range(n_docs):
+        label = "ai" if i % 2 else "human"
+        own = AI_WORDS if label == "ai" else HUMAN_WORDS
+        other = HUMAN_WORDS if label == "ai" else AI_WORDS
+        n = rng.randint(8, 60)
+        words = [
+            rng.choice(own) if r < 0.5 else rng.choice(SHARED_WORDS) if r < 0.9 else rng.choice(other)
+            for r in (rng.random() for _ in range(n))
+        ]
+        texts.append(" ".join(words))
+        labels.append(label)
+    return np.array(texts, dtype=object), np.array(labels)
+
+
+def check_texts(held_out, seed: int):
+    rng = random.Random(seed)
+    vocab = SHARED_WORDS + AI_WORDS + HUMAN_WORDS
+    long_text = " ".join(rng.choice(vocab) for _ in range(LONG_TEXT_WORDS))
+    return np.array(list(held_out) + EDGE_TEXTS + [long_text], dtype=object)
+
+
+def hash_tokens(seed: int):
+    rng = random.Random(seed)
+    alphabet = "abcxyz019-_ çğışöüİ数据😀"
+    tokens = ["", "a", "ab", "abc", "abcd", "the model", "çalışma", "数据", "😀", "naïve café"]
+    # her bayt uzunluğu (kuyruk 0-3) ve MAX_BATCH_KEY_BYTES'ın iki yanı
+    for length in list(range(1, 41)) + [HashingFeaturizer.MAX_BATCH_KEY_BYTES + d for d in (-1, 0, 1, 2, 3, 50)]:
+        for _ in range(5):
+            token = "".join(rng.choice(alphabet) for _ in range(length))
+            while len(token.encode("utf-8")) > length:
+                token = token[:-1]
+            tokens.append(token + "a" * (length - len(token.encode("utf-8"))))
+    return tokens
+
+
+def check_murmurhash(seed: int, n_features: int) -> int:
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+    from sklearn.utils import murmurhash3_32 as sk_murmurhash3_32
+
+    tokens = hash_tokens(seed)
+    encoded = [t.encode("utf-8") for t in tokens]
+    tails = {len(b) % 4 for b in encoded}
+    if tails != {0, 1, 2, 3}:
+        raise RuntimeError(f"murmurhash kontrolü tüm kuyruk uzunluklarını kapsamıyor: {sorted(tails)}")
+
+    expected = np.array([sk_murmurhash3_32(b, seed=0) for b in encoded], dtype=np.int64)
+    for name, got in (
+        ("batch", murmurhash3_32(encoded).astype(np.int64)),
+        ("tek", np.array([murmurhash3_32([b])[0] for b in encoded], dtype=np.int64)),
+    ):
+        bad = np.flatnonzero(got != expected)
+        if bad.size:
+            raise RuntimeError(f"murmurhash3_32 ({name}) sklearn'den farklı: {tokens[bad[0]]!r} "
+                               f"({got[bad[0]]} != {expected[bad[0]]})")
+    if not (expected < 0).any():
+        raise RuntimeError("murmurhash kontrolünde negatif hash yok; işaret yolu denenmedi")
+
+    # token başına tek satır: kolon ve alternate_sign=True işareti HashingVectorizer'dan
+    featurizer = HashingFeaturizer({}, n_features)
+    cols = featurizer.lookup(tokens)
+    for alternate_sign in (False, True):
+        hasher = HashingVectorizer(analyzer=lambda doc: doc, n_features=n_features,
+                                   alternate_sign=alternate_sign, norm=None)
+        X = hasher.transform([[t] for t in tokens]).tocsr()
+        sk_cols = X.indices[X.indptr[:-1]]
+        if not np.array_equal(cols, sk_cols):
+            i = int(np.flatnonzero(cols != sk_cols)[0])
+            raise RuntimeError(f"HashingFeaturizer kolonu farklı: {tokens[i]!r} ({cols[i]} != {sk_cols[i]})")
+        signs = X.data[X.indptr[:-1]]
+        want = np.where(expected >= 0, 1.0, -1.0) if alternate_sign else np.ones(len(tokens))
+        if not np.array_equal(signs, want):
+            raise RuntimeError(f"HashingVectorizer işareti beklenenden farklı (alternate_sign={alternate_sign})")
+
+    # işaretli sayımlar HashingFeaturizer'la ifade edilemez: bu pipeline'lar ensemble'a alınmamalı
+    try:
+        HashedTfidf(HashingVectorizer(alternate_sign=True, norm=None), TfidfTransformer())
+    except ValueError:
+        pass
+    else:
+        raise RuntimeError("alternate_sign=True HashingVectorizer reddedilmedi")
+    return len(tokens)
+
+
+def check_mode(mode: str, n_docs: int, n_features: int, seed: int):
+    X, y = synthetic_corpus(n_docs, seed)
+    X_check = check_texts(synthetic_corpus(40, seed + 1)[0], seed)
+    pipelines = build_pipelines(mode, n_features)
+    for model in pipelines.values():
+        model.fit(X, y)
+
+    ensemble = FusedEnsemble.from_models(pipelines)
+    results = {"fused": check_parity(ensemble, pipelines, X_check, PARITY_TOL)}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, dtype, tol in (("float64", None, PARITY_TOL), ("float32", np.float32, FLOAT32_PARITY_TOL)):
+            bundle_dir = ensemble.save_bundle(Path(tmp) / name, dtype=dtype)
+            # mmap'li yükleme: serviste kullanılan yol
+            loaded = FusedEnsemble.load_bundle(bundle_dir, mmap_mode="r")
+            results[name] = check_parity(loaded, pipelines, X_check, tol)
+            del loaded
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FusedEnsemble / sklearn parity kontrolü")
+    parser.add_argument("--modes", nargs="+", default=["vocab", "hashing"], choices=["vocab", "hashing"])
+    parser.add_argument("--n-docs", type=int, default=120)
+    # küçük n_features: kova çakışmaları da kontrol edilsin
+    parser.add_argument("--n-features", type=int, default=2 ** 10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    n_tokens = check_murmurhash(args.seed, args.n_features)
+    print(f"murmurhash3_32: {n_tokens} token sklearn ile aynı")
+    for mode in args.modes:
+        results = check_mode(mode, args.n_docs, args.n_features, args.seed)
+        print(f"{mode:8s} " + "  ".join(f"{name} max fark {diff:.3g}" for name, diff in results.items()))
+    print("parity OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,13 @@
 from pathlib import Path
+import os
+import tempfile
+import time
+import numpy as np
 import pandas as pd
 
 from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer, TfidfTransformer
 
 from sklearn.linear_model import LogisticRegression
 from sklearn.svm import LinearSVC
@@ -20,20 +24,37 @@ from sklearn.metrics import (
 import joblib
 import json
 
+from ensemble import FusedEnsemble, majority_vote, cascade_vote
+import model_registry
+
 # ✅ SENİN DATASET YOLUN
 DATASET_PATH = Path(r"C:\Users\Aduket Sayman\Desktop\HumanOrAI\data\processed\dataset_clean.csv")
 
 # ✅ Model kayıt yeri (senin klasör yapına göre)
 PROJECT_ROOT = Path(r"C:\Users\Aduket Sayman\Desktop\HumanOrAI")
 MODELS_DIR = PROJECT_ROOT / "ml" / "models"
+REGISTRY_DIR = MODELS_DIR / "registry"
 REPORTS_DIR = PROJECT_ROOT / "reports"
 
-MODELS_DIR.mkdir(parents=True, exist_ok=True)
-REPORTS_DIR.mkdir(parents=True, exist_ok=True)
-
 RANDOM_STATE = 42
 TEST_SIZE = 0.2
 
+# özellik modu: "vocab" = TfidfVectorizer (sözlük), "hashing" = HashingVectorizer + TfidfTransformer
+FEATURE_MODE = os.getenv("FEATURE_MODE", "vocab")
+HASH_N_FEATURES = int(os.getenv("HASH_N_FEATURES", str(2 ** 18)))
+# 1: iki mod aynı split'te eğitilip reports/feature_modes_comparison.json'a yazılır
+COMPARE_FEATURE_MODES = os.getenv("COMPARE_FEATURE_MODES", "0") == "1"
+# 0: yeni sürüm registry'e yazılır ama CURRENT olmaz; backend'de SHADOW_MODEL_VERSION
+# ile gölge modda denenip sonra /models/reload ile devreye alınabilir
+ACTIVATE_MODEL = os.getenv("ACTIVATE_MODEL", "1") == "1"
+
+# kaskad raporu (reports/cascade_report.json): 0 = sadece kesinleşmiş çoğunlukla çıkış
+CASCADE_MARGINS = (0.0, 0.3, 0.4)
+LATENCY_REPEATS = 3
+
+PARITY_TOL = 1e-9
+FLOAT32_PARITY_TOL = 1e-5
+
 
 def load_dataset(path: Path) -> pd.DataFrame:
     if not path.exists():
@@ -57,7 +78,21 @@ def load_dataset(path: Path) -> pd.DataFrame:
     return df
 
 
-def build_pipelines():
+def build_features(feature_mode=FEATURE_MODE, n_features=HASH_N_FEATURES):
+    if feature_mode == "hashing":
+        # sözlük yok: boyut n_features'a bağlı, korpusa değil; idf kovalar üzerinde fit edilir
+        hasher = HashingVectorizer(
+            lowercase=True,
+            stop_words="english",
+            ngram_range=(1, 2),
+            n_features=n_features,
+            alternate_sign=False,
+            norm=None
+        )
+        return [("hash", hasher), ("tfidf", TfidfTransformer())]
+
+    if feature_mode != "vocab":
+        raise ValueError(f"Bilinmeyen FEATURE_MODE: {feature_mode}")
     tfidf = TfidfVectorizer(
         lowercase=True,
         stop_words="english",
@@ -65,9 +100,14 @@ def build_pipelines():
         max_features=50000,
         min_df=2
     )
+    return [("tfidf", tfidf)]
+
+
+def build_pipelines(feature_mode=FEATURE_MODE, n_features=HASH_N_FEATURES):
+    features = build_features(feature_mode, n_features)
 
     logreg = Pipeline([
-        ("tfidf", tfidf),
+        *features,
         ("clf", LogisticRegression(
             max_iter=2000,
             n_jobs=None,
@@ -77,7 +117,7 @@ def build_pipelines():
 
     # LinearSVC probability vermez -> CalibratedClassifierCV ile olasılık yapıyoruz
     svm_base = Pipeline([
-        ("tfidf", tfidf),
+        *features,
         ("clf", LinearSVC(class_weight="balanced"))
     ])
     svm_calibrated = CalibratedClassifierCV(
@@ -87,7 +127,7 @@ def build_pipelines():
     )
 
     nb = Pipeline([
-        ("tfidf", tfidf),
+        *features,
         ("clf", MultinomialNB(alpha=0.5))
     ])
 
@@ -98,7 +138,7 @@ def build_pipelines():
     }
 
 
-def evaluate_and_save(model_name, model, X_test, y_test):
+def compute_metrics(model_name, model, X_test, y_test):
     y_pred = model.predict(X_test)
 
     acc = accuracy_score(y_test, y_pred)
@@ -115,8 +155,16 @@ def evaluate_and_save(model_name, model, X_test, y_test):
         "recall_ai": float(rc),
         "f1_ai": float(f1),
         "confusion_matrix_labels": ["human", "ai"],
-        "confusion_matrix": cm
+        "confusion_matrix": cm,
+        "feature_mode": FEATURE_MODE
     }
+    return metrics, report
+
+
+def evaluate_and_save(model_name, model, X_test, y_test):
+    metrics, report = compute_metrics(model_name, model, X_test, y_test)
+    acc, pr, rc, f1 = metrics["accuracy"], metrics["precision_ai"], metrics["recall_ai"], metrics["f1_ai"]
+    cm = metrics["confusion_matrix"]
 
     # console
     print("\n" + "=" * 70)
@@ -146,7 +194,180 @@ def evaluate_and_save(model_name, model, X_test, y_test):
     return metrics
 
 
+def check_parity(ensemble, models: dict, X_check, tol: float) -> float:
+    # hem sparse (batch) hem metin başına numpy yolu sklearn pipeline'larıyla aynı olmalı
+    worst = 0.0
+    paths = {"sparse": ensemble.predict_proba_sparse, "doc": ensemble.predict_proba_docs}
+    for path_name, predict in paths.items():
+        fused = predict(X_check)
+        for name, model in models.items():
+            ai_idx = list(model.classes_).index("ai")
+            diff = np.abs(fused[name][:, 1] - model.predict_proba(X_check)[:, ai_idx]).max()
+            if diff > tol:
+                raise RuntimeError(
+                    f"Ensemble olasılıkları uyuşmuyor: {name} / {path_name} (max fark {diff:.3g})"
+                )
+            worst = max(worst, diff)
+    return worst
+
+
+def export_ensemble(models: dict, X_check, metrics):
+    # backend tek TF-IDF geçişiyle üç modeli birden çalıştırsın diye;
+    # .npy bundle worker'larda mmap'lenir, dizileri page cache'ten paylaşırlar.
+    # Her eğitim registry'de yeni bir sürüm açar; kontrolden geçerse (ACTIVATE_MODEL=1) CURRENT olur
+    ensemble = FusedEnsemble.from_models(models)
+    check_parity(ensemble, models, X_check, PARITY_TOL)
+
+    # diziler float32 yazılır; olasılık farkı FLOAT32_PARITY_TOL altında kalmalı
+    version = model_registry.publish(
+        ensemble, REGISTRY_DIR, metrics=metrics, activate=False, dtype=np.float32
+    )
+    loaded = model_registry.load_version(REGISTRY_DIR, version)
+    diff = check_parity(loaded, models, X_check, FLOAT32_PARITY_TOL)
+
+    print(f"Fused ensemble kaydedildi: {REGISTRY_DIR / version} (float32 max fark {diff:.3g})")
+    if ACTIVATE_MODEL:
+        model_registry.set_current(REGISTRY_DIR, version)
+    else:
+        print(f"CURRENT değişmedi; gölge değerlendirme için: SHADOW_MODEL_VERSION={version}")
+    return version
+
+
+def dir_bytes(path: Path) -> int:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def compare_feature_modes(X_train, X_test, y_train, y_test):
+    # aynı split'te sözlük vs hashing: metrikler + artifact boyutu, yükleme süresi, bellek
+    rows = []
+    for mode in ("vocab", "hashing"):
+        pipelines = build_pipelines(mode, HASH_N_FEATURES)
+        row = {"feature_mode": mode, "n_features": HASH_N_FEATURES if mode == "hashing" else None, "models": []}
+        for name, model in pipelines.items():
+            model.fit(X_train, y_train)
+            metrics, _ = compute_metrics(name, model, X_test, y_test)
+            metrics["feature_mode"] = mode
+            row["models"].append(metrics)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            tmp = Path(tmp)
+            for name, model in pipelines.items():
+                joblib.dump(model, tmp / f"{name}.joblib")
+            t = time.perf_counter()
+            for name in pipelines:
+                joblib.load(tmp / f"{name}.joblib")
+            row["pipeline_load_ms"] = round((time.perf_counter() - t) * 1000, 1)
+            row["pipeline_bytes"] = dir_bytes(tmp)
+
+            ensemble = FusedEnsemble.from_models(pipelines)
+            check_parity(ensemble, pipelines, X_test, PARITY_TOL)
+            bundle_dir = ensemble.save_bundle(tmp / "bundle", dtype=np.float32)
+            t = time.perf_counter()
+            FusedEnsemble.load_bundle(bundle_dir, mmap_mode=None)
+            row["bundle_load_ms"] = round((time.perf_counter() - t) * 1000, 1)
+            row["bundle_bytes"] = dir_bytes(bundle_dir)
+            # worker başına RAM'e kopyalanan dizi baytı (mmap'siz)
+            row["bundle_array_bytes"] = sum(
+                np.load(p, mmap_mode="r").nbytes for p in bundle_dir.glob("*.npy")
+            )
+        rows.append(row)
+
+    path = REPORTS_DIR / "feature_modes_comparison.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(rows, f, ensure_ascii=False, indent=2)
+
+    print("\n" + "=" * 70)
+    print("Özellik modları karşılaştırması:", path)
+    for row in rows:
+        f1s = "  ".join(f"{m['model']}={m['f1_ai']:.4f}" for m in row["models"])
+        print(f"{row['feature_mode']:8s} bundle {row['bundle_bytes'] / 1e6:.1f} MB  "
+              f"yükleme {row['bundle_load_ms']} ms  F1(AI): {f1s}")
+    return rows
+
+
+def vote_labels(probas, names, vote):
+    labels = []
+    for i in range(len(next(iter(probas.values())))):
+        preds = [
+            {"model": name, "ai_pct": round(float(probas[name][i][1]) * 100.0, 2)}
+            for name in names if not np.isnan(probas[name][i][1])
+        ]
+        labels.append(vote(preds))
+    return np.array(labels)
+
+
+def best_time(fn, repeats=LATENCY_REPEATS):
+    best = float("inf")
+    for _ in range(repeats):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def cascade_report(ensemble, X_test, y_test):
+    # kaskad ne sıklıkla erken çıkıyor, etiketler değişiyor mu, ne kadar süre kazandırıyor
+    names = ensemble.model_names
+    X_test = list(X_test)
+    full = ensemble.predict_proba(X_test)
+    full_labels = vote_labels(full, names, majority_vote)
+
+    full_batch_s = best_time(lambda: ensemble.predict_proba_sparse(X_test))
+    # modellerin ortak kısmı (tokenizasyon + sayım + TF-IDF view'ları); kaskad bunu kısaltamaz
+    featurize_s = best_time(
+        lambda: [view.transform(counts) for counts in [ensemble.featurizer.transform(X_test)] for view in ensemble.views]
+    )
+    full_single_s = best_time(lambda: [ensemble.predict_proba([x]) for x in X_test])
+
+    rows = []
+    for margin in CASCADE_MARGINS:
+        probas = ensemble.predict_proba_cascade(X_test, margin)
+        labels = vote_labels(probas, names, cascade_vote)
+        ran = np.stack([~np.isnan(probas[name][:, 1]) for name in names], axis=1)
+        batch_s = best_time(lambda: ensemble.predict_proba_cascade(X_test, margin))
+        single_s = best_time(lambda: [ensemble.predict_proba_cascade([x], margin) for x in X_test])
+        rows.append({
+            "margin": margin,
+            "early_exit_rate": round(float((ran.sum(axis=1) < len(names)).mean()), 4),
+            "avg_models_run": round(float(ran.sum(axis=1).mean()), 4),
+            "model_run_rate": {name: round(float(ran[:, j].mean()), 4) for j, name in enumerate(names)},
+            "label_agreement_with_full": round(float((labels == full_labels).mean()), 4),
+            "accuracy": round(float(accuracy_score(y_test, labels)), 4),
+            "batch_ms": round(batch_s * 1000, 2),
+            "batch_saving_pct": round((1 - batch_s / full_batch_s) * 100, 1),
+            "single_text_ms": round(single_s * 1000 / len(X_test), 4),
+            "single_text_saving_pct": round((1 - single_s / full_single_s) * 100, 1),
+        })
+
+    report = {
+        "n_test": len(X_test),
+        "cascade_order": ensemble.cascade_order(),
+        "full": {
+            "accuracy": round(float(accuracy_score(y_test, full_labels)), 4),
+            "batch_ms": round(full_batch_s * 1000, 2),
+            "batch_featurize_ms": round(featurize_s * 1000, 2),
+            "single_text_ms": round(full_single_s * 1000 / len(X_test), 4),
+        },
+        "cascade": rows,
+    }
+    path = REPORTS_DIR / "cascade_report.json"
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print("\n" + "=" * 70)
+    print("Kaskad raporu:", path)
+    for row in rows:
+        print(f"margin {row['margin']:.2f}  erken çıkış {row['early_exit_rate']:.1%}  "
+              f"ort. model {row['avg_models_run']:.2f}  etiket uyumu {row['label_agreement_with_full']:.2%}  "
+              f"kazanç batch {row['batch_saving_pct']}% / tek metin {row['single_text_saving_pct']}%")
+    return report
+
+
 def main():
+    # import'ta değil: parity_check.py build_pipelines/check_parity'yi dizin açmadan kullanır
+    MODELS_DIR.mkdir(parents=True, exist_ok=True)
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+
     print("Dataset okunuyor:", DATASET_PATH)
     df = load_dataset(DATASET_PATH)
 
@@ -164,6 +385,7 @@ def main():
     )
 
     print(f"\nTrain: {len(X_train)}  Test: {len(X_test)}")
+    print(f"Özellik modu: {FEATURE_MODE}" + (f" (n_features={HASH_N_FEATURES})" if FEATURE_MODE == "hashing" else ""))
 
     pipelines = build_pipelines()
     all_metrics = []
@@ -175,6 +397,12 @@ def main():
         m = evaluate_and_save(name, model, X_test, y_test)
         all_metrics.append(m)
 
+    version = export_ensemble(pipelines, X_test, all_metrics)
+    cascade_report(model_registry.load_version(REGISTRY_DIR, version), X_test, y_test)
+
+    if COMPARE_FEATURE_MODES:
+        compare_feature_modes(X_train, X_test, y_train, y_test)
+
     # genel özet
     summary_path = REPORTS_DIR / "models_summary.json"
     with open(summary_path, "w", encoding="utf-8") as f: